@@ -0,0 +1,39 @@
+"""compare BCH read time of all sections with
+selected result keys for the BCH files of the test data
+"""
+import sys
+import time
+import pathlib
+import femagtools.bch
+
+datadir = pathlib.Path(__file__).parents[2] / 'src' / 'tests' / 'data'
+if len(sys.argv) > 1:
+    datadir = pathlib.Path(sys.argv[1])
+
+subsets = [None,
+           ['machine'],
+           ['torque', 'losses', 'machine'],
+           ['ldq', 'psidq', 'machine'],
+           ['flux', 'torque']]
+repeat = 3
+
+files = []
+for f in sorted(datadir.glob('*.B*CH')):
+    try:
+        femagtools.bch.read(f)
+        files.append(f)
+    except Exception as e:
+        print(f"skip {f.name}: {e}")
+
+elapsed = {}
+for keys in subsets:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for f in files:
+            femagtools.bch.read(f, keys=keys)
+    elapsed[str(keys)] = (time.perf_counter() - t0)/repeat
+
+tall = elapsed[str(None)]
+print(f"{len(files)} files")
+for k, t in elapsed.items():
+    print(f"keys={k:35}: {1e3*t:8.1f} ms  speedup {tall/t:5.1f}")
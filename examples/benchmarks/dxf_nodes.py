@@ -0,0 +1,49 @@
+"""compare the construction time of a dxfsl Geometry with the
+nearest node search over all graph nodes and with the node index
+
+The shapes of the DXF test fixture are tiled n x n times.
+"""
+import time
+import pathlib
+import numpy as np
+from femagtools.dxfsl.geom import Geometry
+from femagtools.dxfsl.shape import Element, Line, Arc
+from femagtools.dxfsl.dxfparser import dxfshapes
+
+dxfile = (pathlib.Path(__file__).parents[2] /
+          'src' / 'tests' / 'data' / 'IPM-130-4.dxf')
+shapes = list(dxfshapes(str(dxfile)))
+
+
+class AllNodesGeometry(Geometry):
+    """searches the list of all graph nodes"""
+
+    def find_nodes(self, *points, **kwargs):
+        return super().find_nodes(*points, g=list(self.g))
+
+
+def shifted(e, dx, dy):
+    if isinstance(e, Arc):
+        return Arc(Element(center=(e.center[0]+dx, e.center[1]+dy),
+                           radius=e.radius,
+                           start_angle=e.startangle*180/np.pi,
+                           end_angle=e.endangle*180/np.pi))
+    return Line(Element(start=(e.p1[0]+dx, e.p1[1]+dy),
+                        end=(e.p2[0]+dx, e.p2[1]+dy)))
+
+
+def tiled(n, dist=150.0):
+    return [shifted(e, i*dist, j*dist)
+            for i in range(n) for j in range(n) for e in shapes]
+
+
+for n in (1, 2, 4, 8):
+    t0 = time.perf_counter()
+    ref = AllNodesGeometry(tiled(n), rtol=1e-3, atol=1e-3)
+    tall = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    geom = Geometry(tiled(n), rtol=1e-3, atol=1e-3)
+    tindex = time.perf_counter() - t0
+    assert list(ref.g.edges()) == list(geom.g.edges())
+    print(f"{geom.number_of_nodes():6d} nodes: all nodes {tall:7.2f} s, "
+          f"index {tindex:6.2f} s, speedup {tall/tindex:5.1f}")
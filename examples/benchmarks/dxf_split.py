@@ -0,0 +1,60 @@
+"""compare the runtime of intersect_and_split testing all pairs
+of elements with the bounding box grid of the candidates
+
+The shapes of the DXF test fixture are tiled n x n times with
+overlapping copies such that the elements intersect.
+"""
+import copy
+import time
+import pathlib
+import numpy as np
+import femagtools.dxfsl.geom as geom
+from femagtools.dxfsl.shape import Element, Line, Arc
+from femagtools.dxfsl.dxfparser import dxfshapes
+
+rtol, atol = 1e-3, 5e-3
+dxfile = (pathlib.Path(__file__).parents[2] /
+          'src' / 'tests' / 'data' / 'IPM-130-4.dxf')
+shapes = list(dxfshapes(str(dxfile)))
+
+
+def shifted(e, dx, dy):
+    if isinstance(e, Arc):
+        return Arc(Element(center=(e.center[0]+dx, e.center[1]+dy),
+                           radius=e.radius,
+                           start_angle=e.startangle*180/np.pi,
+                           end_angle=e.endangle*180/np.pi))
+    return Line(Element(start=(e.p1[0]+dx, e.p1[1]+dy),
+                        end=(e.p2[0]+dx, e.p2[1]+dy)))
+
+
+def tiled(n, dist=100.0):
+    return [shifted(e, i*dist, j*dist)
+            for i in range(n) for j in range(n) for e in shapes]
+
+
+def allpairs(inp_elements):
+    out_elements = []
+    for e in inp_elements:
+        geom.intersect_and_split_element(e, out_elements, 0,
+                                         len(out_elements), rtol, atol)
+    return out_elements
+
+
+def signature(elements):
+    return [(type(e).__name__, tuple(e.minmax()))
+            for e in elements if e is not None]
+
+
+for n in (1, 2):
+    elements = tiled(n)
+    t0 = time.perf_counter()
+    ref = allpairs(copy.deepcopy(elements))
+    tpairs = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    out = geom.intersect_and_split(copy.deepcopy(elements), rtol, atol)
+    tgrid = time.perf_counter() - t0
+    assert signature(ref) == signature(out)
+    print(f"{len(elements):5d} elements -> {len(signature(out)):5d}: "
+          f"all pairs {tpairs:7.2f} s, grid {tgrid:6.2f} s, "
+          f"speedup {tpairs/tgrid:5.1f}")
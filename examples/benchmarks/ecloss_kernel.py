@@ -0,0 +1,60 @@
+"""compare the runtime of the magnet eddy current loss kernel
+MagnLoss.loss with a loop over calc_pvpm per grid point and
+harmonic vs. the broadcast evaluation
+"""
+import time
+import numpy as np
+import femagtools.ecloss
+
+m = femagtools.ecloss.MagnLoss.__new__(femagtools.ecloss.MagnLoss)
+m.mur = 1.05
+m.sigma = 625000
+m.lm = 0.02
+m.ls = 0.1
+m.numpoles = 8
+m.segx = [1, 2, 4]
+m.segz = [1]
+m.is_x = True
+m.tgrid = 0.0025
+wm, hm = 0.02, 0.005
+
+rng = np.random.default_rng(0)
+ny, nx, lfft = 8, 30, 61
+bx_fft = 0.05*rng.random((ny, nx, lfft))
+by_fft = 0.2*rng.random((ny, nx, lfft))
+
+
+def loss_loop():
+    """evaluate calc_pvpm point by point"""
+    nu = np.abs(np.fft.fftfreq(nx, 1/nx))+1
+    mu = np.abs(np.fft.fftfreq(ny, 1/ny))+1
+    pec = 0
+    for s in m.segx:
+        p = 0
+        for c in range(lfft):
+            f = max(c/m.tgrid, 1e-6)
+            for ix in range(nx):
+                p += m.calc_pvpm(by_fft[0, ix, c], f, nu[ix],
+                                 wm/s, hm, 0)
+            for iy in range(ny):
+                p += m.calc_pvpm(bx_fft[iy, 0, c], f, mu[iy],
+                                 hm, wm/s, 0)
+        pec += p*(m.ls/m.lm)*m.numpoles*s
+    return pec*len(m.segz)
+
+
+t0 = time.perf_counter()
+p0 = loss_loop()
+tloop = time.perf_counter() - t0
+
+repeat = 10
+t0 = time.perf_counter()
+for _ in range(repeat):
+    p1 = m.loss(bx_fft, by_fft, np.zeros_like(bx_fft),
+                np.zeros_like(by_fft), wm, hm)
+tvec = (time.perf_counter() - t0)/repeat
+
+print(f"grid {ny}x{nx}, {lfft} harmonics, {len(m.segx)} segments")
+print(f"loop:      {1e3*tloop:8.1f} ms  loss {p0:.4f} W")
+print(f"broadcast: {1e3*tvec:8.1f} ms  loss {p1:.4f} W")
+print(f"speedup {tloop/tvec:.0f}")
@@ -0,0 +1,36 @@
+"""compare efficiency map runtime and results of
+the scalar and the batch operating point solver
+"""
+import time
+import numpy as np
+import femagtools.bch
+import femagtools.machine
+from femagtools.machine.effloss import efficiency_losses_map
+import logging
+
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s %(message)s')
+
+filename = '../../src/tests/data/ldq-losses.BATCH'
+bch = femagtools.read_bchfile(filename)
+pm = femagtools.machine.create(bch, r1=0.05, ls=1e-4)
+
+u1 = 230.0
+Tmax = 150.0
+nmax = 6000/60
+npoints = (60, 40)
+
+results = []
+for with_batch in (False, True):
+    t0 = time.perf_counter()
+    r = efficiency_losses_map(pm, u1, Tmax, 0, nmax, npoints=npoints,
+                              with_batch=with_batch)
+    elapsed = time.perf_counter() - t0
+    results.append((elapsed, r))
+    print(f"with_batch={with_batch!s:5}: {len(r['n'])} samples "
+          f"{elapsed:.2f} s")
+
+print(f"speedup {results[0][0]/results[1][0]:.1f}")
+for k in ('iq', 'id', 'eta'):
+    d = np.abs(np.array(results[0][1][k]) - np.array(results[1][1][k]))
+    print(f"max deviation {k}: {np.nanmax(d):.2e}")
@@ -0,0 +1,42 @@
+"""compare runtime of efficiency maps at several temperatures
+with a new process per chunk and a persistent OperatingPointPool
+"""
+import time
+import copy
+import femagtools.bch
+from femagtools.machine.effloss import (efficiency_losses_map,
+                                        OperatingPointPool)
+import logging
+
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s %(message)s')
+
+filename = '../../src/tests/data/ldq-losses.BATCH'
+bch = femagtools.read_bchfile(filename)
+
+# same dq parameters at 2 magnet temperatures
+ldq = [dict(temperature=t, **copy.deepcopy(bch.ldq)) for t in (20, 120)]
+for p in ldq:
+    p['losses']['ef'] = [2.0, 2.0]
+    p['losses']['speed'] = bch.ldq['losses']['speed']
+eecpars = dict(m=3, p=bch.machine['p'], r1=0.05, ls1=1e-4, ldq=ldq)
+
+u1 = 230.0
+Tmax = 150.0
+nmax = 6000/60
+npoints = (30, 20)
+num_proc = 4
+temperatures = [(20, 20), (60, 60), (90, 90), (120, 120)]
+
+t0 = time.perf_counter()
+for temp in temperatures:
+    efficiency_losses_map(eecpars, u1, Tmax, temp, nmax, npoints=npoints,
+                          num_proc=num_proc)
+t1 = time.perf_counter()
+with OperatingPointPool(num_proc, eecpars) as pool:
+    for temp in temperatures:
+        efficiency_losses_map(eecpars, u1, Tmax, temp, nmax,
+                              npoints=npoints, pool=pool)
+t2 = time.perf_counter()
+print(f"{len(temperatures)} maps with num_proc={num_proc}: {t1-t0:.2f} s")
+print(f"{len(temperatures)} maps with pool: {t2-t1:.2f} s")
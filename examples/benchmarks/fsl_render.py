@@ -0,0 +1,88 @@
+"""compare the FSL generation time of a parameter study with a
+mutable model (magnet height varies) without and with the render
+cache of fsl.Builder and the first build of a new Builder with
+templates compiled in memory vs. compiled modules of a module_directory
+"""
+import time
+import tempfile
+import femagtools.fsl
+import femagtools.model
+
+machine = dict(
+    name="PM 130 L4",
+    outer_diam=0.13,
+    bore_diam=0.07,
+    inner_diam=0.015,
+    airgap=0.001,
+    lfe=0.1,
+    poles=4,
+    stator=dict(
+        num_slots=12,
+        num_slots_gen=3,
+        mcvkey_yoke="dummy",
+        rlength=1.0,
+        statorRotor3=dict(
+            slot_height=0.02,
+            slot_h1=0.002,
+            slot_h2=0.004,
+            slot_r1=0.0,
+            slot_r2=0.0,
+            wedge_width1=0.0,
+            wedge_width2=0.0,
+            middle_line=0,
+            tooth_width=0.009,
+            slot_top_sh=0,
+            slot_width=0.003)),
+    magnet=dict(
+        mcvkey_yoke="dummy",
+        magnetSector=dict(
+            magn_num=1,
+            magn_width_pct=0.8,
+            magn_height=0.004,
+            magn_shape=0.0,
+            bridge_height=0.0,
+            magn_type=1,
+            condshaft_r=0.02,
+            magn_ori=2,
+            magn_rfe=0.0,
+            bridge_width=0.0,
+            magn_len=1.0)),
+    windings=dict(
+        num_phases=3,
+        num_layers=1,
+        num_wires=4,
+        coil_span=3))
+
+simulation = dict(
+    calculationMode="cogg_calc",
+    magn_temp=60.0,
+    speed=50.0,
+    lfe=0.1,
+    move_action=0,
+    range_phi=180)
+
+
+def study(builder, num_samples):
+    """create the FSL of all samples, return time per sample"""
+    t0 = time.perf_counter()
+    for i in range(num_samples):
+        model = femagtools.model.MachineModel(machine)
+        model.magnet['magnetSector']['magn_height'] = 0.004 + 1e-5*i
+        builder.create_model(model) + builder.create_analysis(simulation)
+    return (time.perf_counter() - t0)/num_samples
+
+
+num_samples = 200
+tnocache = study(femagtools.fsl.Builder(render_cache_size=0), num_samples)
+tcache = study(femagtools.fsl.Builder(), num_samples)
+print(f"{num_samples} samples")
+print(f"no render cache: {1e3*tnocache:6.2f} ms per sample")
+print(f"render cache:    {1e3*tcache:6.2f} ms per sample")
+print(f"speedup {tnocache/tcache:.1f}")
+
+with tempfile.TemporaryDirectory() as moddir:
+    tmem = study(femagtools.fsl.Builder(), 1)
+    study(femagtools.fsl.Builder(module_directory=moddir), 1)
+    tmod = study(femagtools.fsl.Builder(module_directory=moddir), 1)
+print(f"first sample of a new Builder: in memory {1e3*tmem:6.1f} ms, "
+      f"module_directory {1e3*tmod:6.1f} ms")
@@ -0,0 +1,24 @@
+"""compare the write time and the file size of the ASCII MSH 2.2
+and compressed base64 VTU export of a FEMAG model with the binary MSH 4.1
+and the raw appended VTU export
+"""
+import os
+import time
+import pathlib
+import tempfile
+from femagtools import convert, nc
+
+ncfile = (pathlib.Path(__file__).parents[2] /
+          'src' / 'tests' / 'data' / 'zzz_pm_model_ts.nc')
+isa = nc.read(str(ncfile))
+
+with tempfile.TemporaryDirectory() as tmpdir:
+    for fmt in ('msh', 'vtu'):
+        for binary in (False, True):
+            filename = os.path.join(tmpdir, f'model_{binary}.{fmt}')
+            t0 = time.perf_counter()
+            getattr(convert, 'to_' + fmt)(isa, filename, binary=binary)
+            elapsed = time.perf_counter() - t0
+            print(f"{fmt} {'binary' if binary else 'ascii ':6s}: "
+                  f"{elapsed:6.2f} s, "
+                  f"{os.path.getsize(filename)/1024:8.0f} kB")
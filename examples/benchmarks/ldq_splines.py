@@ -0,0 +1,40 @@
+"""compare efficiency map runtime of PmRelMachineLdq
+with spline fitting per call and cached splines
+"""
+import time
+import numpy as np
+import femagtools.bch
+import femagtools.machine
+from femagtools.machine.effloss import efficiency_losses_map
+import logging
+
+logging.basicConfig(level=logging.WARNING,
+                    format='%(asctime)s %(message)s')
+
+filename = '../bch-erg/TEST_001.BCH'
+bch = femagtools.read_bchfile(filename)
+
+u1 = 230.0
+Tmax = 170.0
+nmax = 4200/60
+npoints = (20, 12)
+
+results = []
+for cache_splines in (False, True):
+    pm = femagtools.machine.PmRelMachineLdq(3, bch.machine['p'],
+                                            r1=0.1, ls=1e-4,
+                                            ld=bch.ldq['ld'],
+                                            lq=bch.ldq['lq'],
+                                            psim=bch.ldq['psim'],
+                                            beta=bch.ldq['beta'],
+                                            i1=bch.ldq['i1'],
+                                            cache_splines=cache_splines)
+    t0 = time.perf_counter()
+    r = efficiency_losses_map(pm, u1, Tmax, 0, nmax, npoints=npoints)
+    elapsed = time.perf_counter() - t0
+    results.append((elapsed, np.array([r['iq'], r['id']])))
+    print(f"cache_splines={cache_splines!s:5}: {len(r['n'])} samples "
+          f"{elapsed:.2f} s")
+
+print(f"speedup {results[0][0]/results[1][0]:.1f}, "
+      f"max iqd deviation {np.nanmax(np.abs(results[0][1]-results[1][1])):.2e} A")
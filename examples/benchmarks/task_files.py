@@ -0,0 +1,50 @@
+"""compare the setup time of task directories that get copies of
+the shared input files (magnetizing curves, DXF) with task directories
+that link them from a content-addressed FileStore
+"""
+import os
+import time
+import tempfile
+import pathlib
+import femagtools.job
+
+num_tasks = 300
+sizes = dict(zip(['M270-35A.MCV', 'M330-50A.MCV', 'rotor.dxf'],
+                 [2 << 20, 2 << 20, 4 << 20]))
+
+
+def setup(workdir, inputs, store=None):
+    """create the task directories, return elapsed time"""
+    tstart = time.perf_counter()
+    job = femagtools.job.Job(workdir)
+    job.set_file_store(store)
+    for i in range(num_tasks):
+        task = job.add_task()
+        for f in inputs:
+            task.add_file(f)
+        task.add_file('femag.fsl', ['exit_on_end = true'])
+    job.prepare()
+    elapsed = time.perf_counter() - tstart
+    job.cleanup()
+    return elapsed
+
+
+with tempfile.TemporaryDirectory() as tmpdir:
+    tmpdir = pathlib.Path(tmpdir)
+    inputs = []
+    for name, size in sizes.items():
+        f = tmpdir / name
+        f.write_bytes(os.urandom(size))
+        inputs.append(str(f))
+
+    tcopy = setup(tmpdir / 'copy', inputs)
+    store = femagtools.job.FileStore(tmpdir / 'store')
+    tlink = setup(tmpdir / 'link', inputs, store)
+
+print(f"{num_tasks} tasks, {sum(sizes.values())/2**20:.0f} MB shared inputs")
+print(f"copy:       {tcopy:6.2f} s")
+print(f"file store: {tlink:6.2f} s")
+print(f"speedup {tcopy/tlink:.0f}")
+stats = store.stats()
+print(f"saved {stats['bytes_saved']/2**20:.0f} MB, "
+      f"estimated {stats['time_saved']:.2f} s")
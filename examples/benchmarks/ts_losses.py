@@ -0,0 +1,55 @@
+"""compare the runtime of the FEMAG-TS iron and ohmic loss evaluation
+with a loop over all elements vs. the array based evaluation
+
+The vtu files are read before the timing: the speedup is that of the
+loss evaluation only. Methods like Losses.iron_losses_fft include
+reading the vtu files and gain much less (about 4x on the test model).
+"""
+import sys
+import time
+import pathlib
+import femagtools.ts
+
+datadir = pathlib.Path(__file__).parents[2] / 'src' / 'tests' / 'data'
+modelname = datadir / 'zzz_pm_model_ts'
+dirname = datadir / 'zzz_pm_model_ts_results_1'
+if len(sys.argv) > 2:
+    modelname, dirname = sys.argv[1:3]
+
+losses = femagtools.ts.Losses(modelname, dirname)
+losses.times = femagtools.ts.TimeRange(losses.vtu_data, losses.nc_model)
+model = losses.nc_model
+print(f"{len(model.elements)} elements, {len(losses.times.vector)} time steps")
+
+
+def element_loop(ellosses, superelements):
+    total = 0.0
+    for se in superelements:
+        for el in se.elements:
+            v = ellosses(el, se)
+            total += v['total'] if isinstance(v, dict) else v
+    return total*model.scale_factor()
+
+
+iron = [se for se in model.superelements if losses._is_iron(se)]
+conductors = [se for se in model.superelements if se.conduc > 0]
+# exclude reading of vtu files
+losses.vtu_data.read_data(['b', 'curd'])
+losses.vtu_data.get_tensor('b')
+losses.vtu_data.get_tensor('curd')
+for name, ellosses, superelements, arrays in (
+        ('iron fft', losses.iron_losses_fft_el, iron,
+         lambda: losses._iron_element_losses(iron, "fft")),
+        ('iron time', losses.iron_lossenergy_time_el, iron,
+         lambda: losses._iron_element_losses(iron, "time")),
+        ('ohm time', losses.ohm_lossenergy_el, conductors,
+         lambda: losses._ohm_element_losses(conductors, "time"))):
+    t0 = time.perf_counter()
+    p0 = element_loop(ellosses, superelements)
+    tloop = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    ses, counts, index, p = arrays()
+    tarr = time.perf_counter() - t0
+    p1 = p.sum()*model.scale_factor()
+    print(f"{name:10}: loop {1e3*tloop:8.1f} ms  arrays {1e3*tarr:7.1f} ms"
+          f"  speedup {tloop/tarr:6.1f}  deviation {abs(p1-p0)/abs(p0):.1e}")
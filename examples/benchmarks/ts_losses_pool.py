@@ -0,0 +1,42 @@
+"""compare the runtime of the FEMAG-TS iron loss evaluation
+with different numbers of worker processes
+
+usage: python ts_losses_pool.py [modelname dirname] [num_proc ...]
+"""
+import sys
+import time
+import pathlib
+import collections
+import femagtools.ts
+
+datadir = pathlib.Path(__file__).parents[2] / 'src' / 'tests' / 'data'
+modelname = datadir / 'zzz_pm_model_ts'
+dirname = datadir / 'zzz_pm_model_ts_results_1'
+args = sys.argv[1:]
+if len(args) > 1 and not args[0].isdigit():
+    modelname, dirname = args[:2]
+    args = args[2:]
+num_procs = [int(a) for a in args] or [0, 2, 4]
+chunksize = 1000
+
+results = {}
+for num_proc in num_procs:
+    with femagtools.ts.Losses(modelname, dirname, num_proc=num_proc,
+                              chunksize=chunksize) as losses:
+        losses.vtu_data.get_tensor('b')  # exclude reading of vtu files
+        t0 = time.perf_counter()
+        p = losses.iron_losses_fft()
+        e = losses.iron_lossenergy_time()
+        elapsed = time.perf_counter() - t0
+        busy = collections.defaultdict(float)
+        for t in losses.chunk_timing:
+            busy[t['pid']] += t['elapsed']
+    results[num_proc] = (elapsed, p, e)
+    print(f"num_proc {num_proc:2d}: {elapsed:6.2f} s  "
+          f"{len(losses.chunk_timing)} chunks, busy time per process "
+          + ' '.join(f"{b:.2f}" for b in busy.values()))
+
+elapsed0, p0, e0 = results[num_procs[0]]
+for num_proc, (elapsed, p, e) in results.items():
+    print(f"num_proc {num_proc:2d}: speedup {elapsed0/elapsed:5.1f}  "
+          f"identical results {p == p0 and e == e0}")
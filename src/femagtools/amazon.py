@@ -329,6 +329,7 @@ class Engine(object):
         Return:
             length of started tasks (int)
         """
+        self.job.prepare()
         self._create_data_buckets()
         self._upload_files_to_s3()
         self._start_instances()
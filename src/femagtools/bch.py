@@ -35,6 +35,16 @@ def floatnan(s):
         return float('NaN')
 
 
+def _loadtable(lines, sep=None):
+    """converts lines of numbers to 2d array
+    returns NaN on conversion error"""
+    rows = [l.split(sep) for l in lines]
+    try:
+        return np.array(rows, dtype=float)
+    except ValueError:
+        return np.array([[floatnan(x) for x in r] for r in rows])
+
+
 def r1_20(r1, theta):
     return r1/(1+alpha20*(theta-20))
 
@@ -96,22 +106,26 @@ def sttylosses(losses):
     return {}
 
 
-def _readSections(f):
+def _readSections(f, wanted=None):
     """return list of bch sections
 
     sections are surrounded by lines starting with '[***'
 
     Args:
       param f (file) BCH file to be read
+      param wanted (function) is called with the first non-empty line
+        of each section. The section is skipped if it returns False.
 
     Returns:
       list of sections
     """
 
     section = []
+    skip = False
+    titled = wanted is None
     for line in f:
         if line.startswith('[****'):
-            if section:
+            if section and not skip:
                 # skip empty lines
                 i = 0
                 try:
@@ -120,16 +134,88 @@ def _readSections(f):
                 except IndexError:
                     i = i-1
                 yield section[i:]
-                section = []
-        else:
-            section.append(line.strip())
-    yield section
+            section = []
+            skip = False
+            titled = wanted is None
+        elif not skip:
+            line = line.strip()
+            if not titled and line:
+                titled = True
+                if not wanted(line):
+                    skip = True
+                    continue
+            section.append(line)
+    if not skip:
+        yield section
 
 
 class Reader:
     """Reads a BCH/BATCH-File"""
     _numPattern = re.compile(r'([+-]?\d+(?:\.\d+)?(?:[eE][+-]\d+)?)\s*')
     _numPatternNaN = re.compile(r'([+-]?\d+(?:\.\d+)?(?:[eE][+-]\d+)?|nan)\s*')
+    # result keys of sections
+    section_keys = {
+        'General Machine Data': ('machine', 'armatureLength'),
+        'Weigths': ('weights', 'weight'),
+        'Number of Nodes': ('nodes', 'elements', 'quality', 'type'),
+        'Winding-Factors': ('wdgfactors',),
+        'Machine Data': ('machine',),
+        'Torque-Force': ('torque', 'torque_fft'),
+        'Airgap Induction Br': ('airgapInduction',),
+        'Machine excitation': ('machine',),
+        'DQ-Parameter for open Winding Modell': ('dqPar',),
+        'Magnet Data': ('magnet',),
+        'Date': ('date',),
+        'Inertia': ('inertia',),
+        'Fe-Hysteresis- and Eddy current Losses[W] > 0.1 % Max':
+        ('losses',),
+        'Losses [W]': ('losses', 'external_rotor'),
+        'Losses for speed [1/min]': ('ldq', 'psidq'),
+        'Losses from PSID-Psiq-Identification for speed [1/min]':
+        ('psidq',),
+        'Magnet loss data': ('magnet',),
+        'Project File name': ('project',),
+        'File name': ('filename',),
+        'Windings input data': ('windings',),
+        'Control parameters for Loss calculation': ('lossPar',),
+        'PSID-Psiq-Identification': ('psidq',),
+        'Ld-Lq-Identifikation aus PSID-Psiq-Identification':
+        ('psidq_ldq',),
+        'Ld-Lq-Identification': ('ldq',),
+        'Ld-Lq-Identification RMS-values': ('ldq',),
+        'Current Angles defined from no-load test':
+        ('current_angles', 'torque_opt'),
+        'FEMAG Version': ('version',),
+        'FEMAG Classic Version': ('version',),
+        'Simulation Data': ('machine', 'leak_dist_wind'),
+        'Area [mm**2]': ('areas',),
+        'Calculation time [sec]': ('calctime',),
+        'Demagnetisation': ('demag',),
+        'Transient short circuit': ('scData',),
+        'Peak winding currents': ('scData',),
+        'Flux observed': ('flux', 'flux_fft'),
+        'Linear Force': ('linearForce', 'linearForce_fft'),
+        'Demagnetization Data': ('demag',),
+        'Power Situation (VZS)': ('powerSituation',),
+        '** Characteristics of Permanent-Magnet-Motors **':
+        ('characteristics',)}
+    # sections that are always read if sections or keys are selected
+    base_sections = ('FEMAG Version', 'FEMAG Classic Version',
+                     'Project File name', 'File name', 'Date',
+                     'Number of Nodes', 'General Machine Data')
+    # sections that use the results of other sections
+    _section_requires = {
+        'Airgap Induction Br': ('Ld-Lq-Identification',
+                                'Ld-Lq-Identification RMS-values',
+                                'PSID-Psiq-Identification'),
+        'Losses for speed [1/min]': ('Ld-Lq-Identification',
+                                     'Ld-Lq-Identification RMS-values',
+                                     'PSID-Psiq-Identification'),
+        'Losses from PSID-Psiq-Identification for speed [1/min]': (
+            'PSID-Psiq-Identification',),
+        'Fe-Hysteresis- and Eddy current Losses[W] > 0.1 % Max': (
+            'Losses [W]',),
+        'DQ-Parameter for open Winding Modell': ('Machine Data',)}
 
     def __init__(self):
         self._fft = None
@@ -229,23 +315,67 @@ class Reader:
             '** Characteristics of Permanent-Magnet-Motors **':
             Reader.__read_characteristics}
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['dispatch']
+        return state
+
+    def __setstate__(self, state):
+        self.__init__()
+        self.__dict__.update(state)
+
     def getStep(self):
         """@returns displacement step of flux values"""
         if len(self.flux) > 0:
             return self.flux[0]['displ'][1]-self.flux[0]['displ'][0]
         return None
 
-    def read(self, content):
+    def _selected_sections(self, sections, keys):
+        """return set of section titles to be read for sections and keys
+        (None if all sections are read)"""
+        if sections is None and keys is None:
+            return None
+        selected = set(sections or []) | set(self.base_sections)
+        if keys:
+            selected |= {t for t, k in self.section_keys.items()
+                         if set(k) & set(keys)}
+        for t in list(selected):
+            selected |= set(self._section_requires.get(t, ()))
+        return selected
+
+    def read(self, content, sections=None, keys=None):
         """read bch file
 
         Args:
           content (str or list of str) the text lines of the BCH file
+          sections (list of str) titles of sections to be read
+             (see section_keys, default: all)
+          keys (list of str) result keys to be read, such as
+             'machine', 'torque', 'losses' (default: all)
         """
         if isinstance(content, str):
             lines = content.split('\n')
         else:
             lines = content
-        for s in _readSections(lines):
+
+        selected = self._selected_sections(sections, keys)
+
+        def wanted(line):
+            title = line.split(':')[0].strip()
+            if title == 'Function':
+                title = line.split(':')[1].strip()
+            if title != 'Fourier Analysis':
+                if title in selected:
+                    return True
+                self._fft = None
+                return False
+            k = 'Airgap Induction Br'
+            if line.split(':')[1].strip()[:len(k)] == k:
+                return k in selected
+            return self._fft is not None
+
+        for s in _readSections(lines,
+                               None if selected is None else wanted):
             if not s:
                 continue
             title = s[0].split(':')[0].strip()
@@ -668,13 +798,12 @@ class Reader:
             for k, l in enumerate(content[i+3:]):
                 if l.startswith('[[***'):
                     break
-                rec = l.split('\t')
-                if len(rec) == 6:
-                    m.append([floatnan(x) for x in rec])
+                if l.count('\t') == 5:
+                    m.append(l)
         else:
             k = -3
         if m:
-            m = np.array(m).T
+            m = _loadtable(m, '\t').T
             ncols = len(set(m[1]))
             i1 = np.reshape(m[0], (-1, ncols)).T[0]
             nrows = len(i1)
@@ -705,6 +834,14 @@ class Reader:
             if not l:
                 continue
             if l.startswith('Speed') and m:
+                try:
+                    m = np.array([r.split() for r in m], dtype=float)
+                    if m.shape[1] < 4:
+                        raise ValueError()
+                except ValueError:
+                    m = [[floatnan(x) for x in rec]
+                         for rec in [self.__findNums(r) for r in m]
+                         if len(rec) > 3]
                 if nsec == 0:
                     m = np.array(m).T
                 else:
@@ -713,10 +850,8 @@ class Reader:
                     characteristics['speed_torque'][k] = m[j].tolist()
                 m = []
                 nsec += 1
-            else:
-                rec = self.__findNums(l)
-                if len(rec) > 3:
-                    m.append([floatnan(x) for x in rec])
+            elif not l.startswith('Speed'):
+                m.append(l)
 
         self.characteristics.append(characteristics)
 
@@ -1155,15 +1290,14 @@ class Reader:
         logger.info('losses for speed %f', speed)
         nl = 4
         for l in content[4:]:
-            rec = l.split('\t')
-            if len(rec) > 1:
-                if rec[0].startswith('P fe'):
+            if '\t' in l:
+                if l.startswith('P fe'):
                     break
-                m.append([floatnan(x) for x in rec])
+                m.append(l)
             nl += 1
         if not m:
             return
-        m = np.array(m).T
+        m = _loadtable(m, '\t').T
         ncols = np.argmax(np.abs(m[1][1:]-m[1][:-1]))+1
         if ncols == 1 and len(m[1]) > 1 and m[1][0] != m[1][1]:
             ncols = 2
@@ -1181,25 +1315,19 @@ class Reader:
             ls = {k: np.reshape(v[:mlen],
                                 (nrows, ncols)).T.tolist()
                   for k, v in zip(cols, m[2:])}
-        m = []
-        for l in content[nl+3:]:
-            rec = l.split('\t')
-            if not rec and m:
-                break
-            if len(rec) > 5:
-                m.append([floatnan(x) for x in rec])
+        m = [l for l in content[nl+3:] if l.count('\t') > 4]
 
         cols = []
         for s in subregs[:-2] + ['rotor', 'magnet']:
             cols += [s+'_hyst', s+'_eddy']
         if m:
+            m = _loadtable(m, '\t').T
             # FEMAG-2024.2
-            if len(m[0]) > len(subregs[:-1])*2+2:
+            if len(m) > len(subregs[:-1])*2+2:
                 cols = []
                 for s in subregs[:-2] + ['rotor', 'magnet']:
                     cols += [s+'_hyst', s+'_eddy', s+'_excess']
 
-            m = np.array(m).T
             if self.ldq:
                 ls.update({k: np.reshape(v[:mlen],
                                          (nrows, ncols)).T[::-1].tolist()
@@ -1749,12 +1877,18 @@ class Reader:
         return self.__str__()
 
 
-def read(filename):
-    """Read BCH/BATCH results from file *filename*."""
+def read(filename, sections=None, keys=None):
+    """Read BCH/BATCH results from file *filename*.
+
+    Args:
+      filename: name of BCH/BATCH file
+      sections: (list of str) titles of sections to be read (default all)
+      keys: (list of str) result keys to be read (default all)
+    """
     import io
     bchresults = Reader()
     with io.open(filename, encoding='latin1', errors='ignore') as f:
-        bchresults.read(f.readlines())
+        bchresults.read(f.readlines(), sections=sections, keys=keys)
     return bchresults
 
 
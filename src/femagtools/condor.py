@@ -122,6 +122,7 @@ class CondorCluster(object):
 
 class Engine(object):
     """manages calculation tasks in a HTCondor environment"""
+    history_polls = 5  # polls of condor_history after the queue drained
 
     def __init__(self):
         self.job = None
@@ -180,6 +181,7 @@ class Engine(object):
         return condorCl.getClusterData(directory)
 
     def submit(self, extra_result_files=[]):
+        self.job.prepare()
         submitfile = self.job.prepareDescription()
         cmdout = subprocess.check_output(["condor_submit", submitfile])
         self.clusterId = re.findall(r'\d+', cmdout.decode('utf-8'))[-1]
@@ -187,6 +189,38 @@ class Engine(object):
                     self.clusterId, self.job.basedir, len(self.job.tasks))
         return self.clusterId
 
+    def as_completed(self):
+        """yield the tasks of the submitted cluster as they terminate"""
+        if not self.clusterId:
+            logger.warn('no condor cluster')
+            return
+        pending = set(range(len(self.job.tasks)))
+        # the history may lag behind the queue:
+        # poll it a few times after the queue has drained
+        polls = self.history_polls
+        while pending and polls > 0:
+            time.sleep(2)
+            cmdout = subprocess.check_output(
+                ["condor_q", "-json", self.clusterId])
+            if not cmdout or len(json.loads(cmdout.decode('utf-8'))) == 0:
+                polls -= 1
+            cmdout = subprocess.check_output(
+                ["condor_history", '-json', self.clusterId])
+            hist = json.loads(cmdout.decode('utf-8')) if cmdout else []
+            for jobinfo in hist:
+                taskid = jobinfo.get('ProcId', 0)
+                status = 'C' if jobinfo.get('JobStatus', 1) == 4 else \
+                    'X' if jobinfo.get('JobStatus', 1) == 3 else 'E'
+                if taskid in pending and status != 'E':
+                    pending.remove(taskid)
+                    logger.info('status %d: %s', taskid, status)
+                    self.job.setExitStatus(taskid, status)
+                    yield self.job.tasks[taskid]
+        for taskid in sorted(pending):
+            logger.warning('status %d: not in history', taskid)
+            self.job.setExitStatus(taskid, 'X')
+            yield self.job.tasks[taskid]
+
     def join(self):
         """wait for all tasks to be terminated and return status"""
         ret = []
@@ -19,30 +19,82 @@ output_filetypes = [
     "msh", "geo", "vtu"]
 
 
+def _element_keys(elements):
+    """return the set of keys of the elements in the sequence"""
+    return set(e.key for e in elements if isinstance(e, isa7.Element))
+
+
+def _entity_blocks(points, blocks, cell_data, geometrical):
+    """split the cell blocks by their geometrical id and return
+    blocks, cell data and the entity (dim, tag) of each point
+    as required by MSH 4.1"""
+    dims = dict(line=1, triangle=2, quad=2)
+    dim_tags = np.zeros((len(points), 2), dtype=int)
+    entity_blocks = []
+    entity_data = defaultdict(list)
+    # nodes of lines are assigned last to keep the boundary entities
+    order = sorted(range(len(blocks)), key=lambda i: -dims[blocks[i][0]])
+    for i in order:
+        cell_type, data = blocks[i]
+        ids = cell_data[geometrical][i]
+        for tag in np.unique(ids):
+            sel = ids == tag
+            entity_blocks.append((cell_type, data[sel]))
+            for k, v in cell_data.items():
+                entity_data[k].append(v[i][sel])
+            dim_tags[data[sel].ravel()] = dims[cell_type], tag
+
+    # every entity needs at least one node: take it from
+    # an entity that has more than one
+    entities, counts = np.unique(dim_tags, axis=0, return_counts=True)
+    numnodes = {tuple(dt): c for dt, c in zip(entities.tolist(), counts)}
+    for (cell_type, data), ids in zip(entity_blocks,
+                                      entity_data[geometrical]):
+        entity = dims[cell_type], int(ids[0])
+        if entity in numnodes:
+            continue
+        for n in data.ravel():
+            owner = tuple(dim_tags[n].tolist())
+            if numnodes[owner] > 1:
+                numnodes[owner] -= 1
+                numnodes[entity] = 1
+                dim_tags[n] = entity
+                break
+    return entity_blocks, entity_data, dim_tags
+
+
 def _from_isa(isa, filename, target_format,
-              extrude=0, layers=0, recombine=False):
+              extrude=0, layers=0, recombine=False, binary=False):
 
+    # nodes and elements are compared by identity:
+    # use sets for all membership tests
+    airgap_outer_vertices = set()
     try:
-        airgap_outer_vertices = [v for e in isa.airgap_outer_elements
-                                 for v in e.vertices]
+        airgap_outer_vertices = set(v for e in isa.airgap_outer_elements
+                                    for v in e.vertices)
     except AttributeError:
         logger.warning("airgap radius is not set in source file")
 
-    airgap_lines = []
+    airgap_lines = set()
     for e in isa.airgap_center_elements:
+        if not isinstance(e, isa7.Element):
+            continue
         ev = e.vertices
         for i, v1 in enumerate(ev):
             v2 = ev[i-1]
             if v1 in airgap_outer_vertices and \
                v2 in airgap_outer_vertices:
-                airgap_lines.append((v1, v2))
+                airgap_lines.add((v1, v2))
+    airgap_inner_keys = (_element_keys(isa.airgap_inner_elements) |
+                         _element_keys(isa.airgap_center_elements))
+    airgap_outer_keys = _element_keys(isa.airgap_outer_elements)
 
-    nodechain_links = defaultdict(list)
+    nodechain_links = defaultdict(set)
     for n in isa.nodechains:
-        nodechain_links[n.node1].extend(n.nodes)
-        nodechain_links[n.node2].extend(n.nodes)
+        nodechain_links[n.node1].update(n.nodes)
+        nodechain_links[n.node2].update(n.nodes)
         if n.nodemid is not None:
-            nodechain_links[n.nodemid].extend(n.nodes)
+            nodechain_links[n.nodemid].update(n.nodes)
 
     physical_lines = ["v_potential_0",
                       "v_potential_const",
@@ -87,10 +139,13 @@ def _from_isa(isa, filename, target_format,
         if node.bndcnd == 8 or node.bndcnd == 9:
             return 1  # vpot 0
 
+    surface_ids = {name: i + len(physical_lines) + 1
+                   for i, name in enumerate(physical_surfaces)}
+
     def physical_surface(e):
 
         def surface_id(name):
-            return physical_surfaces.index(name) + len(physical_lines) + 1
+            return surface_ids[name]
 
         if any(e.mag):
             if e.mag[0] > 0:
@@ -101,10 +156,10 @@ def _from_isa(isa, filename, target_format,
                 return surface_id("PM3")
             return surface_id("PM4")
 
-        if e in isa.airgap_inner_elements or e in isa.airgap_center_elements:
+        if e.key in airgap_inner_keys:
             return surface_id("Airgap_Inner")
 
-        if e in isa.airgap_outer_elements:
+        if e.key in airgap_outer_keys:
             return surface_id("Airgap_Outer")
 
         sr_key = isa.superelements[e.se_key].sr_key
@@ -124,30 +179,60 @@ def _from_isa(isa, filename, target_format,
 
     def line_on_boundary(n1, n2):
         if n1.on_boundary() and n2.on_boundary():
-            if n1 in nodechain_links.keys():
+            if n1 in nodechain_links:
                 return n2 in nodechain_links[n1]
             else:
                 return False
         else:
             return (n1, n2) in airgap_lines or (n2, n1) in airgap_lines
 
-    points = [[n.x, n.y, 0] for n in isa.nodes]
-    vpot = [n.vpot[0] for n in isa.nodes]
+    points = np.zeros((len(isa.node_xy), 3))
+    points[:, :2] = isa.node_xy
+    # keep the precision of the file: the element values are
+    # computed in float64 and rounded to it as well
+    vpot = isa.node_vpot[:, 0].astype(isa.float_dtype)
+
+    def rounded(values):
+        return np.array(values, dtype=isa.float_dtype).astype(float)
+
+    try:
+        magtemp = isa.MAGN_TEMPERATURE
+    except AttributeError:
+        magtemp = 20
+
+    # connectivity of all elements from the vertex arrays of isa
+    cell_types = {3: "triangle", 4: "quad"}
+    elements = list(isa.elements)
+    index = np.array([e.key - 1 for e in elements], dtype=int)
+    ptr = isa.element_nodes_ptr
+    numvertices = ptr[index + 1] - ptr[index]
+    cells = dict()
+    geometrical_ids = dict()
+    for n, cell_type in cell_types.items():
+        el = index[numvertices == n]
+        cells[cell_type] = isa.element_nodes[
+            ptr[el][:, None] + np.arange(n)].astype(int)
+        geometrical_ids[cell_type] = isa.element_se_key[el].astype(int)
+    unsupported = ~np.isin(numvertices, list(cell_types))
+    if np.any(unsupported):
+        logger.warning("%s: %d elements with %s vertices skipped",
+                       filename, np.sum(unsupported),
+                       np.unique(numvertices[unsupported]).tolist())
 
     lines = []
     line_ids = []
-    triangles = []
-    quads = []
     physical_ids = dict(triangle=[], quad=[])
-    geometrical_ids = dict(triangle=[], quad=[])
     b = dict(triangle=[], quad=[])
     h = dict(triangle=[], quad=[])
     perm = dict(triangle=[], quad=[])
     iron_losses = dict(triangle=[], quad=[])
     mag_losses = dict(triangle=[], quad=[])
     wdg_losses = dict(triangle=[], quad=[])
-    for e in isa.elements:
+    for e in elements:
         ev = e.vertices
+        cell_type = cell_types.get(len(ev))
+        if cell_type is None:
+            continue
 
         for i, v in enumerate(ev):
             v1, v2 = v, ev[i-1]
@@ -155,21 +240,7 @@ def _from_isa(isa, filename, target_format,
                 lines.append([v1.key - 1, v2.key - 1])
                 line_ids.append(physical_line(v1, v2))
 
-        if len(ev) == 3:
-            triangles.append([n.key - 1 for n in ev])
-            cell_type = "triangle"
-
-        elif len(ev) == 4:
-            quads.append([n.key - 1 for n in ev])
-            cell_type = "quad"
-
-        try:
-            magtemp = isa.MAGN_TEMPERATURE
-        except AttributeError:
-            magtemp = 20
-
         physical_ids[cell_type].append(physical_surface(e))
-        geometrical_ids[cell_type].append(e.se_key)
         b[cell_type].append(e.flux_density())
         h[cell_type].append(e.demagnetization(magtemp))
         perm[cell_type].append(e.permeability())
@@ -178,65 +249,66 @@ def _from_isa(isa, filename, target_format,
         wdg_losses[cell_type].append(e.wdg_loss_density())
 
     logger.info("%s: Lines %d, Triangles %d, Quads %d",
-                filename, len(lines), len(triangles), len(quads))
+                filename, len(lines), len(cells['triangle']),
+                len(cells['quad']))
 
-    if target_format == "msh":
-        import meshio
-
-        points = np.array(points)
-        point_data = {"potential": np.array(vpot)}
-
-        cells = []
+    def cell_blocks(geometrical, physical, demagnetization):
+        """return cells and cell data with the given names of the
+        geometrical and physical ids and of the demagnetization"""
+        blocks = []
         cell_data = defaultdict(list)
 
         if lines:
-            cells.append(("line", np.array(lines)))
-            cell_data["gmsh:geometrical"].append(np.array(line_ids))
-            cell_data["gmsh:physical"].append(np.array(line_ids))
+            blocks.append(("line", np.array(lines)))
+            cell_data[geometrical].append(np.array(line_ids))
+            cell_data[physical].append(np.array(line_ids))
             cell_data["b"].append(np.zeros((len(lines), 3)))
-            cell_data["h"].append(np.zeros(len(lines)))
+            cell_data[demagnetization].append(np.zeros(len(lines)))
             cell_data["Rel. Permeability"].append(np.zeros(len(lines)))
             cell_data["Iron Loss Dens."].append(np.zeros(len(lines)))
             cell_data["Mag. Loss Dens."].append(np.zeros(len(lines)))
             cell_data["Wdg. Loss Dens."].append(np.zeros(len(lines)))
 
-        if triangles:
-            cells.append(("triangle", np.array(triangles)))
-            cell_data["gmsh:geometrical"].append(np.array(geometrical_ids["triangle"]))
-            cell_data["gmsh:physical"].append(np.array(physical_ids["triangle"]))
-            cell_data["b"].append(np.array([i + (0,) for i in b["triangle"]]))
-            cell_data["h"].append(np.array(h["triangle"]))
-            cell_data["Rel. Permeability"].append(np.array(perm["triangle"]))
-            cell_data["Iron Loss Dens."].append(np.array(iron_losses["triangle"]))
-            cell_data["Mag. Loss Dens."].append(np.array(mag_losses["triangle"]))
-            cell_data["Wdg. Loss Dens."].append(np.array(wdg_losses["triangle"]))
-
-        if quads:
-            cells.append(("quad", np.array(quads)))
-            cell_data["gmsh:geometrical"].append(np.array(geometrical_ids['quad']))
-            cell_data["gmsh:physical"].append(np.array(physical_ids['quad']))
-            cell_data["b"].append(np.array([i + (0,) for i in b['quad']]))
-            cell_data["h"].append(np.array(h['quad']))
-            cell_data["Rel. Permeability"].append(np.array(perm['quad']))
-            cell_data["Iron Loss Dens."].append(np.array(iron_losses['quad']))
-            cell_data["Mag. Loss Dens."].append(np.array(mag_losses['quad']))
-            cell_data["Wdg. Loss Dens."].append(np.array(wdg_losses['quad']))
-
-        field_data = {}
-        for l in physical_lines:
-            field_data[l] = np.array([physical_lines.index(l) + 1, 1])
-        for s in physical_surfaces:
-            field_data[s] = np.array([physical_surfaces.index(s) + 1
-                                      + len(physical_lines), 2])
+        for cell_type in ("triangle", "quad"):
+            if len(cells[cell_type]) == 0:
+                continue
+            blocks.append((cell_type, cells[cell_type]))
+            cell_data[geometrical].append(geometrical_ids[cell_type])
+            cell_data[physical].append(np.array(physical_ids[cell_type]))
+            cell_data["b"].append(rounded([i + (0,) for i in b[cell_type]]))
+            cell_data[demagnetization].append(rounded(h[cell_type]))
+            cell_data["Rel. Permeability"].append(rounded(perm[cell_type]))
+            cell_data["Iron Loss Dens."].append(
+                rounded(iron_losses[cell_type]))
+            cell_data["Mag. Loss Dens."].append(
+                rounded(mag_losses[cell_type]))
+            cell_data["Wdg. Loss Dens."].append(
+                rounded(wdg_losses[cell_type]))
+        return blocks, cell_data
+
+    field_data = {}
+    for l in physical_lines:
+        field_data[l] = np.array([physical_lines.index(l) + 1, 1])
+    for s in physical_surfaces:
+        field_data[s] = np.array([physical_surfaces.index(s) + 1
+                                  + len(physical_lines), 2])
+
+    if target_format == "msh":
+        import meshio
+        blocks, cell_data = cell_blocks("gmsh:geometrical",
+                                        "gmsh:physical", "h")
+        point_data = {"potential": vpot}
+        if binary:
+            blocks, cell_data, point_data["gmsh:dim_tags"] = _entity_blocks(
+                points, blocks, cell_data, "gmsh:geometrical")
         meshio.write_points_cells(filename,
                                   points,
-                                  cells,
+                                  blocks,
                                   point_data,
                                   cell_data,
                                   field_data,
-                                  file_format="gmsh22",
-                                  binary=False)
-
+                                  file_format="gmsh" if binary else "gmsh22",
+                                  binary=binary)
     if target_format == "geo":
         import meshio
         geo = []
@@ -318,67 +390,79 @@ def _from_isa(isa, filename, target_format,
             f.write("\n".join(geo))
 
     if target_format == "vtu":
+        blocks, cell_data = cell_blocks("GeometryIds", "PhysicalIds",
+                                        "Demagnetization")
+        if binary:
+            _write_vtu_appended(filename, points, blocks,
+                                {"potential": vpot}, cell_data)
+            return
         import meshio
-        assert len(points) == len(vpot)
-        assert len(lines) == len(line_ids)
-        assert len(triangles) == len(physical_ids['triangle']) == len(geometrical_ids['triangle']) == len(b['triangle']) == len(h['triangle']) == len(perm['triangle'])
-        assert len(quads) == len(physical_ids['quad']) == len(geometrical_ids['quad']) == len(b['quad']) == len(h['quad']) == len(perm['quad'])
-
-        points = np.array(points)
-        point_data = {"potential": np.array(vpot)}
-
-        cells = []
-        cell_data = defaultdict(list)
-
-        if lines:
-            cells.append(("line", np.array(lines)))
-            cell_data["GeometryIds"].append(np.array(line_ids))
-            cell_data["PhysicalIds"].append(np.array(line_ids))
-            cell_data["b"].append(np.zeros((len(lines), 3)))
-            cell_data["Demagnetization"].append(np.zeros(len(lines)))
-            cell_data["Rel. Permeability"].append(np.zeros(len(lines)))
-            cell_data["Iron Loss Dens."].append(np.zeros(len(lines)))
-            cell_data["Mag. Loss Dens."].append(np.zeros(len(lines)))
-            cell_data["Wdg. Loss Dens."].append(np.zeros(len(lines)))
-
-        if triangles:
-            cells.append(("triangle", np.array(triangles)))
-            cell_data["GeometryIds"].append(np.array(geometrical_ids['triangle']))
-            cell_data["PhysicalIds"].append(np.array(physical_ids['triangle']))
-            cell_data["b"].append(np.array([i + (0,) for i in b['triangle']]))
-            cell_data["Demagnetization"].append(np.array(h['triangle']))
-            cell_data["Rel. Permeability"].append(np.array(perm['triangle']))
-            cell_data["Iron Loss Dens."].append(np.array(iron_losses['triangle']))
-            cell_data["Mag. Loss Dens."].append(np.array(mag_losses['triangle']))
-            cell_data["Wdg. Loss Dens."].append(np.array(wdg_losses['triangle']))
-
-        if quads:
-            cells.append(("quad", np.array(quads)))
-            cell_data["GeometryIds"].append(np.array(geometrical_ids['quad']))
-            cell_data["PhysicalIds"].append(np.array(physical_ids['quad']))
-            cell_data["b"].append(np.array([i + (0,) for i in b['quad']]))
-            cell_data["Demagnetization"].append(np.array(h['quad']))
-            cell_data["Rel. Permeability"].append(np.array(perm['quad']))
-            cell_data["Iron Loss Dens."].append(np.array(iron_losses['quad']))
-            cell_data["Mag. Loss Dens."].append(np.array(mag_losses['quad']))
-            cell_data["Wdg. Loss Dens."].append(np.array(wdg_losses['quad']))
-
-        field_data = {}
-        for l in physical_lines:
-            field_data[l] = np.array([physical_lines.index(l) + 1, 1])
-        for s in physical_surfaces:
-            field_data[s] = np.array([physical_surfaces.index(s) + 1
-                                      + len(physical_lines), 2])
         meshio.write_points_cells(filename,
                                   points,
-                                  cells,
-                                  point_data=point_data,
+                                  blocks,
+                                  point_data={"potential": vpot},
                                   cell_data=cell_data,
                                   field_data=field_data,
                                   file_format="vtu",
                                   binary=True)
 
 
+def _write_vtu_appended(filename, points, cells, point_data, cell_data):
+    """write an unstructured grid to a VTU file with the data arrays
+    in raw binary format in the appended data section"""
+    from xml.sax.saxutils import quoteattr
+    vtk_types = dict(line=3, triangle=5, quad=9)
+    arrays = []
+    offset = 0
+
+    def data_array(name, data):
+        nonlocal offset
+        data = np.ascontiguousarray(
+            data, dtype=np.asarray(data).dtype.newbyteorder('<'))
+        vtu_type = '{}{}'.format(
+            dict(f='Float', i='Int', u='UInt')[data.dtype.kind],
+            8*data.dtype.itemsize)
+        ncomp = (' NumberOfComponents="{}"'.format(data.shape[1])
+                 if data.ndim == 2 else '')
+        xml = ('<DataArray type="{}" Name={}{} format="appended" '
+               'offset="{}"/>').format(vtu_type, quoteattr(name),
+                                       ncomp, offset)
+        arrays.append(data)
+        offset += 8 + data.nbytes
+        return xml
+
+    numcells = sum(len(c) for t, c in cells)
+    xml = ['<?xml version="1.0"?>',
+           '<VTKFile type="UnstructuredGrid" version="1.0" '
+           'byte_order="LittleEndian" header_type="UInt64">',
+           '<UnstructuredGrid>',
+           '<Piece NumberOfPoints="{}" NumberOfCells="{}">'.format(
+               len(points), numcells),
+           '<Points>', data_array('Points', points), '</Points>',
+           '<Cells>',
+           data_array('connectivity',
+                      np.concatenate([c.ravel() for t, c in cells])),
+           data_array('offsets', np.cumsum(
+               np.concatenate([np.full(len(c), c.shape[1])
+                               for t, c in cells]))),
+           data_array('types', np.concatenate(
+               [np.full(len(c), vtk_types[t], dtype=np.uint8)
+                for t, c in cells])),
+           '</Cells>',
+           '<PointData>']
+    xml += [data_array(k, v) for k, v in point_data.items()]
+    xml += ['</PointData>', '<CellData>']
+    xml += [data_array(k, np.concatenate(v)) for k, v in cell_data.items()]
+    xml += ['</CellData>', '</Piece>', '</UnstructuredGrid>',
+            '<AppendedData encoding="raw">', '_']
+    with open(filename, 'wb') as fp:
+        fp.write('\n'.join(xml).encode())
+        for a in arrays:
+            fp.write(np.array(a.nbytes, dtype='<u8').tobytes())
+            fp.write(a.tobytes())
+        fp.write(b'\n</AppendedData>\n</VTKFile>\n')
+
+
 def _from_jmag(designer):
     """ Designer.jplot: plotmesh.data
     (older version Designer.jcf: mesh.dat
@@ -541,7 +625,7 @@ def _from_nastran(source, filename):
         binary=False)
 
 
-def to_msh(source, filename, infile_type=None):
+def to_msh(source, filename, infile_type=None, binary=False):
     """
     Convert a FEMAG, NASTRAN or JMAG Model Input File to msh format.
 
@@ -549,9 +633,11 @@ def to_msh(source, filename, infile_type=None):
         source: instance of femagtools.isa7.Isa7 or name of I7/ISA7/NAS/JPLOT file
         filename: name of converted file
         infile_type: format of source file
+        binary: write binary MSH 4.1 instead of ASCII MSH 2.2
+                (I7/ISA7/NC only)
     """
     if isinstance(source, isa7.Isa7):
-        _from_isa(source, filename, "msh")
+        _from_isa(source, filename, "msh", binary=binary)
 
     elif type(source) == str:
         if infile_type:
@@ -561,7 +647,7 @@ def to_msh(source, filename, infile_type=None):
 
         if file_ext in ["isa7", "i7", "nc"]:
             isa = nc.read(source) if file_ext == 'nc' else isa7.read(source)
-            _from_isa(isa, filename, "msh")
+            _from_isa(isa, filename, "msh", binary=binary)
         elif file_ext == "nas":
             _from_nastran(source, filename)
         elif file_ext == "jplot":
@@ -608,7 +694,7 @@ def to_geo(source, filename, extrude=0, layers=0,
         raise ValueError("cannot convert {} to .geo".format(source))
 
 
-def to_vtu(source, filename, infile_type=None):
+def to_vtu(source, filename, infile_type=None, binary=False):
     """
     Convert a femag model to vtu format.
 
@@ -616,9 +702,11 @@ def to_vtu(source, filename, infile_type=None):
         source: instance of isa7.Isa7 or name of an I7/ISA7 or nc file
         filename: name of converted file
         infile_type: format of source file
+        binary: write the data arrays as raw appended binary data
+                instead of inline base64
     """
     if isinstance(source, isa7.Isa7):
-        _from_isa(source, filename, "vtu")
+        _from_isa(source, filename, "vtu", binary=binary)
 
     elif type(source) == str:
         if infile_type:
@@ -628,7 +716,7 @@ def to_vtu(source, filename, infile_type=None):
 
         if file_ext in ["isa7", "i7", "nc"]:
             isa = nc.read(source) if file_ext == 'nc' else isa7.read(source)
-            _from_isa(isa, filename, "vtu")
+            _from_isa(isa, filename, "vtu", binary=binary)
         else:
             raise ValueError(
                 "cannot convert files of format {} to .vtu".format(file_ext))
@@ -647,13 +735,13 @@ def main(argv=None):
         args.output_format = args.outfile.split('.')[-1]
 
     if args.output_format == 'msh':
-        to_msh(args.infile, args.outfile)
+        to_msh(args.infile, args.outfile, binary=args.binary)
     elif args.output_format == 'geo':
         to_geo(args.infile, args.outfile,
                extrude=args.extrude, layers=args.layers,
                recombine=args.recombine)
     elif args.output_format == 'vtu':
-        to_vtu(args.infile, args.outfile)
+        to_vtu(args.infile, args.outfile, binary=args.binary)
     else:
         raise ValueError(
                 "unsupported output format {}".format(args.output_format))
@@ -701,6 +789,12 @@ def _get_parser():
         action='store_true',
         help="recombine")
 
+    parser.add_argument(
+        "--binary",
+        "-b",
+        action='store_true',
+        help="binary msh 4.1 or vtu with appended raw data")
+
     parser.add_argument("outfile", type=str, help="mesh file to be written to")
 
     parser.add_argument(
@@ -35,9 +35,10 @@ def publish_receive(message):
 
 class AsyncFemag(threading.Thread):
     def __init__(self, queue, port, host,
-                 extra_result_files):
+                 extra_result_files, done=None):
         threading.Thread.__init__(self)
         self.queue = queue
+        self.done = done
         self.container = femagtools.femag.ZmqFemag(
             port, host)
         self.extra_result_files = extra_result_files
@@ -124,6 +125,8 @@ class AsyncFemag(threading.Thread):
             logger.debug("Task %s end status %s",
                          task.id, task.status)
             ret = self.container.release()
+            if self.done is not None:
+                self.done.put(task)
             self.queue.task_done()
         self.container.close()
 
@@ -172,7 +175,9 @@ class Engine(object):
             logger.info('submit, engine is terminated')
             return 0
 
+        self.job.prepare()
         self.queue = Queue()
+        self.done = Queue()
         for task in self.job.tasks:
             self.queue.put(task)
 
@@ -183,7 +188,7 @@ class Engine(object):
             AsyncFemag(
                 self.queue,
                 self.port, self.dispatcher,
-                extra_result_files)
+                extra_result_files, self.done)
             for i in range(self.num_threads)]
 
         for async_femag in self.async_femags:
@@ -191,6 +196,19 @@ class Engine(object):
 
         return len(self.job.tasks)
 
+    def as_completed(self):
+        """Iterate over the submitted tasks in the order
+        in which their calculations finish
+
+        Return:
+            generator of tasks (with status C = Ok, X = error)
+        """
+        if not self.running:
+            logger.info('as_completed, engine is terminated')
+            return
+        for _ in self.job.tasks:
+            yield self.done.get()
+
     def join(self):
         """Wait until all calculations are finished
 
@@ -0,0 +1,291 @@
+"""
+  femagtools.dxfsl.batch
+
+  convert a set of DXF, SVG or FEM files to FSL in worker processes
+
+"""
+import os
+import io
+import sys
+import json
+import time
+import hashlib
+import logging
+import traceback
+import multiprocessing
+import multiprocessing.connection
+from pathlib import Path
+import femagtools
+from femagtools.dxfsl.converter import convert
+from femagtools.dxfsl.functions import Timer
+
+logger = logging.getLogger(__name__)
+
+suffixes = ('.dxf', '.svg', '.fem')
+
+
+def input_files(source):
+    """returns the list of (filename, options) to convert
+
+    Args:
+      source: directory (all DXF, SVG and FEM files), manifest file or
+         list of filenames. A manifest with suffix .json contains a list
+         of filenames or dicts with key 'file' and convert options,
+         any other manifest one filename per line. Relative names are
+         relative to the directory of the manifest.
+    """
+    if isinstance(source, (list, tuple)):
+        return [(str(f), {}) for f in source]
+    source = Path(source)
+    if source.is_dir():
+        return [(str(f), {}) for f in sorted(source.iterdir())
+                if f.suffix.lower() in suffixes]
+    if source.suffix.lower() in suffixes:
+        return [(str(source), {})]
+    if source.suffix == '.json':
+        entries = json.loads(source.read_text())
+    else:
+        entries = [l.strip() for l in source.read_text().split('\n')
+                   if l.strip() and not l.strip().startswith('#')]
+    files = []
+    for e in entries:
+        if isinstance(e, dict):
+            e = dict(e)
+            f, opts = e.pop('file'), e
+        else:
+            f, opts = e, {}
+        files.append((str(source.parent / f), opts))
+    return files
+
+
+def file_hash(filename, options):
+    """returns the sha256 of the file content, options and version"""
+    h = hashlib.sha256(femagtools.__version__.encode())
+    h.update(json.dumps(options, sort_keys=True).encode())
+    with open(filename, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _convert_file(filename, options, fslfile, conn):
+    """worker process: convert filename, write fslfile and send
+    the result record"""
+    r = dict(timings={})
+    try:
+        timer = Timer(start_it=True)
+        res = convert(filename, **options)
+        r['timings']['convert'] = timer.stop()
+        if isinstance(res, dict) and 'profile' in res:
+            r['timings'].update({s['name']: s['time']
+                                 for s in res['profile']['stages']})
+            r['profile'] = res.pop('profile')
+        if not res or 'error' in res or 'fsl' not in res:
+            r['status'] = 'error'
+            r['error'] = (res or {}).get('error', 'no fsl created')
+        else:
+            timer.start()
+            with io.open(fslfile, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(res['fsl']))
+            r['timings']['write'] = timer.stop()
+            r['status'] = 'ok'
+            r['fslfile'] = os.path.basename(fslfile)
+            r['params'] = {k: v for k, v in res.items()
+                           if isinstance(v, (int, float, str))}
+    except BaseException as e:  # SystemExit too
+        r['status'] = 'error'
+        r['error'] = ''.join(traceback.format_exception_only(
+            type(e), e)).strip()
+        logger.debug(traceback.format_exc())
+    conn.send(r)
+    conn.close()
+
+
+def _read_summary(filename):
+    try:
+        with open(filename) as fp:
+            return {r['file']: r for r in json.load(fp)['files']}
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def convert_batch(source, outdir='.', num_proc=0, timeout=600,
+                  summary='summary.json', force=False, **kwargs):
+    """convert DXF, SVG and FEM files to FSL in parallel processes
+
+    Each file is converted in its own process that is terminated
+    after timeout seconds. Files whose content and options are
+    unchanged since the last successful run (as recorded in the summary)
+    are skipped.
+
+    Args:
+      source: directory, manifest file or list of files
+        (see input_files)
+      outdir: directory of the FSL files and the summary
+      num_proc: number of parallel processes (default: cpu count)
+      timeout: max duration of a single conversion in seconds
+      summary: name of the JSON summary file in outdir
+      force: convert unchanged files too
+      kwargs: options of convert that apply to all files
+
+    Returns:
+      summary dict with the list of file records
+      (file, hash, status, error, fslfile, params, timings, profile)
+    """
+    tstart = time.perf_counter()
+    outdir = Path(outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    summaryfile = outdir / summary
+    previous = {} if force else _read_summary(summaryfile)
+    num_proc = num_proc or multiprocessing.cpu_count()
+
+    records = []
+    pending = []
+    names = set()
+    for filename, opts in input_files(source):
+        options = dict(kwargs, **opts)
+        options['write_fsl'] = True
+        r = dict(file=filename, options=options, timings={})
+        records.append(r)
+        timer = Timer(start_it=True)
+        try:
+            r['hash'] = file_hash(filename, options)
+        except OSError as e:
+            r.update(status='error', error=str(e))
+            continue
+        r['timings']['hash'] = timer.stop()
+        name = Path(filename).stem
+        i = 1
+        while name in names:
+            name = f'{Path(filename).stem}_{i}'
+            i += 1
+        names.add(name)
+        prev = previous.get(filename, {})
+        if (prev.get('status') in ('ok', 'skipped') and
+                prev.get('hash') == r['hash'] and
+                (outdir / prev['fslfile']).exists()):
+            names.add(Path(prev['fslfile']).stem)
+            r.update(status='skipped', fslfile=prev['fslfile'],
+                     params=prev.get('params', {}))
+            continue
+        pending.append((r, str(outdir / (name + '.fsl'))))
+
+    running = {}
+    while pending or running:
+        while pending and len(running) < num_proc:
+            r, fslfile = pending.pop(0)
+            reader, writer = multiprocessing.Pipe(duplex=False)
+            p = multiprocessing.Process(
+                target=_convert_file,
+                args=(r['file'], r['options'], fslfile, writer))
+            p.start()
+            writer.close()
+            running[reader] = (p, r, time.perf_counter())
+            logger.info("converting %s", r['file'])
+        now = time.perf_counter()
+        wait = max(min(t + timeout for p, r, t in running.values()) - now,
+                   0)
+        for reader in multiprocessing.connection.wait(list(running),
+                                                      timeout=wait):
+            p, r, t = running.pop(reader)
+            try:
+                res = reader.recv()
+                r['timings'].update(res.pop('timings'))
+                r.update(res)
+            except EOFError:
+                r.update(status='error',
+                         error='worker terminated')
+            reader.close()
+            p.join()
+            r['timings']['total'] = time.perf_counter() - t
+            logger.info("%s: %s (%.2f s)", r['file'], r['status'],
+                        r['timings']['total'])
+        now = time.perf_counter()
+        for reader, (p, r, t) in list(running.items()):
+            if now - t >= timeout:
+                p.terminate()
+                p.join()
+                reader.close()
+                del running[reader]
+                r.update(status='timeout',
+                         error=f'timeout after {timeout} s')
+                r['timings']['total'] = now - t
+                logger.warning("%s: timeout", r['file'])
+
+    for r in records:
+        r.pop('options')
+    result = dict(files=records,
+                  total=time.perf_counter() - tstart,
+                  num_proc=num_proc,
+                  status={s: sum(1 for r in records if r['status'] == s)
+                          for s in ('ok', 'skipped', 'error', 'timeout')})
+    tmp = summaryfile.with_name(summaryfile.name + '.tmp')
+    tmp.write_text(json.dumps(result, indent=2))
+    os.replace(tmp, summaryfile)
+    return result
+
+
+def main():
+    import argparse
+    argparser = argparse.ArgumentParser(
+        description='Convert DXF, SVG and FEM files to FSL files.')
+    argparser.add_argument('source',
+                           help='directory, manifest or files',
+                           nargs='+')
+    argparser.add_argument('-o', '--outdir',
+                           help='output directory',
+                           dest='outdir',
+                           default='.')
+    argparser.add_argument('-n', '--num_proc',
+                           help='number of processes',
+                           dest='num_proc',
+                           type=int,
+                           default=0)
+    argparser.add_argument('--timeout',
+                           help='timeout per file in seconds',
+                           dest='timeout',
+                           type=float,
+                           default=600)
+    argparser.add_argument('--summary',
+                           help='name of the JSON summary file',
+                           dest='summary',
+                           default='summary.json')
+    argparser.add_argument('--force',
+                           help='convert unchanged files too',
+                           dest='force',
+                           action="store_true")
+    argparser.add_argument('--rtol',
+                           help='relative tolerance (pickdist)',
+                           dest='rtol',
+                           type=float,
+                           default=1e-03)
+    argparser.add_argument('--atol',
+                           help='absolut tolerance (pickdist)',
+                           dest='atol',
+                           type=float,
+                           default=0.005)
+    argparser.add_argument('-s', '--split',
+                           help='split intersections',
+                           dest='split',
+                           action="store_true")
+    args = argparser.parse_args()
+
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s %(message)s')
+
+    source = args.source[0] if len(args.source) == 1 else args.source
+    res = convert_batch(source, outdir=args.outdir,
+                        num_proc=args.num_proc,
+                        timeout=args.timeout,
+                        summary=args.summary,
+                        force=args.force,
+                        rtol=args.rtol,
+                        atol=args.atol,
+                        split=args.split)
+    logger.info("%s in %.1f s", res['status'], res['total'])
+    if res['status']['error'] or res['status']['timeout']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -126,6 +126,14 @@ def main():
                            help='print information in logfile',
                            dest='logfile',
                            action="store_true")
+    argparser.add_argument('--trace',
+                           help='write stage profile as Chrome trace file',
+                           dest='trace_file',
+                           default=None)
+    argparser.add_argument('--trace-memory',
+                           help='record peak memory of the stages',
+                           dest='trace_memory',
+                           action="store_true")
     argparser.add_argument('--version',
                            help='show version of some packages',
                            dest='version',
@@ -221,7 +229,9 @@ def main():
                   write_fsl=args.write_fsl,
                   write_png=args.write_png,
                   write_id=args.write_id,
-                  debug_mode=args.debugger)
+                  debug_mode=args.debugger,
+                  trace_file=args.trace_file,
+                  trace_memory=args.trace_memory)
 
     if args.write_fsl:
         if res is not None:
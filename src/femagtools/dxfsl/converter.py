@@ -6,7 +6,7 @@ from femagtools.dxfsl.geom import Geometry
 from femagtools.dxfsl.shape import Shape
 from femagtools.dxfsl.fslrenderer import FslRenderer, agndst
 from femagtools.dxfsl.plotrenderer import PlotRenderer
-from femagtools.dxfsl.functions import Timer
+from femagtools.dxfsl.functions import Timer, Profiler
 import logging
 import logging.config
 import numpy as np
@@ -121,389 +121,429 @@ def convert(dxfile,
             write_fsl=True,
             write_png=False,
             write_id=False,
-            debug_mode=False):
+            debug_mode=False,
+            trace_file=None,
+            trace_memory=False):
+    """convert dxfile and return a dict with the fsl and the
+    machine parameters.
+
+    The dict contains the profile of the conversion stages
+    (wall time, element/node/area counts and peak memory) with key
+    'profile'. If trace_file is set the stages are written in Chrome
+    trace format, with trace_memory the peak memory of each stage is
+    recorded with tracemalloc.
+    """
     layers = ()
     conv = {}
 
     basename = Path(dxfile).stem
     logger.info("***** start processing %s *****", basename)
     timer = Timer(start_it=True)
-
-    if part:
-        if part[0] not in ('rotor', 'stator'):
-            logger.error('FATAL: Parameter rotor or stator expected')
-            return dict(error='unknown part {}'.format(part))
-        if part[1] not in ('in', 'out'):
-            logger.error('"{}" has to be defined in/out'.format(part[0]))
-            return dict(error='unknown location {}'.format(part[1]))
-    else:
-        if da:
-            logger.warn("distance airgap (da) ignored")
-            da = 0.0
-        if dy:
-            logger.warn("distance yoke (dy) ignored")
-            dy = 0.0
-
-    split_ini = split
-    split_cpy = False
-    if not (part or view_only):
-        split_ini = False
-        split_cpy = split
+    profiler = Profiler(trace_memory=trace_memory, trace_file=trace_file)
 
     try:
-        if Path(dxfile).suffix == '.fem':
-            from .femparser import femshapes
-            basegeom = Geometry(femshapes(dxfile),
-                                rtol=rtol,
-                                atol=atol,
-                                split=split_ini)
-        elif Path(dxfile).suffix == '.dxf':
-            from .dxfparser import dxfshapes
-            basegeom = Geometry(dxfshapes(dxfile,
-                                          mindist=mindist,
-                                          layers=layers),
-                                rtol=rtol,
-                                atol=atol,
-                                split=split_ini)
-        elif Path(dxfile).suffix == '.svg':
-            from .svgparser import svgshapes
-            basegeom = Geometry(svgshapes(dxfile),
-                                rtol=rtol,
-                                atol=atol,
-                                split=split_ini)
-
-
-    except FileNotFoundError as ex:
-        logger.error(ex)
-        return dict()
-
-    logger.info("total elements %s", len(basegeom.g.edges()))
-
-    p = PlotRenderer()
-
-    if view_only:
-        logger.info("View only")
-        if view_korr:
-            logger.info("With Corrections")
-            basegeom.search_all_overlapping_elements()
-            basegeom.search_all_appendices()
-
-        p.render_elements(basegeom, Shape,
-                          neighbors=True,
-                          png=write_png,
-                          show=True)
-        return dict()
-
-    basegeom.search_all_overlapping_elements()
-
-    machine_base = basegeom.get_machine()
-    if show_plots:
-        p.render_elements(basegeom, Shape,
-                          title=Path(dxfile).name,
-                          with_hull=False,
-                          rows=3, cols=2, num=1, show=debug_mode)
-
-    basegeom.search_all_appendices()
-
-    if not machine_base.is_a_machine():
-        logger.warn("it's Not a Machine!!")
-        return dict(error='machine not detected')
-
-    if not (machine_base.part > 0):
-        # machine shape is unclear
-        machine_base.set_center(0.0, 0.0)
-        machine_base.set_radius(9999999)
-
-    machine = machine_base
-
-    if machine.part_of_circle() == 0:
-        logger.warn("No arc segment found")
-        return dict(error='no arc segment found')
+        if part:
+            if part[0] not in ('rotor', 'stator'):
+                logger.error('FATAL: Parameter rotor or stator expected')
+                return profiler.done(
+                    dict(error='unknown part {}'.format(part)))
+            if part[1] not in ('in', 'out'):
+                logger.error('"{}" has to be defined in/out'.format(part[0]))
+                return profiler.done(
+                    dict(error='unknown location {}'.format(part[1])))
+        else:
+            if da:
+                logger.warn("distance airgap (da) ignored")
+                da = 0.0
+            if dy:
+                logger.warn("distance yoke (dy) ignored")
+                dy = 0.0
+
+        split_ini = split
+        split_cpy = False
+        if not (part or view_only):
+            split_ini = False
+            split_cpy = split
+
+        profiler.start('parse')
+        try:
+            if Path(dxfile).suffix == '.fem':
+                from .femparser import femshapes
+                basegeom = Geometry(femshapes(dxfile),
+                                    rtol=rtol,
+                                    atol=atol,
+                                    split=split_ini)
+            elif Path(dxfile).suffix == '.dxf':
+                from .dxfparser import dxfshapes
+                basegeom = Geometry(dxfshapes(dxfile,
+                                              mindist=mindist,
+                                              layers=layers),
+                                    rtol=rtol,
+                                    atol=atol,
+                                    split=split_ini)
+            elif Path(dxfile).suffix == '.svg':
+                from .svgparser import svgshapes
+                basegeom = Geometry(svgshapes(dxfile),
+                                    rtol=rtol,
+                                    atol=atol,
+                                    split=split_ini)
+
+
+        except FileNotFoundError as ex:
+            logger.error(ex)
+            return profiler.done(dict())
+        profiler.stop(basegeom)
+
+        logger.info("total elements %s", len(basegeom.g.edges()))
+
+        p = PlotRenderer()
+
+        if view_only:
+            logger.info("View only")
+            if view_korr:
+                logger.info("With Corrections")
+                basegeom.search_all_overlapping_elements()
+                basegeom.search_all_appendices()
+
+            p.render_elements(basegeom, Shape,
+                              neighbors=True,
+                              png=write_png,
+                              show=True)
+            return profiler.done(dict())
 
-    machine.clear_cut_lines()
-    machine.move_to_middle()
-    if show_plots and debug_mode:
-        p.render_elements(machine.geom, Shape,
-                          title='Areas',
-                          neighbors=True,
-                          with_corners=False, show=True)
-
-    if machine.airgap(airgap, airgap2, symtol):
-        p.render_elements(machine.geom, Shape,
-                          title='Search for airgap failed',
-                          with_corners=False, show=True)
-        return dict(error='no airgap found')
-
-    if show_plots:
-        p.render_elements(basegeom, Shape, neighbors=True,
-                          title='Original with nodes',
-                          rows=3, cols=2, num=2, show=False)
-
-    machine.repair_hull()
-    machine.geom.delete_all_appendices()
-
-    if machine.has_airgap():
-        logger.info("=== airgap is %s ===", machine.airgap_radius)
-        machine_inner = machine.copy(startangle=0.0,
-                                     endangle=2*np.pi,
-                                     airgap=True,
-                                     inside=True,
-                                     split=split_cpy,
-                                     delete_appendices=True)
-
-        machine_inner = symmetry_search(machine_inner,
-                                        p,  # plot
-                                        inner_name,
-                                        is_inner=True,
-                                        symtol=symtol,
-                                        show_plots=show_plots,
-                                        rows=3,  # rows
-                                        cols=2,  # columns
-                                        num=3)   # start num
-        machine_inner.set_inner()
-        machine_inner.check_and_correct_geom("Inner")
-
-        machine_outer = machine.copy(startangle=0.0,
-                                     endangle=2*np.pi,
-                                     airgap=True,
-                                     inside=False,
-                                     split=split_cpy,
-                                     delete_appendices=True)
-
-        machine_outer = symmetry_search(machine_outer,
-                                        p,  # plot
-                                        outer_name,
-                                        is_outer=True,
-                                        symtol=symtol,
-                                        show_plots=show_plots,
-                                        rows=3,  # rows
-                                        cols=2,  # columns
-                                        num=4)   # start num
-        machine_outer.check_and_correct_geom("Outer")
-
-        machine_inner.sync_with_counterpart(machine_outer)
-
-        machine_inner.search_subregions()
-        machine_outer.search_subregions()
-
-        if machine_inner.geom.is_rotor():
-            if machine_inner.create_rotor_auxiliary_lines():
-                machine_inner.rebuild_subregions()
-
-        elif machine_outer.geom.is_rotor():
-            if machine_outer.create_rotor_auxiliary_lines():
-                machine_outer.rebuild_subregions()
-
-        if machine_inner.geom.is_stator():
-            if machine_inner.has_mirrored_windings():
-                logger.debug("undo mirrored windings of %s", inner_name)
-                machine_inner = machine_inner.undo_mirror()
-                machine_inner.sync_with_counterpart(machine_outer)
-                machine_inner.search_subregions()
-                machine_inner.create_mirror_lines_outside_windings()
-            if machine_inner.create_stator_auxiliary_lines():
-                machine_inner.rebuild_subregions()
-
-        elif machine_outer.geom.is_stator():
-            if machine_outer.has_mirrored_windings():
-                logger.debug("undo mirrored windings of %s", outer_name)
-                machine_outer = machine_outer.undo_mirror()
-                machine_inner.sync_with_counterpart(machine_outer)
-                machine_outer.search_subregions()
-                machine_outer.create_mirror_lines_outside_windings()
-            if machine_outer.create_stator_auxiliary_lines():
-                machine_outer.rebuild_subregions()
-
-        machine_inner.delete_tiny_elements(mindist)
-        machine_outer.delete_tiny_elements(mindist)
-        machine_inner.geom.create_corner_areas()
-        logger.info("END of work: %s", basename)
+        profiler.start('search_all_overlapping_elements')
+        basegeom.search_all_overlapping_elements()
+        profiler.stop(basegeom)
 
+        profiler.start('get_machine')
+        machine_base = basegeom.get_machine()
         if show_plots:
-            p.render_elements(machine_inner.geom, Shape,
-                              draw_inside=True, title=inner_name,
-                              rows=3, cols=2, num=5, show=False,
-                              with_corners=False,
-                              with_nodes=False,
-                              neighbors=False,
-                              write_id=write_id,
-                              fill_areas=True)
-
-            p.render_elements(machine_outer.geom, Shape,
-                              draw_inside=True, title=outer_name,
-                              rows=3, cols=2, num=6, show=False,
-                              with_corners=False,
-                              with_nodes=False,
-                              neighbors=False,
-                              write_id=write_id,
-                              fill_areas=True)
-            if write_png:
-                p.write_plot(basename)
-            else:
-                p.show_plot()
-
-        if show_areas:
-            p.render_elements(machine_inner.geom, Shape,
-                              title=inner_name,
-                              show=True,
-                              draw_inside=True,
-                              neighbors=True,
-                              fill_areas=True)
-            p.render_areas(machine_inner.geom,
-                           title=inner_name,
-                           with_nodes=True,
-                           single_view=True)
-
-            p.render_elements(machine_outer.geom, Shape,
-                              title=outer_name,
-                              show=True,
-                              draw_inside=True,
-                              neighbors=True,
-                              fill_areas=True)
-            p.render_areas(machine_outer.geom,
-                           title=outer_name,
-                           with_nodes=True,
-                           single_view=True)
-
-        if write_fsl:
-            if machine_inner.is_full() or machine_outer.is_full():
-                logger.warning("it's not possible to create fsl-file")
-                return None
+            p.render_elements(basegeom, Shape,
+                              title=Path(dxfile).name,
+                              with_hull=False,
+                              rows=3, cols=2, num=1, show=debug_mode)
 
-            fslrenderer = FslRenderer(basename)
-            inner = fslrenderer.render(machine_inner, inner=True)
-            outer = fslrenderer.render(machine_outer, outer=True)
+        basegeom.search_all_appendices()
+        profiler.stop(basegeom)
 
-            if machine_inner.geom.is_rotor():
-                conv['fsl_magnet'] = inner
-                conv['fsl_stator'] = outer
-            else:
-                conv['fsl_magnet'] = inner
-                conv['fsl_rotor'] = outer
-
-            params = create_femag_parameters(machine_inner,
-                                             machine_outer,
-                                             nodedist)
-
-            conv.update(params)
-            conv['fsl'] = fslrenderer.render_main(
-                machine,
-                machine_inner, machine_outer,
-                inner, outer,
-                params)
-    else:
-        # No airgap found. This must be an inner or outer part
-        name = "No_Airgap"
-        inner = False
-        outer = False
-        params = None
+        if not machine_base.is_a_machine():
+            logger.warn("it's Not a Machine!!")
+            return profiler.done(dict(error='machine not detected'))
 
-        if part:
-            if part[1] == 'in':
-                name = inner_name
-                inner = True
-            else:
-                name = outer_name
-                outer = True
-
-        machine = symmetry_search(machine,
-                                  p,  # plot
-                                  name,
-                                  is_inner=inner,
-                                  is_outer=outer,
-                                  symtol=symtol,
-                                  sympart=sympart,
-                                  show_plots=show_plots,
-                                  rows=3,  # rows
-                                  cols=2,  # cols
-                                  num=3)   # start num
-
-        if da > 0.0 or dy > 0.0:
-            if inner:
-                r_out = da / 2.0
-                r_in = dy / 2.0
-            elif outer:
-                r_out = dy / 2.0
-                r_in = da / 2.0
-            else:
-                r_out = 0.0
-                r_in = 0.0
-            if machine.cut_is_possible(r_in, r_out):
-                logger.info("make a cut")
-                machine = machine.cut(r_in, r_out)
+        if not (machine_base.part > 0):
+            # machine shape is unclear
+            machine_base.set_center(0.0, 0.0)
+            machine_base.set_radius(9999999)
 
-        if part:
-            if part[0] == 'stator':
-                machine.geom.set_stator()
-                machine.geom.search_stator_subregions(part[1])
+        machine = machine_base
 
-                if machine.has_mirrored_windings():
-                    logger.info("undo mirror of stator")
-                    machine = machine.undo_mirror()
-                    machine.geom.set_stator()
-                    machine.geom.search_stator_subregions(part[1])
-                    machine.geom.looking_for_corners()
-                    machine.create_mirror_lines_outside_windings()
-                if machine.create_stator_auxiliary_lines():
-                    machine.rebuild_subregions()
+        if machine.part_of_circle() == 0:
+            logger.warn("No arc segment found")
+            return profiler.done(dict(error='no arc segment found'))
 
-                params = create_femag_parameters_stator(machine,
-                                                        part[1])
-            else:
-                machine.geom.set_rotor()
-                machine.geom.search_rotor_subregions(part[1])
-                machine.geom.looking_for_corners()
-                if machine.create_rotor_auxiliary_lines():
-                    machine.rebuild_subregions()
-
-                params = create_femag_parameters_rotor(machine,
-                                                       part[1])
-        else:
-            machine.geom.search_subregions()
+        machine.clear_cut_lines()
+        machine.move_to_middle()
+        if show_plots and debug_mode:
+            p.render_elements(machine.geom, Shape,
+                              title='Areas',
+                              neighbors=True,
+                              with_corners=False, show=True)
 
-        machine.delete_tiny_elements(mindist)
-        machine.geom.create_corner_areas()
-        logger.info("END of work: %s", basename)
+        profiler.start('airgap')
+        if machine.airgap(airgap, airgap2, symtol):
+            p.render_elements(machine.geom, Shape,
+                              title='Search for airgap failed',
+                              with_corners=False, show=True)
+            return profiler.done(dict(error='no airgap found'))
 
         if show_plots:
-            p.render_elements(machine.geom, Shape,
-                              draw_inside=True, title=name,
-                              rows=3, cols=2, num=5, show=False,
-                              with_corners=False,
-                              with_nodes=False,
-                              neighbors=False,
-                              write_id=write_id,
-                              fill_areas=True)
-            if write_png:
-                p.write_plot(basename)
-            else:
-                p.show_plot()
+            p.render_elements(basegeom, Shape, neighbors=True,
+                              title='Original with nodes',
+                              rows=3, cols=2, num=2, show=False)
+
+        machine.repair_hull()
+        machine.geom.delete_all_appendices()
+        profiler.stop(machine.geom)
+
+        if machine.has_airgap():
+            logger.info("=== airgap is %s ===", machine.airgap_radius)
+            profiler.start('symmetry_inner')
+            machine_inner = machine.copy(startangle=0.0,
+                                         endangle=2*np.pi,
+                                         airgap=True,
+                                         inside=True,
+                                         split=split_cpy,
+                                         delete_appendices=True)
+
+            machine_inner = symmetry_search(machine_inner,
+                                            p,  # plot
+                                            inner_name,
+                                            is_inner=True,
+                                            symtol=symtol,
+                                            show_plots=show_plots,
+                                            rows=3,  # rows
+                                            cols=2,  # columns
+                                            num=3)   # start num
+            machine_inner.set_inner()
+            machine_inner.check_and_correct_geom("Inner")
+            profiler.stop(machine_inner.geom)
+
+            profiler.start('symmetry_outer')
+            machine_outer = machine.copy(startangle=0.0,
+                                         endangle=2*np.pi,
+                                         airgap=True,
+                                         inside=False,
+                                         split=split_cpy,
+                                         delete_appendices=True)
+
+            machine_outer = symmetry_search(machine_outer,
+                                            p,  # plot
+                                            outer_name,
+                                            is_outer=True,
+                                            symtol=symtol,
+                                            show_plots=show_plots,
+                                            rows=3,  # rows
+                                            cols=2,  # columns
+                                            num=4)   # start num
+            machine_outer.check_and_correct_geom("Outer")
+            profiler.stop(machine_outer.geom)
+
+            profiler.start('subregions')
+            machine_inner.sync_with_counterpart(machine_outer)
+
+            machine_inner.search_subregions()
+            machine_outer.search_subregions()
+
+            if machine_inner.geom.is_rotor():
+                if machine_inner.create_rotor_auxiliary_lines():
+                    machine_inner.rebuild_subregions()
+
+            elif machine_outer.geom.is_rotor():
+                if machine_outer.create_rotor_auxiliary_lines():
+                    machine_outer.rebuild_subregions()
+
+            if machine_inner.geom.is_stator():
+                if machine_inner.has_mirrored_windings():
+                    logger.debug("undo mirrored windings of %s", inner_name)
+                    machine_inner = machine_inner.undo_mirror()
+                    machine_inner.sync_with_counterpart(machine_outer)
+                    machine_inner.search_subregions()
+                    machine_inner.create_mirror_lines_outside_windings()
+                if machine_inner.create_stator_auxiliary_lines():
+                    machine_inner.rebuild_subregions()
+
+            elif machine_outer.geom.is_stator():
+                if machine_outer.has_mirrored_windings():
+                    logger.debug("undo mirrored windings of %s", outer_name)
+                    machine_outer = machine_outer.undo_mirror()
+                    machine_inner.sync_with_counterpart(machine_outer)
+                    machine_outer.search_subregions()
+                    machine_outer.create_mirror_lines_outside_windings()
+                if machine_outer.create_stator_auxiliary_lines():
+                    machine_outer.rebuild_subregions()
+
+            machine_inner.delete_tiny_elements(mindist)
+            machine_outer.delete_tiny_elements(mindist)
+            machine_inner.geom.create_corner_areas()
+            profiler.stop(areas=(len(machine_inner.geom.area_list) +
+                                 len(machine_outer.geom.area_list)))
+            logger.info("END of work: %s", basename)
+
+            if show_plots:
+                p.render_elements(machine_inner.geom, Shape,
+                                  draw_inside=True, title=inner_name,
+                                  rows=3, cols=2, num=5, show=False,
+                                  with_corners=False,
+                                  with_nodes=False,
+                                  neighbors=False,
+                                  write_id=write_id,
+                                  fill_areas=True)
+
+                p.render_elements(machine_outer.geom, Shape,
+                                  draw_inside=True, title=outer_name,
+                                  rows=3, cols=2, num=6, show=False,
+                                  with_corners=False,
+                                  with_nodes=False,
+                                  neighbors=False,
+                                  write_id=write_id,
+                                  fill_areas=True)
+                if write_png:
+                    p.write_plot(basename)
+                else:
+                    p.show_plot()
+
+            if show_areas:
+                p.render_elements(machine_inner.geom, Shape,
+                                  title=inner_name,
+                                  show=True,
+                                  draw_inside=True,
+                                  neighbors=True,
+                                  fill_areas=True)
+                p.render_areas(machine_inner.geom,
+                               title=inner_name,
+                               with_nodes=True,
+                               single_view=True)
+
+                p.render_elements(machine_outer.geom, Shape,
+                                  title=outer_name,
+                                  show=True,
+                                  draw_inside=True,
+                                  neighbors=True,
+                                  fill_areas=True)
+                p.render_areas(machine_outer.geom,
+                               title=outer_name,
+                               with_nodes=True,
+                               single_view=True)
+
+            if write_fsl:
+                if machine_inner.is_full() or machine_outer.is_full():
+                    logger.warning("it's not possible to create fsl-file")
+                    return profiler.done(None)
+
+                profiler.start('fsl')
+                fslrenderer = FslRenderer(basename)
+                inner = fslrenderer.render(machine_inner, inner=True)
+                outer = fslrenderer.render(machine_outer, outer=True)
+
+                if machine_inner.geom.is_rotor():
+                    conv['fsl_magnet'] = inner
+                    conv['fsl_stator'] = outer
+                else:
+                    conv['fsl_magnet'] = inner
+                    conv['fsl_rotor'] = outer
+
+                params = create_femag_parameters(machine_inner,
+                                                 machine_outer,
+                                                 nodedist)
 
-        if show_areas:
-            p.render_elements(machine.geom, Shape,
-                              title=name,
-                              show=True,
-                              draw_inside=True,
-                              neighbors=True,
-                              fill_areas=True)
-            p.render_areas(machine.geom,
-                           title=name,
-                           with_nodes=True,
-                           single_view=True)
-
-        if write_fsl:
-            if machine.is_full():
-                logger.warning("it's not possible to create fsl-file")
-                return None
-
-            fslrenderer = FslRenderer(basename)
-            conv['fsl'] = fslrenderer.render(machine, inner, outer)
-            if params:
                 conv.update(params)
+                conv['fsl'] = fslrenderer.render_main(
+                    machine,
+                    machine_inner, machine_outer,
+                    inner, outer,
+                    params)
+                profiler.stop()
+        else:
+            # No airgap found. This must be an inner or outer part
+            name = "No_Airgap"
+            inner = False
+            outer = False
+            params = None
+
+            if part:
+                if part[1] == 'in':
+                    name = inner_name
+                    inner = True
+                else:
+                    name = outer_name
+                    outer = True
+
+            profiler.start('symmetry')
+            machine = symmetry_search(machine,
+                                      p,  # plot
+                                      name,
+                                      is_inner=inner,
+                                      is_outer=outer,
+                                      symtol=symtol,
+                                      sympart=sympart,
+                                      show_plots=show_plots,
+                                      rows=3,  # rows
+                                      cols=2,  # cols
+                                      num=3)   # start num
+
+            if da > 0.0 or dy > 0.0:
+                if inner:
+                    r_out = da / 2.0
+                    r_in = dy / 2.0
+                elif outer:
+                    r_out = dy / 2.0
+                    r_in = da / 2.0
+                else:
+                    r_out = 0.0
+                    r_in = 0.0
+                if machine.cut_is_possible(r_in, r_out):
+                    logger.info("make a cut")
+                    machine = machine.cut(r_in, r_out)
+            profiler.stop(machine.geom)
+
+            profiler.start('subregions')
+            if part:
+                if part[0] == 'stator':
+                    machine.geom.set_stator()
+                    machine.geom.search_stator_subregions(part[1])
 
-    conv['name'] = basename
-    timer.stop("-- all done in %0.4f seconds --")
-    return conv
+                    if machine.has_mirrored_windings():
+                        logger.info("undo mirror of stator")
+                        machine = machine.undo_mirror()
+                        machine.geom.set_stator()
+                        machine.geom.search_stator_subregions(part[1])
+                        machine.geom.looking_for_corners()
+                        machine.create_mirror_lines_outside_windings()
+                    if machine.create_stator_auxiliary_lines():
+                        machine.rebuild_subregions()
+
+                    params = create_femag_parameters_stator(machine,
+                                                            part[1])
+                else:
+                    machine.geom.set_rotor()
+                    machine.geom.search_rotor_subregions(part[1])
+                    machine.geom.looking_for_corners()
+                    if machine.create_rotor_auxiliary_lines():
+                        machine.rebuild_subregions()
+
+                    params = create_femag_parameters_rotor(machine,
+                                                           part[1])
+            else:
+                machine.geom.search_subregions()
+
+            machine.delete_tiny_elements(mindist)
+            machine.geom.create_corner_areas()
+            profiler.stop(machine.geom)
+            logger.info("END of work: %s", basename)
+
+            if show_plots:
+                p.render_elements(machine.geom, Shape,
+                                  draw_inside=True, title=name,
+                                  rows=3, cols=2, num=5, show=False,
+                                  with_corners=False,
+                                  with_nodes=False,
+                                  neighbors=False,
+                                  write_id=write_id,
+                                  fill_areas=True)
+                if write_png:
+                    p.write_plot(basename)
+                else:
+                    p.show_plot()
+
+            if show_areas:
+                p.render_elements(machine.geom, Shape,
+                                  title=name,
+                                  show=True,
+                                  draw_inside=True,
+                                  neighbors=True,
+                                  fill_areas=True)
+                p.render_areas(machine.geom,
+                               title=name,
+                               with_nodes=True,
+                               single_view=True)
+
+            if write_fsl:
+                if machine.is_full():
+                    logger.warning("it's not possible to create fsl-file")
+                    return profiler.done(None)
+
+                profiler.start('fsl')
+                fslrenderer = FslRenderer(basename)
+                conv['fsl'] = fslrenderer.render(machine, inner, outer)
+                profiler.stop()
+                if params:
+                    conv.update(params)
+
+        conv['name'] = basename
+        timer.stop("-- all done in %0.4f seconds --")
+        return profiler.done(conv)
+    finally:
+        profiler.close()
 
 
 def create_femag_parameters(m_inner, m_outer, nodedist=1):
@@ -12,6 +12,9 @@ import logging
 import numpy as np
 import copy
 import time
+import json
+import os
+import threading
 
 logger = logging.getLogger('femagtools.functions')
 
@@ -462,3 +465,140 @@ class Timer(object):
             else:
                 logger.debug(fmt, sec)
         return sec
+
+
+class Profiler(object):
+    """records wall time, element/node/area counts and memory of the
+    stages of a conversion
+
+    Stages are sequential (start/stop), events are timed steps within
+    the stages such as create_list_of_areas that are reported through
+    Profiler.record while the profiler is current. The current
+    profiler is kept per thread, conversions running in other threads
+    keep their own profiles. Memory tracing (tracemalloc) is process
+    wide however.
+    """
+    _local = threading.local()  # profiler of the running conversion
+
+    def __init__(self, trace_memory=False, trace_file=None):
+        current = Profiler.get_current()
+        if current is not None:
+            current.close()
+        Profiler._local.current = self
+        self.trace_memory = trace_memory
+        self.trace_file = trace_file
+        self.stages = []
+        self.events = []
+        self.totals = dict()
+        self.stage = None
+        self.tracing = False
+        if trace_memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.tracing = True
+        self.starttime = time.perf_counter()
+
+    @staticmethod
+    def _maxrss():
+        """returns the peak resident memory of the process in kB"""
+        try:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        except ImportError:  # Windows
+            return 0
+
+    @staticmethod
+    def counts(geom):
+        """returns the number of elements, nodes and areas of geom"""
+        return dict(elements=geom.number_of_edges(),
+                    nodes=geom.number_of_nodes(),
+                    areas=len(geom.area_list))
+
+    def start(self, name):
+        if self.stage is not None:
+            self.stop()
+        if self.trace_memory:
+            import tracemalloc
+            tracemalloc.reset_peak()
+        self.stage = dict(name=name,
+                          start=time.perf_counter() - self.starttime)
+
+    def stop(self, geom=None, **counts):
+        if self.stage is None:
+            logger.error("Profiler stage is not running")
+            return
+        stage, self.stage = self.stage, None
+        stage['time'] = (time.perf_counter() - self.starttime
+                         - stage['start'])
+        if geom is not None:
+            stage.update(self.counts(geom))
+        stage.update(counts)
+        stage['maxrss'] = self._maxrss()
+        if self.trace_memory:
+            import tracemalloc
+            stage['peak_memory'] = tracemalloc.get_traced_memory()[1]
+        logger.info("stage %s: %0.4f seconds", stage['name'], stage['time'])
+        self.stages.append(stage)
+
+    def event(self, name, tstart, **counts):
+        """adds the step name that started at perf_counter tstart"""
+        sec = time.perf_counter() - tstart
+        self.events.append(dict(name=name,
+                                start=tstart - self.starttime,
+                                time=sec, **counts))
+        total = self.totals.setdefault(name, dict(calls=0, time=0.0))
+        total['calls'] += 1
+        total['time'] += sec
+
+    @classmethod
+    def get_current(cls):
+        """returns the current profiler of this thread or None"""
+        return getattr(cls._local, 'current', None)
+
+    @classmethod
+    def record(cls, name, tstart, **counts):
+        """adds a step to the current profiler if there is one"""
+        current = cls.get_current()
+        if current is not None:
+            current.event(name, tstart, **counts)
+
+    def result(self):
+        return dict(stages=self.stages,
+                    totals=self.totals,
+                    total=time.perf_counter() - self.starttime)
+
+    def close(self):
+        if self.stage is not None:
+            self.stop()
+        if self.tracing:
+            import tracemalloc
+            tracemalloc.stop()
+            self.tracing = False
+        if Profiler.get_current() is self:
+            Profiler._local.current = None
+
+    def done(self, conv):
+        """finishes the profile, adds it to the dict conv and
+        writes the trace file"""
+        self.close()
+        if isinstance(conv, dict):
+            conv['profile'] = self.result()
+        if self.trace_file:
+            self.write_trace(self.trace_file)
+        return conv
+
+    def write_trace(self, filename):
+        """writes the stages and events in Chrome trace format"""
+        pid = os.getpid()
+        events = []
+        for tid, entries in enumerate((self.stages, self.events)):
+            for e in entries:
+                events.append(dict(
+                    name=e['name'], ph='X', pid=pid, tid=tid,
+                    ts=1e6*e['start'], dur=1e6*e['time'],
+                    args={k: v for k, v in e.items()
+                          if k not in ('name', 'start', 'time')}))
+        with open(filename, 'w') as fp:
+            json.dump(dict(traceEvents=events,
+                           displayTimeUnit='ms'), fp, indent=1)
@@ -29,7 +29,7 @@ from .functions import middle_angle
 from .functions import normalise_angle, is_same_angle
 from .functions import part_of_circle, gcd
 from .functions import point_on_arc, nodes_are_equal
-from .functions import area_size
+from .functions import area_size, Profiler
 import io
 import time
 
@@ -74,30 +74,188 @@ def plot_area(area):
 ndec = 6  # number of decimals to round to
 
 
+class ElementGrid(object):
+    """uniform grid of the element bounding boxes used by
+    intersect_and_split to find the candidates of an element.
+
+    The boxes are enlarged by the tolerances used in the intersection
+    and overlapping tests such that elements whose boxes do not
+    touch can neither intersect nor overlap. Elements covering too many
+    cells and elements without a finite box are candidates of every
+    query.
+    """
+
+    max_cells = 64
+
+    def __init__(self, elements, rtol, atol):
+        self.rtol = rtol
+        self.atol = atol
+        boxes = [b for b in [self._minmax(e) for e in elements]
+                 if b is not None]
+        if boxes:
+            b = np.array(boxes)
+            xmin, ymin = np.min(b[:, 0]), np.min(b[:, 2])
+            xmax, ymax = np.max(b[:, 1]), np.max(b[:, 3])
+            self.scale = np.max(np.abs(b))
+        else:
+            xmin, ymin, xmax, ymax = 0.0, 0.0, 1.0, 1.0
+            self.scale = 1.0
+        self.x0, self.y0 = xmin, ymin
+        # about one element per cell
+        size = max(xmax - xmin, ymax - ymin)
+        self.cellsize = max(size/max(np.sqrt(len(boxes)), 1.0),
+                            2*self.margin(0.0), 1e-12)
+        self.cells = dict()
+        self.everywhere = []
+
+    @staticmethod
+    def _minmax(e):
+        try:
+            mm = e.minmax()
+        except Exception:
+            return None
+        if not np.all(np.isfinite(mm)):
+            return None
+        return mm
+
+    def margin(self, size, radius=0.0):
+        """returns the tolerance margin of an element"""
+        return 2*(self.atol + self.rtol*(self.scale + radius) +
+                  2*(self.atol + self.rtol)*size)
+
+    def box(self, e):
+        """returns the cell index range covered by e or None"""
+        mm = self._minmax(e)
+        if mm is None:
+            return None
+        size = max(mm[1] - mm[0], mm[3] - mm[2])
+        d = self.margin(size, getattr(e, 'radius', 0.0))
+        i0 = int(np.floor((mm[0] - d - self.x0)/self.cellsize))
+        i1 = int(np.floor((mm[1] + d - self.x0)/self.cellsize))
+        j0 = int(np.floor((mm[2] - d - self.y0)/self.cellsize))
+        j1 = int(np.floor((mm[3] + d - self.y0)/self.cellsize))
+        if (i1 - i0 + 1)*(j1 - j0 + 1) > self.max_cells:
+            return None
+        return i0, i1, j0, j1
+
+    def add(self, e, x):
+        """registers element e with index x"""
+        b = self.box(e)
+        if b is None:
+            self.everywhere.append(x)
+            return
+        i0, i1, j0, j1 = b
+        for i in range(i0, i1+1):
+            for j in range(j0, j1+1):
+                self.cells.setdefault((i, j), []).append(x)
+
+    def candidates(self, e, start, stop):
+        """returns the sorted indices in [start, stop) that may
+        intersect or overlap with element e"""
+        b = self.box(e)
+        if b is None:
+            return range(start, stop)
+        i0, i1, j0, j1 = b
+        found = set([x for x in self.everywhere if start <= x < stop])
+        for i in range(i0, i1+1):
+            for j in range(j0, j1+1):
+                found.update([x for x in self.cells.get((i, j), [])
+                              if start <= x < stop])
+        return sorted(found)
+
+
+class NodeIndex(object):
+    """spatial hash of the graph nodes for the nearest node queries
+    of Geometry.
+
+    Ties are resolved by the insertion order of the nodes which is the
+    order of the nodes in the graph.
+    """
+
+    def __init__(self, cellsize, nodes=[]):
+        self.cellsize = cellsize
+        self.cells = dict()
+        self.seq = dict()
+        self.count = 0
+        for n in nodes:
+            self.add(n)
+
+    def __len__(self):
+        return len(self.seq)
+
+    def _cell(self, x, y):
+        return (int(np.floor(x/self.cellsize)),
+                int(np.floor(y/self.cellsize)))
+
+    def add(self, n):
+        if n in self.seq:
+            return
+        self.seq[n] = self.count
+        self.count += 1
+        self.cells.setdefault(self._cell(n[0], n[1]), []).append(n)
+
+    def remove(self, n):
+        if n not in self.seq:
+            return
+        del self.seq[n]
+        c = self._cell(n[0], n[1])
+        self.cells[c].remove(n)
+        if not self.cells[c]:
+            del self.cells[c]
+
+    def nearest(self, p, maxdist, exclude=None):
+        """returns the tuple (distance, node) of the closest node with
+        distance < maxdist or None"""
+        x, y = float(p[0]), float(p[1])
+        i0, j0 = self._cell(x - maxdist, y - maxdist)
+        i1, j1 = self._cell(x + maxdist, y + maxdist)
+        best = None
+        for i in range(i0, i1+1):
+            for j in range(j0, j1+1):
+                for n in self.cells.get((i, j), []):
+                    if n == exclude:
+                        continue
+                    dx, dy = n[0] - x, n[1] - y
+                    k = (np.sqrt(dx*dx + dy*dy), self.seq[n])
+                    if k[0] < maxdist and (best is None or k < best[0]):
+                        best = (k, n)
+        if best is None:
+            return None
+        return best[0][0], best[1]
+
+
 def intersect_and_split(inp_elements, rtol, atol):
     logger.info("Load input elements ... ")
     out_elements = []
+    grid = ElementGrid(inp_elements, rtol, atol)
     for e in inp_elements:
         out_size = len(out_elements)
-        intersect_and_split_element(e, out_elements, 0, out_size, rtol, atol)
+        intersect_and_split_element(e, out_elements, 0, out_size, rtol, atol,
+                                    grid)
     return out_elements
 
 
 def intersect_and_split_element(el, out_elements, out_start,
-                                out_size, rtol, atol):
+                                out_size, rtol, atol, grid=None):
     # appends splitted elements
     # Unchanged out_size prevents repeated processing in recursive calls
-    for x in range(out_start, out_size):
-        split_el = add_or_split(el, x, out_elements, rtol, atol)
+    if grid is None:
+        candidates = range(out_start, out_size)
+    else:
+        candidates = grid.candidates(el, out_start, out_size)
+    for x in candidates:
+        split_el = add_or_split(el, x, out_elements, rtol, atol, grid)
         if len(split_el) > 0:
             for e in split_el:
                 intersect_and_split_element(e, out_elements, x+1,
-                                            out_size, rtol, atol)
+                                            out_size, rtol, atol, grid)
             return
+    if grid is not None:
+        grid.add(el, len(out_elements))
     out_elements.append(el)
 
 
-def add_or_split(el, x, out_elements, rtol, atol):
+def add_or_split(el, x, out_elements, rtol, atol, grid=None):
     if out_elements[x] is None:
         return []
     split_el = el.overlapping_shape(out_elements[x], rtol, atol)
@@ -110,6 +268,9 @@ def add_or_split(el, x, out_elements, rtol, atol):
     if len(points) > 0:
         split_elements = out_elements[x].split(points, rtol, atol)
         if len(split_elements) > 0:
+            if grid is not None:
+                for i, e in enumerate(split_elements):
+                    grid.add(e, len(out_elements) + i)
             out_elements += split_elements
             out_elements[x] = None
         split_el = el.split(points, rtol, atol)
@@ -318,6 +479,7 @@ class Geometry(object):
         self.g = nx.Graph()
         self.rtol = rtol
         self.atol = atol
+        self.node_index = None
         self.debug = debug
         self.num_edges = 0
         self.wdg_is_mirrored = False
@@ -339,6 +501,8 @@ class Geometry(object):
                     logger.warn("EXCEPTION %s", ex)
                     if e:  # must be a circle
                         self.g.add_node(e.center, object=e)
+                        if self.node_index is not None:
+                            self.node_index.add(e.center)
             i += 1
 
         self.num_edges = self.number_of_edges()
@@ -378,6 +542,7 @@ class Geometry(object):
                        round(n[1] + offset[1], ndec))
                    for n in self.g.nodes()}
         nx.relabel_nodes(self.g, mapping, copy=False)
+        self.node_index = None
 
     def rotate(self, alpha):
         """rotates all objects by angle alpha"""
@@ -392,6 +557,7 @@ class Geometry(object):
                        round(r[1], ndec))
                    for n, r in zip(self.g.nodes(), rotnodes)}
         nx.relabel_nodes(self.g, mapping, copy=False)
+        self.node_index = None
 
     def check_geom(self, what):
         logger.debug("check geometry of %s", what)
@@ -447,6 +613,7 @@ class Geometry(object):
                        round(factor * n[1], ndec))
                    for n in self.g.nodes()}
         nx.relabel_nodes(self.g, mapping, copy=False)
+        self.node_index = None
         self.diameters = tuple([factor*d for d in self.diameters])
 
     def find_nodes0(self, *points):
@@ -455,8 +622,26 @@ class Geometry(object):
                        for x in p])
                 for p in points]
 
+    def get_node_index(self):
+        """return the spatial index of the graph nodes"""
+        # the size check catches nodes added or removed in self.g directly
+        if (self.node_index is None or
+                len(self.node_index) != self.g.number_of_nodes()):
+            self.node_index = NodeIndex(max(self.atol, 0.05), self.g)
+        return self.node_index
+
     def find_nodes(self, *points, **kwargs):
         """return closest nodes to points in arg within pickdist"""
+        if kwargs.get('g', self.g) is self.g:
+            index = self.get_node_index()
+            n = []
+            for p in points:
+                r = index.nearest(p, self.atol)
+                if r:
+                    n.append(r[1])
+                else:
+                    n.append((round(p[0], ndec), round(p[1], ndec)))
+            return n
         n = []
         nodes = list(kwargs.get('g', self.g))
         if nodes:
@@ -477,6 +662,14 @@ class Geometry(object):
 
     def find_node(self, p, **kwargs):
         """return closest nodes to points in arg within pickdist"""
+        if kwargs.get('g', self.g) is self.g:
+            index = self.get_node_index()
+            r = index.nearest(p, 0.05)
+            if r and r[0] == 0.0:  # myself
+                r = index.nearest(p, 0.05, exclude=r[1])
+                if r:
+                    return r[1]
+            return None
         nodes = list(kwargs.get('g', self.g))
         if nodes:
             anodes = np.asarray(nodes)
@@ -494,6 +687,11 @@ class Geometry(object):
 
     def find_the_node(self, p, **kwargs):
         """return closest nodes to points in arg within pickdist"""
+        if kwargs.get('g', self.g) is self.g:
+            r = self.get_node_index().nearest(p, self.atol)
+            if r:
+                return r[1]
+            return None
         nodes = list(kwargs.get('g', self.g))
         if nodes:
             anodes = np.asarray(nodes)
@@ -555,6 +753,9 @@ class Geometry(object):
         entity.set_nodes(n1, n2)
         logger.debug("add_edge %s - %s  (%s)", n1, n2, entity.classname())
         self.g.add_edge(n1, n2, object=entity)
+        if self.node_index is not None:
+            self.node_index.add(n1)
+            self.node_index.add(n2)
 
     def get_edge(self, eg):
         return [[e[0], e[1], e[2]['object']] for e in self.g.edges(data=True)
@@ -855,6 +1056,7 @@ class Geometry(object):
              for c in corners if not c.keep_node()]
         except Exception as e:
             logger.warn("Warning: %s", e)
+        self.node_index = None
 
         # Rebuild Corner-list after correction
         center_added, corners = self.get_corner_list(center, angle, rtol, atol)
@@ -1279,9 +1481,12 @@ class Geometry(object):
             # list already available
             return
 
+        tstart = time.perf_counter()
         areabuilder = AreaBuilder(geom=self)
         areabuilder.create_list_of_areas(main=False)
         self.area_list = areabuilder.area_list
+        Profiler.record('create_list_of_areas', tstart,
+                        areas=len(self.area_list))
         return
 
         def append(area_list, a):
@@ -4,13 +4,15 @@
 __author__ = 'Max Hullmann, Dapu Zhang'
 
 import logging
-import warnings
 from .amela import Amela
 import numpy as np
 from numpy import sinh, sin, cosh, cos, pi
 from scipy.interpolate import RBFInterpolator
 
 MUR0 = 4*np.pi*10**-7
+# harmonic series of the geometry correction factor
+_N5 = (2*np.arange(100) + 1)**5
+_LAMBDA_N = (2*np.arange(100) + 1)*pi
 #  set logging
 logger = logging.getLogger(__name__)
 
@@ -282,82 +284,76 @@ class MagnLoss(Amela):
         return [bx_fft, by_fft, px_se, py_se]
 
     def calc_pvpm(self, bamp, f, nu, wm, hm, delta_eff):
-        '''calculate eddy current losses for each frequency'''
-        wm_nu = wm
-        k_xi = 1
-        k_eta = 1
-
-        if nu > 1:
-            wm_nu = 0.5*wm/(nu - 1)
-            k_xi = 0.895
-            k_eta = 1.15
-
-        alpha = (hm + delta_eff*self.mur)/hm
-        delta = np.sqrt(alpha)*self.skin_depth(f)
-        xi = k_xi*wm_nu/delta
-        eta = self.lm/(wm_nu*k_eta)
-
-        # caclulation correction factor geometry
-        if xi*eta < 500.:
-            c_ef_n0 = 32/pi**5/eta/dfac(xi)*6
-            sum_r = 0.0
-            sum_i = 0.0
-            n = np.array([i for i in range(100)])
-            lambda_n = (2*n + 1)*pi
-            beta_n = np.sqrt(lambda_n ** 2 + 2j*xi**2)
-            beta_nr = np.real(beta_n)
-            beta_ni = np.imag(beta_n)
-
-            deno = 1. / ((2*n + 1)**5*abs(beta_n)**6*(cosh(beta_nr*eta) + cos(beta_ni*eta)))
-            add_i = ((lambda_n**2 - 2*beta_ni**2)*beta_nr*lambda_n**3*sinh(beta_nr*eta))*deno
-            add_r = ((lambda_n**2 + 2*beta_nr**2)*beta_ni*lambda_n**3*sin(beta_ni*eta))*deno
-
-            sum_r = np.sum(np.nan_to_num(add_r, copy=True, nan=0))
-            sum_i = np.sum(np.nan_to_num(add_i, copy=True, nan=0))
-            c_ef = 1 - c_ef_n0*(sum_i + sum_r)
+        '''calculate eddy current losses for each frequency
 
-        else:
-            c_ef = 1 + 1/eta
-
-        # calculation correction factor reaction field
-        c_rf = dfac(xi)
-        if np.isnan(c_rf):
-            c_rf = 0
-
-        result = self.sigma*f**2*bamp**2*wm**3*hm*self.lm*c_ef*c_rf
-        # calculation ec losses
-        if nu > 1:
-            return 0.5/(nu-1)**2*result
-        else:
-            return pi**2/6*result
+        all arguments may be scalars or arrays of broadcastable shape
+        '''
+        bamp, f, nu, wm, hm, delta_eff = np.broadcast_arrays(
+            *[np.asarray(a, dtype=float)
+              for a in (bamp, f, nu, wm, hm, delta_eff)])
+        harmonic = nu > 1
+        nu1 = np.where(harmonic, nu - 1, 1)
+        wm_nu = np.where(harmonic, 0.5*wm/nu1, wm)
+        k_xi = np.where(harmonic, 0.895, 1)
+        k_eta = np.where(harmonic, 1.15, 1)
+
+        with np.errstate(all='ignore'):
+            alpha = (hm + delta_eff*self.mur)/hm
+            delta = np.sqrt(alpha)*self.skin_depth(f)
+            xi = k_xi*wm_nu/delta
+            eta = self.lm/(wm_nu*k_eta)
+
+            # caclulation correction factor geometry
+            c_ef = np.array(1 + 1/eta)
+            series = xi*eta < 500.
+            if np.any(series):
+                xs = xi[series][:, None]
+                es = eta[series][:, None]
+                c_ef_n0 = 32/pi**5/es/dfac(xs)*6
+                beta_n = np.sqrt(_LAMBDA_N**2 + 2j*xs**2)
+                beta_nr = np.real(beta_n)
+                beta_ni = np.imag(beta_n)
+
+                deno = 1. / (_N5*abs(beta_n)**6*(cosh(beta_nr*es) + cos(beta_ni*es)))
+                add_i = ((_LAMBDA_N**2 - 2*beta_ni**2)*beta_nr*_LAMBDA_N**3*sinh(beta_nr*es))*deno
+                add_r = ((_LAMBDA_N**2 + 2*beta_nr**2)*beta_ni*_LAMBDA_N**3*sin(beta_ni*es))*deno
+
+                sum_r = np.sum(np.nan_to_num(add_r, copy=False, nan=0), axis=-1)
+                sum_i = np.sum(np.nan_to_num(add_i, copy=False, nan=0), axis=-1)
+                c_ef[series] = 1 - c_ef_n0[:, 0]*(sum_i + sum_r)
+
+            # calculation correction factor reaction field
+            c_rf = dfac(xi)
+            c_rf = np.where(np.isnan(c_rf), 0, c_rf)
+
+            result = self.sigma*f**2*bamp**2*wm**3*hm*self.lm*c_ef*c_rf
+            # calculation ec losses
+            result = np.where(harmonic, 0.5/nu1**2*result, pi**2/6*result)
+        if result.ndim == 0:
+            return float(result)
+        return result
 
     def loss(self, bx_fft, by_fft, px_se, py_se, wm, hm):
         '''calculate losses in x and y direction'''
         (ny, nx, lfft) = px_se.shape
-        pec = np.zeros((len(self.segx), len(self.segz)))
+        segx = np.asarray(self.segx, dtype=float)
         nu = np.abs(np.fft.fftfreq(nx, 1/nx))+1
         mu = np.abs(np.fft.fftfreq(ny, 1/ny))+1
-        for jj in range(len(self.segx)):
-            for kk in range(len(self.segz)):
-                for c in range(lfft):
-                    for iy in range(ny):
-                        for ix in range(nx):
-                            if self.is_x and nu[ix] < 2:
-                                with warnings.catch_warnings():
-                                    warnings.simplefilter('ignore')
-                                    px_se[iy,ix,c] = self.calc_pvpm(bx_fft[iy,ix,c], max(c/self.tgrid, 1e-6),
-                                                                    mu[iy], hm, wm/self.segx[jj], 0)
-
-                            if mu[iy] < 2:
-                                with warnings.catch_warnings():
-                                    warnings.simplefilter('ignore')
-                                    py_se[iy,ix,c] = self.calc_pvpm(by_fft[iy,ix,c], max(c/self.tgrid, 1e-6),
-                                                                    nu[ix], wm/self.segx[jj], hm, 0)
-                py_sum = np.sum(py_se)
-                px_sum = np.sum(px_se)
-                pec[jj,kk] = (py_sum + px_sum)*(self.ls/self.lm)*self.numpoles*self.segx[jj]
-
-        return np.sum(pec)
+        f = np.maximum(np.arange(lfft)/self.tgrid, 1e-6)
+        # only the fundamental row (mu = 1) and column (nu = 1)
+        # contribute, evaluate them for all segments at once:
+        # shape (segx, grid, harmonics)
+        wmseg = wm/segx[:, None, None]
+        py = self.calc_pvpm(by_fft[0], f, nu[:, None], wmseg, hm, 0)
+        py_se[0] = py[-1]
+        pec = np.sum(py, axis=(1, 2))
+        if self.is_x:
+            px = self.calc_pvpm(bx_fft[:, 0], f, mu[:, None], hm, wmseg, 0)
+            px_se[:, 0] = px[-1]
+            pec += np.sum(px, axis=(1, 2))
+        # the losses do not depend on the segmentation in z direction
+        pec *= (self.ls/self.lm)*self.numpoles*segx
+        return np.sum(pec)*len(self.segz)
 
     def calc_losses(self):
         '''calculate magnet losses for every load case
@@ -191,6 +191,28 @@ class BaseFemag(object):
                 for m in model.set_magcurves(
             self.magnetizingCurves, self.magnets)]
 
+    def stage_magnetizing_curves(self, model, staged, recsin=''):
+        """write the mc files of model into a subdirectory of workdir
+        unless they are in staged already (to be linked from a file store)
+
+        Args:
+            model: machine model
+            staged: dict of written mc files (updated)
+            recsin: either 'flux' or 'cur' (see copy_magnetizing_curves)
+
+        Return:
+            list of mc pathnames
+        """
+        key = (frozenset(model.set_magcurves(
+            self.magnetizingCurves, self.magnets)), recsin)
+        if key not in staged:
+            dirname = os.path.join(self.workdir, f'mc{len(staged)}')
+            os.makedirs(dirname, exist_ok=True)
+            staged[key] = [os.path.join(dirname, f)
+                           for f in self.copy_magnetizing_curves(
+                                   model, dir=dirname, recsin=recsin)]
+        return staged[key]
+
     def create_wdg_def(self, model):
         name = 'winding'
         w = femagtools.windings.Winding(
@@ -707,8 +729,7 @@ class ZmqFemag(BaseFemag):
             self.femagTask.proc.kill()
             self.femagTask.proc.wait()
             self.femagTask = None
-            self.request_socket = None
-            self.subscriber.stop()
+            self.close()
             self.subscriber = None
             logger.info("stopFemagTask Done")
         else:
@@ -789,6 +810,8 @@ class ZmqFemag(BaseFemag):
         Return:
             status
         """
+        if not self.request_socket:
+            self.request_socket = self.__req_socket()
         header = 'FSL'
         self.request_socket.send_string(header, flags=zmq.SNDMORE)
 
@@ -798,39 +821,40 @@ class ZmqFemag(BaseFemag):
             self.request_socket.send_string(fsl)
         logger.debug("Sent fsl wait for response")
 
-        if timeout:
-            self.request_socket.setsockopt(zmq.RCVTIMEO, timeout)
-            self.request_socket.setsockopt(zmq.LINGER, 0)
-        else:
-            self.request_socket.setsockopt(zmq.RCVTIMEO, -1)  # default value
-        import datetime
-        startTime = datetime.datetime.now() if timeout else None
+        try:
+            response = self.__recv(timeout)
+        except Exception as e:
+            logger.exception("send_fsl")
+            logger.error("send_fsl: %s", str(e))
+            msg = json.dumps(str(e))
+            return ['{"status":"error", "message":'+msg+'}', '{}']
+        # NOTE: femag encoding is old school
+        return [s.decode('latin1') for s in response]
+
+    def __recv(self, timeout=None):
+        """returns the response of the request (list of bytes) or
+        an error status if the femag process started by run has
+        terminated or the timeout (milliseconds) has expired"""
+        # wait in short intervals to detect a terminated femag process
+        self.request_socket.setsockopt(zmq.RCVTIMEO,
+                                       min(timeout, 1000) if timeout else 1000)
+        self.request_socket.setsockopt(zmq.LINGER, 0)
+        tstart = time.monotonic()
         while True:
             try:
-                response = self.request_socket.recv_multipart()
-                # NOTE: femag encoding is old school
-                return [s.decode('latin1') for s in response]
-            except zmq.error.Again as e:
-                logger.info("Again [%s], timeout: %d", str(e), timeout)
-                if not startTime:
-                    continue
-
-                diffTime = datetime.datetime.now() - startTime
-                logger.debug("Diff msec[%d]", diffTime.microseconds)
-                if diffTime.microseconds < timeout:
+                return self.request_socket.recv_multipart()
+            except zmq.error.Again:
+                if (getattr(self, 'femagTask', None) is not None and
+                        not self.__is_running()):
+                    msg = "Femag is not running"
+                elif timeout and 1000*(time.monotonic() - tstart) >= timeout:
+                    msg = f"no response within {timeout} ms"
+                else:
                     continue
-
-                logger.info("ALERT not running close socket")
-                self.close()
-                return ['{"status":"error", "message":"Femag is not running"}', '{}']
-
-            except Exception as e:
-                logger.exception("send_fsl")
-                logger.error("send_fsl: %s", str(e))
-                if timeout:  # only first call raises zmq.error.Again
-                    return ['{"status":"error", "message":"Femag is not running"}', '{}']
-                msg = json.dumps(str(e))
-                return ['{"status":"error", "message":'+msg+'}', '{}']
+            logger.error("port %s: %s", self.port, msg)
+            self.close()  # the request socket cannot be used again
+            return [b'{"status":"error", "message":"' + msg.encode() + b'"}',
+                    b'{}']
 
     def run(self, options=['-b'], restart=False, procId=None,
             stateofproblem='mag_static'):  # noqa: C901
@@ -949,14 +973,19 @@ class ZmqFemag(BaseFemag):
         self.request_socket.send_string(f'copyfile {filename} {dirname}')
         return [r.decode() for r in self.request_socket.recv_multipart()]
 
-    def change_case(self, dirname):
-        """change case to dirname (FEMAG 9.2)"""
+    def change_case(self, dirname, timeout=None):
+        """change case to dirname (FEMAG 9.2)
+
+        Args:
+            dirname: name of case directory
+            timeout: The maximum time (in milliseconds) to wait for a response
+        """
         logger.info("change_case to :  %s", dirname)
         if not self.request_socket:
             self.request_socket = self.__req_socket()
         self.request_socket.send_string('CONTROL', flags=zmq.SNDMORE)
         self.request_socket.send_string(f'casedir {dirname}')
-        return [r.decode() for r in self.request_socket.recv_multipart()]
+        return [r.decode() for r in self.__recv(timeout)]
 
     def delete_case(self, dirname):
         """delete case dir (FEMAG 9.2)"""
@@ -8,6 +8,9 @@ import os
 import re
 import sys
 import math
+import hashlib
+from collections import OrderedDict
+import numpy as np
 import femagtools.windings
 from femagtools.poc import Poc
 from . import __version__
@@ -18,6 +21,63 @@ class FslBuilderError(Exception):
     pass
 
 
+class _Missing:
+    def __repr__(self):
+        return 'femagtools.fsl.MISSING'
+
+
+_MISSING = _Missing()
+# markers of repr strings that do not show the complete contents
+_LOSSY_REPR = ('array(', ' at 0x', '...', '<')
+
+
+def _canonical(obj):
+    """returns a hashable representation of the contents of obj"""
+    if isinstance(obj, dict):
+        return ('dict',) + tuple((repr(k), _canonical(v))
+                                 for k, v in obj.items())
+    if isinstance(obj, (list, tuple)):
+        return (type(obj).__name__,) + tuple(_canonical(v) for v in obj)
+    if isinstance(obj, (str, int, float, complex, bool, type(None),
+                        np.generic)):
+        return type(obj).__name__, repr(obj)
+    if isinstance(obj, np.ndarray):
+        return 'ndarray', obj.dtype.str, obj.shape, obj.tobytes()
+    if hasattr(obj, '__dict__'):
+        return (type(obj).__qualname__, _canonical(vars(obj)))
+    raise TypeError(f"{type(obj)}")
+
+
+def _digest(obj):
+    """returns the hash of the contents of obj"""
+    r = repr(obj)
+    if any(m in r for m in _LOSSY_REPR):
+        r = repr(_canonical(obj))
+    return hashlib.sha1(r.encode()).digest()
+
+
+def _attr_digest(model, names):
+    """returns the hash of the attributes names of model"""
+    return _digest([(n, model.__dict__.get(n, _MISSING)) for n in names])
+
+
+def _tracking_proxy(model, names):
+    """returns an object of the class of model that shares its
+    attributes and adds the names of all attributes read to names"""
+    cls = type(model)
+
+    def __getattribute__(self, name):
+        if (name in object.__getattribute__(self, '__dict__') or
+                not hasattr(cls, name)):
+            names.add(name)
+        return object.__getattribute__(self, name)
+
+    proxy = object.__new__(type(cls.__name__, (cls,),
+                                dict(__getattribute__=__getattribute__)))
+    proxy.__dict__ = model.__dict__
+    return proxy
+
+
 def cosys(model):
     if model.get('move_action', 0) == 0:
         return 'cosys("polar")'
@@ -25,7 +85,19 @@ def cosys(model):
 
 
 class Builder:
-    def __init__(self, templatedirs=[]):
+    """creates FSL scripts from templates
+
+    Args:
+        templatedirs: (list) names of directories that include
+            mako files as fsl templates
+        module_directory: name of directory where the compiled
+            templates are stored for reuse (default None: in memory only)
+        render_cache_size: max number of rendered fragments that are
+            kept to be reused for identical template parameters
+    """
+
+    def __init__(self, templatedirs=[], module_directory=None,
+                 render_cache_size=1024):
         dirs = templatedirs
         if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
             # lookup up files in pyinstaller bundle
@@ -37,9 +109,13 @@ class Builder:
                      os.path.join(os.getcwd(), '.')]
         self.lookup = mako.lookup.TemplateLookup(
             directories=dirs,
+            module_directory=module_directory,
             input_encoding='utf-8',
             output_encoding='utf-8',
             default_filters=['decode.utf8'])
+        self.render_cache = OrderedDict()
+        self.render_cache_size = render_cache_size
+        self.render_deps = {}  # template uri: set of attribute names
 
         self.fsl_stator = False
         self.fsl_magnet = False
@@ -737,7 +813,7 @@ class Builder:
             try:
                 template = self.lookup.get_template(templ)
                 logger.debug('use file {}'.format(templ))
-                return template.render_unicode(model=model).split('\n')
+                return self.__render_cached(template, model)
             except mako.exceptions.TopLevelLookupException:
                 logger.error('File {} not found'.format(templ))
                 sys.exit(1)
@@ -753,7 +829,46 @@ class Builder:
             if magnet:
                 self.fsl_magnet = True
 
-        return template.render_unicode(model=model).split('\n')
+        return self.__render_cached(template, model)
+
+    def __render_cached(self, template, model):
+        """returns the lines of the rendered template which are reused
+        if the template has been rendered with identical parameters.
+        The parameters of a dict are all its items, those of a model
+        object are the attributes read by the template."""
+        if not self.render_cache_size:
+            return template.render_unicode(model=model).split('\n')
+        uri = template.uri
+        try:
+            if isinstance(model, dict):
+                keys = [(uri, type(model).__name__, _digest(model))]
+            else:
+                keys = [(uri, names, _attr_digest(model, names))
+                        for names in self.render_deps.get(uri, ())]
+        except TypeError:  # unknown parameter type
+            return template.render_unicode(model=model).split('\n')
+        for key in keys:
+            if key in self.render_cache:
+                self.render_cache.move_to_end(key)
+                return list(self.render_cache[key])
+
+        if isinstance(model, dict):
+            fsl = template.render_unicode(model=model).split('\n')
+            key = keys[0]
+        else:
+            names = set()
+            fsl = template.render_unicode(
+                model=_tracking_proxy(model, names)).split('\n')
+            names = tuple(sorted(names))
+            self.render_deps.setdefault(uri, set()).add(names)
+            try:
+                key = (uri, names, _attr_digest(model, names))
+            except TypeError:
+                return fsl
+        self.render_cache[key] = fsl
+        if len(self.render_cache) > self.render_cache_size:
+            self.render_cache.popitem(last=False)
+        return list(fsl)
 
     def render_template(self, content_template, parameters):
         template = mako.template.Template(content_template)
@@ -438,6 +438,7 @@ class Engine():
         Return:
             length of started tasks (int)
         """
+        self.job.prepare()
         self._create_data_buckets()
         self._upload_files_to_buckets()
         self._start_instances()
@@ -4,10 +4,13 @@
 """
 import re
 import sys
+import mmap
 import struct
 from enum import Enum
 import logging
 from collections import Counter, defaultdict
+from collections.abc import Sequence
+from functools import lru_cache
 import numpy as np
 
 logger = logging.getLogger('femagtools.isa7')
@@ -72,18 +75,55 @@ class ElType(Enum):
     SquareRectangle = 4
 """Types of elements"""
 
+_NP_TYPES = {'?': 'i4', 'b': 'i1', 'B': 'u1', 'h': 'i2', 'H': 'u2',
+             'i': 'i4', 'I': 'u4', 'l': 'i4', 'L': 'u4', 'q': 'i8',
+             'Q': 'u8', 'f': 'f4', 'd': 'f8'}
+
+
+@lru_cache(maxsize=None)
+def _block_dtype(fmt):
+    """return numpy record dtype and list of (field, type code, size)
+    of struct format string (native byte order, no alignment)"""
+    fields = []
+    for count, code in re.findall(r"([0-9]*)([?a-zA-Z])", fmt):
+        if code == 's':
+            fields.append(('s', int(count or 1)))
+        else:
+            fields += int(count or 1)*[(code, 0)]
+    names = [f'f{i}' for i in range(len(fields))]
+    dtype = np.dtype(
+        [(n, f'V{size}' if code == 's' else '=' + _NP_TYPES[code])
+         for n, (code, size) in zip(names, fields)])
+    return dtype, [(n, code, size) for n, (code, size) in zip(names, fields)]
+
+
 class Reader(object):
     """
     Open and Read I7/ISA7 file
 
     Arguments:
         filename: name of I7/ISA7 file to be read
+        use_mmap: memory-map the file and return the columns of each
+            block as numpy arrays instead of lists. The arrays are copied
+            from the mapping which is closed after reading.
     """
 
-    def __init__(self, filename):
+    def __init__(self, filename, use_mmap=False):
         self.BR_TEMP_COEF = 0
-        with open(filename, mode="rb") as self.file:
-            self.file = self.file.read()
+        self.use_mmap = use_mmap
+        if use_mmap:
+            with open(filename, mode="rb") as f:
+                self.file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                self._read()
+            finally:
+                self.file.close()
+        else:
+            with open(filename, mode="rb") as self.file:
+                self.file = self.file.read()
+            self._read()
+
+    def _read(self):
         self.pos = 0
         (self.NUM_PNT, self.PNT_PTR, self.PNT_HIDX,
          self.NUM_LIN, self.LIN_PTR, self.LIN_HIDX,
@@ -108,7 +148,7 @@ class Reader(object):
          self.NUM_CF_MC, self.CF_MC_PTR, self.CF_MC_HIDX,
          self.NUM_WN, self.WN_PTR, self.WN_HIDX,
          self.NUM_WN_SW, self.WN_SW_PTR, self.WN_SW_HIDX
-         ) = self.next_block("i")
+         ) = self.next_values("i")
 
         (valid,
          self.POINT_ISA_POINT_REC_PT_CO_X,
@@ -220,37 +260,37 @@ class Reader(object):
 
         self.skip_block(21)
 
-        ANZAHL_TG = self.next_block("i")[1]
+        ANZAHL_TG = self.next_values("i")[1]
 
         self.skip_block(7)
         self.skip_block(ANZAHL_TG + 1)
         self.skip_block(1)
 
-        self.FC_RADIUS = self.next_block("f")[0]
+        self.FC_RADIUS = self.next_values("f")[0]
         self.skip_block(2)
-        self.M_POLES = self.next_block("i")[0]
+        self.M_POLES = self.next_values("i")[0]
         self.skip_block(1)
         length_cu = [0,0]
         fillfactor_cu = [0,0]
         sigma_cu = [0,0]
-        length_cu[0], fillfactor_cu[0], sigma_cu[0] = self.next_block("f")[0:3]
+        length_cu[0], fillfactor_cu[0], sigma_cu[0] = self.next_values("f")[0:3]
         self.skip_block(3)
-        self.MAGN_TEMPERATURE, self.BR_TEMP_COEF = self.next_block("f")[0:2]
-        FC_NUM_CUR_ID, FC_NUM_BETA_ID, FC_NUM_CUR_REG = self.next_block("i")[0:3]
+        self.MAGN_TEMPERATURE, self.BR_TEMP_COEF = self.next_values("f")[0:2]
+        FC_NUM_CUR_ID, FC_NUM_BETA_ID, FC_NUM_CUR_REG = self.next_values("i")[0:3]
         if FC_NUM_CUR_ID > 16:
             FC_NUM_CUR_ID = 16
 
-        self.CURRENT_ID = self.next_block("f")[0:FC_NUM_CUR_ID]
-        self.IDE_FLUX = self.next_block("f")[0:FC_NUM_CUR_ID]
-        self.IDE_BETA = self.next_block("f")[0:FC_NUM_BETA_ID]
+        self.CURRENT_ID = self.next_values("f")[0:FC_NUM_CUR_ID]
+        self.IDE_FLUX = self.next_values("f")[0:FC_NUM_CUR_ID]
+        self.IDE_BETA = self.next_values("f")[0:FC_NUM_BETA_ID]
 
         self.skip_block(FC_NUM_CUR_ID * 2)
         self.skip_block(1 + 10 * 5)
-        self.HC_TEMP_COEF, self.NHARM_MAX_MULTI_FILE = self.next_block("f")[0:2]
-        self.CU_SPEZ_WEIGHT, self.MA_SPEZ_WEIGHT = self.next_block("f")[0:2]
-        self.PS_IND_LOW, self.PS_IND_HIGH = self.next_block("f")[0:2]
+        self.HC_TEMP_COEF, self.NHARM_MAX_MULTI_FILE = self.next_values("f")[0:2]
+        self.CU_SPEZ_WEIGHT, self.MA_SPEZ_WEIGHT = self.next_values("f")[0:2]
+        self.PS_IND_LOW, self.PS_IND_HIGH = self.next_values("f")[0:2]
         self.skip_block(5 + 14)
-        NUM_FE_EVAL_MOVE_STEP = self.next_block("i")[0]
+        NUM_FE_EVAL_MOVE_STEP = self.next_values("i")[0]
         if NUM_FE_EVAL_MOVE_STEP < 0:
             NUM_FE_EVAL_MOVE_STEP = 0
 
@@ -269,14 +309,14 @@ class Reader(object):
                 self.el_fe_induction_1[0][0].append(b)
                 self.el_fe_induction_2[0][0].append(self.next_block("h"))
 
-        FC_NUM_MOVE_CALC_LOAD_PMS, FC_NUM_FLX = self.next_block("i")[0:2]
+        FC_NUM_MOVE_CALC_LOAD_PMS, FC_NUM_FLX = self.next_values("i")[0:2]
 
         if FC_NUM_MOVE_CALC_LOAD_PMS > 1:
             self.skip_block(4)
             self.skip_block(3 * FC_NUM_FLX)
             self.skip_block()
 
-        FC_NUM_MOVE_NOLOAD_PMS = self.next_block("i")[0]
+        FC_NUM_MOVE_NOLOAD_PMS = self.next_values("i")[0]
 
         if FC_NUM_MOVE_NOLOAD_PMS > 1:
             self.skip_block(4)
@@ -290,7 +330,7 @@ class Reader(object):
 
         self.skip_block(2)  # start_winkel, end_winkel
         self.skip_block(2 * 5 + 2)
-        length_cu[1], fillfactor_cu[1], sigma_cu[1] = self.next_block("f")[0:3]
+        length_cu[1], fillfactor_cu[1], sigma_cu[1] = self.next_values("f")[0:3]
         self.PS_LENGTH_CU = length_cu
         self.PS_FILFACTOR_CU = fillfactor_cu
         self.PS_SIGMA_CU = sigma_cu
@@ -304,10 +344,10 @@ class Reader(object):
         self.skip_block(4)
         (yoke_diam, inside_diam,
          slot_height, slot_h1, slot_h2,
-         slot_width, slot_r1, slot_r2) = self.next_block("f")[:8]
+         slot_width, slot_r1, slot_r2) = self.next_values("f")[:8]
         self.skip_block(3)
         # magnet sector
-        magn_rad, yoke_rad, magn_height = self.next_block("f")[:3]
+        magn_rad, yoke_rad, magn_height = self.next_values("f")[:3]
         self.da2 = 2*magn_rad*1e-3
         self.dy2 = 2*yoke_rad*1e-3
         self.da1 = inside_diam
@@ -316,7 +356,7 @@ class Reader(object):
         # windings generation
         (tot_num_slot, num_phases, num_layers,
          self.NUM_WIRES, self.CURRENT,
-         coil_span, num_slots) = self.next_block("f")[:7]
+         coil_span, num_slots) = self.next_values("f")[:7]
         self.slots = int(tot_num_slot)
         self.num_phases = int(num_phases)
         self.layers = int(num_layers)
@@ -326,7 +366,7 @@ class Reader(object):
         self.skip_block(1)
         (move_action, arm_length, self.SKEW_ANGLE,
          HI, num_move_ar, self.ANGL_I_UP,
-         num_par_wdgs, cur_control) = self.next_block("f")[:8]
+         num_par_wdgs, cur_control) = self.next_values("f")[:8]
         self.NUM_PAR_WDGS = int(num_par_wdgs)
         self.arm_length = arm_length  # unit is m
         self.skip_block(2)
@@ -334,11 +374,9 @@ class Reader(object):
         self.skip_block(30 * 30)
         self.skip_block(1 * 20)
         self.skip_block(8)
-        self.beta_loss = self.next_block(
-            "h")[:FC_NUM_BETA_ID]  # BETA_LOSS_EVAL_STEP
-        self.curr_loss = self.next_block(
-            "h")[:FC_NUM_CUR_ID]  # CURR_LOSS_EVAL_STEP
-        FC_NUM_MOVE_LOSSES = self.next_block("i")[0]
+        self.beta_loss = self.next_values("h")[:FC_NUM_BETA_ID]  # BETA_LOSS_EVAL_STEP
+        self.curr_loss = self.next_values("h")[:FC_NUM_CUR_ID]  # CURR_LOSS_EVAL_STEP
+        FC_NUM_MOVE_LOSSES = self.next_values("i")[0]
         if FC_NUM_MOVE_LOSSES > 1 and NUM_FE_EVAL_MOVE_STEP > 1:
             self.el_fe_induction_1.append([[]])
             self.el_fe_induction_2.append([[]])
@@ -364,7 +402,7 @@ class Reader(object):
 # ---
         self.skip_block(62)
 
-        ANZ_FORCE_AREAS = self.next_block("i")[0]
+        ANZ_FORCE_AREAS = self.next_values("i")[0]
 
         if ANZ_FORCE_AREAS > 3:
             ANZ_FORCE_AREAS = 3
@@ -373,7 +411,7 @@ class Reader(object):
         self.skip_block(2 * ANZ_FORCE_AREAS)
         #        self.skip_block(14)
         self.skip_block(10)
-        self.delta_node_angle = self.next_block("f")[1]  # rad
+        self.delta_node_angle = self.next_values("f")[1]  # rad
         self.skip_block(3)
         self.skip_block(2 * 3 + 6 * 100 * 3)
         self.skip_block(30)
@@ -387,20 +425,20 @@ class Reader(object):
         # MOVE_ARMATURE
         self.skip_block(4)
         try:
-            self.pole_pairs, self.poles_sim = self.next_block("i")[:2]
+            self.pole_pairs, self.poles_sim = self.next_values("i")[:2]
         except:
             pass
-        self.SLOT_WIRE_DIAMETER = self.next_block("f")
-        self.SLOT_WIRE_NUMBERS = self.next_block("i")
+        self.SLOT_WIRE_DIAMETER = self.next_values("f")
+        self.SLOT_WIRE_NUMBERS = self.next_values("i")
         self.skip_block(20*(3 + 2 * 20))  # BASE_FREQUENCY ..
         self.skip_block(2)  # R_TORQUE .. NUM_NOLOAD_EX_CURRENT_STEPS
         try:
             (self.R_CURRENT,
              self.R_LOAD_VOLTAGE,
-             self.R_NOLOAD_VOLTAGE) = self.next_block("f")
+             self.R_NOLOAD_VOLTAGE) = self.next_values("f")
         except:
             pass
-        x = self.next_block("f")
+        x = self.next_values("f")
         self.R_COSPHI = x[0]
         self.R_BETA_OPT = x[1:]
         self.skip_block(10)  # R_FLUX_LOAD. NUM_NOLOAD_EX_CURRENT_STEPS
@@ -422,11 +460,11 @@ class Reader(object):
         self.skip_block()
         self.skip_block(2 * 3)  # MAX_LOSS_EVAL_STEPS
         try:
-            self.Q_SLOTS_NUMBER, self.M_PHASE_NUMBER = self.next_block("i")[:2]
+            self.Q_SLOTS_NUMBER, self.M_PHASE_NUMBER = self.next_values("i")[:2]
         except:
             pass
         try:
-            self.N_LAYERS_SLOT, self.N_WIRES_PER_SLOT = self.next_block("i")[
+            self.N_LAYERS_SLOT, self.N_WIRES_PER_SLOT = self.next_values("i")[
                 :2]
         except:
             pass
@@ -446,10 +484,10 @@ class Reader(object):
         self.ELEM_ISA_ELEM_REC_LOSS_DENS = self.next_block("f")
         self.skip_block(3)
         self.skip_block(1 * 64)
-        self.ROTOR_CUR_EXIST = self.next_block("?")[0]
+        self.ROTOR_CUR_EXIST = self.next_values("?")[0]
         self.skip_block(20)  # mcmax = 20
         self.skip_block(4)
-        self.NUM_SE_MAGN_KEYS = self.next_block("i")[0]
+        self.NUM_SE_MAGN_KEYS = self.next_values("i")[0]
 
     def next_block(self, fmt):
         """
@@ -458,6 +496,8 @@ class Reader(object):
         Arguments:
             fmt: Format string (see python struct module)
         """
+        if self.use_mmap:
+            return self._next_block_array(fmt)
 
         fmt_ = fmt.replace("?", "i")
 
@@ -505,6 +545,57 @@ class Reader(object):
         else:
             return values
 
+    def next_values(self, fmt):
+        """
+        Read the next block of parameter values and return them as
+        list of python values (also if the file is memory-mapped).
+
+        Arguments:
+            fmt: Format string of a single field (see python struct module)
+        """
+        if self.use_mmap:
+            return self._next_block_array(fmt).tolist()
+        return self.next_block(fmt)
+
+    def _next_block_array(self, fmt):
+        """
+        Return the columns of the next block as numpy arrays
+        (bool arrays for "?" and lists of str for "s" fields).
+
+        Arguments:
+            fmt: Format string (see python struct module)
+        """
+        dtype, fields = _block_dtype(fmt)
+        blockSize = struct.unpack_from("=i", self.file, self.pos)[0]
+        self.pos += 4
+        size = max(min(blockSize, len(self.file) - self.pos), 0)
+        if size % dtype.itemsize:
+            logger.warning("Invalid Blocksize %s at pos %i",
+                           blockSize, self.pos-4)
+            rec = np.zeros(0, dtype=dtype)
+        else:
+            rec = np.frombuffer(self.file, dtype=dtype,
+                                count=size // dtype.itemsize,
+                                offset=self.pos)
+        self.pos += blockSize + 4
+
+        values = []
+        for name, code, size in fields:
+            col = rec[name]
+            if code == '?':
+                values.append(col != 0)
+            elif code == 's':
+                b = col.tobytes()
+                values.append([b[i:i+size].decode('latin-1')
+                               for i in range(0, len(b), size)])
+            else:
+                values.append(col.copy())  # release the mapping
+
+        if len(fmt) == 1:
+            return values[0]
+        else:
+            return values
+
     def skip_block(self, skips=1):
         """
         Proceed to the next block without reading any data.
@@ -518,6 +609,100 @@ class Reader(object):
             skips -= 1
 
 
+def _linked_lists(heads, keys, nxt):
+    """return keys of linked lists as CSR arrays (indptr, values)
+
+    Arguments:
+        heads: 1-based pointer to first entry of each list (0: empty list)
+        keys: keys of entries
+        nxt: 1-based pointer to next entry (0: end of list)
+    """
+    ptr = np.asarray(heads, dtype=int)
+    keys = np.asarray(keys, dtype=int)
+    nxt = np.asarray(nxt, dtype=int)
+    cols, valid = [], []
+    while np.any(ptr > 0):
+        v = ptr > 0
+        cols.append(np.where(v, keys[ptr - 1], 0))
+        valid.append(v)
+        ptr = np.where(v, nxt[ptr - 1], 0)
+    if not cols:
+        return np.zeros(len(ptr) + 1, dtype=int), np.zeros(0, dtype=int)
+    cols, valid = np.array(cols).T, np.array(valid).T
+    indptr = np.concatenate(([0], np.cumsum(np.sum(valid, axis=1))))
+    return indptr, cols[valid]
+
+
+def _fft_amplitudes(pos, y):
+    """return harmonic amplitudes of rows of y
+    (same as utils.fft(pos, y, pmod=2)['nue'] zero padded to
+    half the number of samples)
+
+    Arguments:
+      pos: (list of floats) sample positions in degrees
+      y: (2d array) values (rows) at sample positions (columns)
+    """
+    ntiles = int(round(360/(pos[-1] - pos[0])))
+    y = np.asarray(y)[:, :-1]
+    m = y.shape[1]
+    N = ntiles*m
+    # the spectrum of the periodic continuation has
+    # nonzero values only at multiples of ntiles
+    nue = np.zeros((y.shape[0], N//2))
+    a = 2*np.abs(np.fft.rfft(y - np.mean(y, axis=1)[:, None], axis=1))/m
+    k = np.arange(0, N//2, ntiles)
+    nue[:, k] = a[:, :len(k)]
+    # limit number of harmonics by position of base harmonic
+    freq = np.fft.fftfreq(N, d=360/N)[np.argmax(nue, axis=1)]
+    nmax = np.full(len(nue), min(18*ntiles, N//2))
+    f = np.abs(freq) > 0
+    npoles = 2*(360/np.abs(1/freq[f])).astype(int)
+    nmax[f] = np.minimum(9*npoles, N//2)
+    nue[np.arange(N//2) >= nmax[:, None]] = 0
+    return nue
+
+
+class _LazyEntities(Sequence):
+    """Read-only sequence of model entities that are created
+    on first access
+
+    Arguments:
+        factory: function returning the entity of an index
+        size: number of entities
+        index: (optional) indexes passed to factory
+    """
+
+    def __init__(self, factory, size, index=None):
+        self._factory = factory
+        self._index = index
+        self._items = [None]*size
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        i = i.__index__()
+        e = self._items[i]
+        if e is None:
+            if i < 0:
+                i += len(self)
+            e = self._items[i] = self._factory(
+                i if self._index is None else int(self._index[i]))
+        return e
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def created(self):
+        """return the entities that have been created so far"""
+        return [e for e in self._items if e is not None]
+
+
 class Isa7(object):
     """
     The ISA7 Femag model
@@ -552,17 +737,25 @@ class Isa7(object):
                       for pk1, pk2 in zip(reader.LINE_ISA_LINE_REC_LN_PNT_1,
                                           reader.LINE_ISA_LINE_REC_LN_PNT_2)]
         logger.debug("Nodes")
-        self.nodes = [
-            Node(n + 1,
-                 reader.NODE_ISA_NODE_REC_ND_BND_CND[n],
-                 reader.NODE_ISA_NODE_REC_ND_PER_NOD[n],
-                 reader.NODE_ISA_ND_CO_RAD[n],
-                 reader.NODE_ISA_ND_CO_PHI[n],
-                 reader.NODE_ISA_NODE_REC_ND_CO_1[n],
-                 reader.NODE_ISA_NODE_REC_ND_CO_2[n],
-                 reader.NODE_ISA_NODE_REC_ND_VP_RE[n],
-                 reader.NODE_ISA_NODE_REC_ND_VP_IM[n])
-            for n in range(len(reader.NODE_ISA_NODE_REC_ND_BND_CND))]
+        self.node_xy = np.array([reader.NODE_ISA_NODE_REC_ND_CO_1,
+                                 reader.NODE_ISA_NODE_REC_ND_CO_2],
+                                dtype=float).reshape(2, -1).T
+        self.node_rphi = np.array([reader.NODE_ISA_ND_CO_RAD,
+                                   reader.NODE_ISA_ND_CO_PHI],
+                                  dtype=float).reshape(2, -1).T
+        self.node_vpot = np.array([reader.NODE_ISA_NODE_REC_ND_VP_RE,
+                                   reader.NODE_ISA_NODE_REC_ND_VP_IM],
+                                  dtype=float).reshape(2, -1).T
+        # precision of the values in the file: the arrays above are
+        # float64, NC files and memory-mapped ISA7 files are float32
+        self.float_dtype = np.result_type(
+            np.asarray(reader.NODE_ISA_NODE_REC_ND_VP_RE[:1]), np.float32)
+        self.node_bndcnd = np.asarray(reader.NODE_ISA_NODE_REC_ND_BND_CND,
+                                      dtype=int)
+        self.node_pernod = np.asarray(reader.NODE_ISA_NODE_REC_ND_PER_NOD,
+                                      dtype=int)
+        self._node_outside = None
+        self.nodes = _LazyEntities(self._create_node, len(self.node_xy))
 
         logger.debug("Nodechains")
         self.nodechains = []
@@ -588,41 +781,42 @@ class Isa7(object):
                 logger.warning('IndexError in nodes')
                 raise  # preserve the stack trace
 
-        self.elements = []
         logger.debug("Elements")
-        for e in range(len(reader.ELEM_ISA_EL_NOD_PNTR)):
-            ndkeys = []
-            ndk = reader.ELEM_ISA_EL_NOD_PNTR[e]
-
-            while ndk > 0:
-                ndkeys.append(reader.ELE_NOD_ISA_ND_KEY[ndk - 1])
-                ndk = reader.ELE_NOD_ISA_NXT_ND_PNTR[ndk - 1]
-
-            vertices = [self.nodes[k - 1] for k in ndkeys]
-            try:
-                loss_dens = reader.ELEM_ISA_ELEM_REC_LOSS_DENS[e]
-            except (IndexError, AttributeError):
-                loss_dens = 0
-            try:
-                temperature = reader.ELEM_ISA_ELEM_REC_TEMPERATURE[e]
-            except (IndexError, AttributeError):
-                temperature = 20
-            self.elements.append(
-                Element(e + 1,
-                        ElType(reader.ELEM_ISA_ELEM_REC_EL_TYP[e]),
-                        reader.ELEM_ISA_ELEM_REC_EL_SE_KEY[e] - 1,
-                        vertices,
-                        (reader.ELEM_ISA_ELEM_REC_EL_RELUC[e],
-                         reader.ELEM_ISA_ELEM_REC_EL_RELUC_2[e]),
-                        (reader.ELEM_ISA_ELEM_REC_EL_MAG_1[e],
-                         reader.ELEM_ISA_ELEM_REC_EL_MAG_2[e]),
-                        loss_dens,  # in W/m³
-                        reader.BR_TEMP_COEF/100,
-                        temperature)   # in 1/K
-            )
+        # element vertices (CSR): nodes of element e are
+        # element_nodes[element_nodes_ptr[e]:element_nodes_ptr[e+1]]
+        self.element_nodes_ptr, self.element_nodes = _linked_lists(
+            reader.ELEM_ISA_EL_NOD_PNTR,
+            reader.ELE_NOD_ISA_ND_KEY,
+            reader.ELE_NOD_ISA_NXT_ND_PNTR)
+        self.element_nodes -= 1
+        numel = len(self.element_nodes_ptr) - 1
+        self.element_type = np.asarray(reader.ELEM_ISA_ELEM_REC_EL_TYP,
+                                       dtype=int)
+        self.element_se_key = np.asarray(reader.ELEM_ISA_ELEM_REC_EL_SE_KEY,
+                                         dtype=int) - 1
+        self.element_reluc = np.array([reader.ELEM_ISA_ELEM_REC_EL_RELUC,
+                                       reader.ELEM_ISA_ELEM_REC_EL_RELUC_2],
+                                      dtype=float).reshape(2, -1).T
+        self.element_mag = np.array([reader.ELEM_ISA_ELEM_REC_EL_MAG_1,
+                                     reader.ELEM_ISA_ELEM_REC_EL_MAG_2],
+                                    dtype=float).reshape(2, -1).T
+        self.element_loss_density = np.zeros(numel)  # in W/m³
+        self.element_temperature = np.full(numel, 20.0)
+        for a, v in (('ELEM_ISA_ELEM_REC_LOSS_DENS',
+                      self.element_loss_density),
+                     ('ELEM_ISA_ELEM_REC_TEMPERATURE',
+                      self.element_temperature)):
+            x = np.asarray(getattr(reader, a, []), dtype=float)[:numel]
+            v[:len(x)] = x
+        self.br_temp_coef = reader.BR_TEMP_COEF/100  # in 1/K
+        # superelement index of element (as listed in superelement)
+        self._element_se = np.full(numel, -1)
+        self.elements = _LazyEntities(self._create_element, numel)
+        self._elements = self.elements  # rotate reassigns self.elements
 
         logger.debug("SuperElements")
         self.superelements = []
+        self._se_elements = []  # element indexes of superelements
         for se in range(len(reader.SUPEL_ISA_SE_NDCHN_PNTR)):
             nc_keys = []
             nc_ptr = reader.SUPEL_ISA_SE_NDCHN_PNTR[se]
@@ -645,8 +839,10 @@ class Isa7(object):
                 el_keys.append(reader.SE_EL_ISA_EL_KEY[el_ptr - 1])
                 el_ptr = reader.SE_EL_ISA_NXT_EL_PNTR[el_ptr - 1]
 
-            elements = [self.elements[elk - 1]
-                        for elk in el_keys]
+            el_index = np.array(el_keys, dtype=int) - 1
+            self._element_se[el_index] = se
+            self._se_elements.append(el_index)
+            elements = self._element_subset(el_index)
             try:
                 fillfactor = reader.SUPEL_ISA_SUPEL_REC_SE_FILLFACTOR[se]
             except:
@@ -745,8 +941,13 @@ class Isa7(object):
                     len(self.subregions))
 
         # positions of all elements
-        self.element_pos = np.array([e.center
-                                     for e in self.elements])
+        if len(self.element_nodes):
+            nv = np.diff(self.element_nodes_ptr)
+            self.element_pos = np.add.reduceat(
+                self.node_xy[self.element_nodes],
+                self.element_nodes_ptr[:-1], axis=0)/nv[:, None]
+        else:
+            self.element_pos = np.zeros((0, 2))
 
         for a in ('FC_RADIUS', 'pole_pairs', 'poles_sim',
                   'delta_node_angle', 'speed',
@@ -769,23 +970,27 @@ class Isa7(object):
         self.airgap_outer_elements = []
         if hasattr(self, 'FC_RADIUS'):  # Note: cosys r/phi only
             # TODO: handle multiple airgaps
-            airgap_center_elements = []
-            for n in self.nodes:
-                n.outside = np.linalg.norm(n.xy) > self.FC_RADIUS
-
-            for e in self.elements:
-                outside = [v.outside
-                           for v in e.vertices]
-                if all(outside):
-                    self.airgap_outer_elements.append(e)
-                elif any(outside):
-                    airgap_center_elements.append(e)
-                else:
-                    self.airgap_inner_elements.append(e)
-
-            self.airgap_center_elements = sorted(airgap_center_elements,
-                                                 key=lambda e: np.arctan2(
-                                                     e.center[1], e.center[0]))
+            self._node_outside = np.linalg.norm(
+                self.node_xy, axis=1) > self.FC_RADIUS
+            for n in self.nodes.created():
+                n.outside = self._node_outside[n.key - 1]
+
+            nv = np.diff(self.element_nodes_ptr)
+            nout = np.zeros(len(nv), dtype=int)
+            if len(self.element_nodes):
+                nout = np.add.reduceat(
+                    self._node_outside[self.element_nodes].astype(int),
+                    self.element_nodes_ptr[:-1])
+            outer = nout == nv
+            center = np.nonzero(~outer & (nout > 0))[0]
+            center = center[np.argsort(
+                np.arctan2(self.element_pos[center, 1],
+                           self.element_pos[center, 0]), kind='stable')]
+            self.airgap_outer_elements = self._element_subset(
+                np.nonzero(outer)[0])
+            self.airgap_center_elements = self._element_subset(center)
+            self.airgap_inner_elements = self._element_subset(
+                np.nonzero(nout == 0)[0])
         else:  # assume a linear machine
             # TODO read and check pole_width
             airgap_positions = []
@@ -915,6 +1120,40 @@ class Isa7(object):
         self.iron_loss_coefficients = getattr(
             reader, 'iron_loss_coefficients', [])
 
+    def _create_node(self, n):
+        """create node object of index n"""
+        node = Node(n + 1,
+                    self.node_bndcnd[n].item(),
+                    self.node_pernod[n].item(),
+                    *self.node_rphi[n].tolist(),
+                    *self.node_xy[n].tolist(),
+                    *self.node_vpot[n].tolist())
+        if self._node_outside is not None:
+            node.outside = bool(self._node_outside[n])
+        return node
+
+    def _create_element(self, e):
+        """create element object of index e"""
+        vertices = [self.nodes[k] for k in self.element_nodes[
+            self.element_nodes_ptr[e]:self.element_nodes_ptr[e+1]].tolist()]
+        el = Element(e + 1,
+                     ElType(self.element_type[e].item()),
+                     self.element_se_key[e].item(),
+                     vertices,
+                     tuple(self.element_reluc[e].tolist()),
+                     tuple(self.element_mag[e].tolist()),
+                     self.element_loss_density[e].item(),
+                     self.br_temp_coef,
+                     self.element_temperature[e].item())
+        if self._element_se[e] >= 0:
+            el.superelement = self.superelements[self._element_se[e]]
+        return el
+
+    def _element_subset(self, index):
+        """return lazy sequence of the elements with given indexes"""
+        return _LazyEntities(self._elements.__getitem__,
+                             len(index), index)
+
     def get_subregion(self, name):
         """return subregion by name"""
         for s in self.subregions:
@@ -936,19 +1175,58 @@ class Isa7(object):
         """return elements which are magnets"""
         return [e for e in self.elements if e.is_magnet()]
 
+    def _locate_elements(self, xy, k=16):
+        """return indexes of the elements that contain the points xy
+        (or have the nearest center if there is none)
+
+        Arguments:
+          xy: (2d array) point coordinates
+          k: number of nearest element centers that are checked
+        """
+        try:
+            tree, corners = self._element_tree
+        except AttributeError:
+            from scipy.spatial import cKDTree
+            tree = cKDTree(self.element_pos)
+            # corner nodes of elements (triangles: last corner repeated)
+            ptr = self.element_nodes_ptr
+            nc = np.where(self.element_type % 2 == 1, 3, 4)
+            step = np.where(self.element_type > 2, 2, 1)
+            i = np.minimum(np.arange(4), nc[:, None] - 1)*step[:, None]
+            corners = self.element_nodes[ptr[:-1, None] + i]
+            self._element_tree = tree, corners
+
+        xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        k = min(k, len(self.element_pos))
+        cand = tree.query(xy, k=k)[1].reshape(len(xy), k)
+        # cross products of element edges and points
+        v = self.node_xy[corners[cand]]  # points, candidates, corners, xy
+        d = v[:, :, [1, 2, 3, 0]] - v
+        p = xy[:, None, None, :] - v
+        c = d[..., 0]*p[..., 1] - d[..., 1]*p[..., 0]
+        tol = 1e-9*np.max(np.abs(c), axis=2, keepdims=True)
+        inside = np.all(c >= -tol, axis=2) | np.all(c <= tol, axis=2)
+        j = np.where(np.any(inside, axis=1), np.argmax(inside, axis=1), 0)
+        return cand[np.arange(len(xy)), j]
+
     def get_element(self, x, y):
         """return element at pos x,y"""
-        k = np.argmin(np.linalg.norm(self.element_pos - (x, y), axis=1))
-        return self.elements[k]
+        return self._elements[self._locate_elements((x, y))[0]]
+
+    def get_elements(self, xy):
+        """return elements at positions xy
+
+        Arguments:
+          xy: (array of shape (n, 2)) positions
+        """
+        return [self._elements[k] for k in self._locate_elements(xy)]
 
     def get_super_element(self, x, y):
         """return superelement at pos x,y"""
-        e = self.get_element(x, y)
-        try:
-            return [s for s in self.superelements
-                    if e.key in [se.key for se in s.elements]][0]
-        except IndexError:
+        se = self._element_se[self._locate_elements((x, y))[0]]
+        if se < 0:
             return None
+        return self.superelements[se]
 
     def flux_density(self, el, icur, ibeta):
         """return move pos and flux density in model coordinates (bx, by)
@@ -1061,24 +1339,67 @@ class Isa7(object):
         return b/a  # ecc: np.sqrt(1-b**2/a**2))
 
 
-    def calc_iron_loss(self, icur: int, ibeta: int, pfefun, bmin=0.1) -> dict:
+    def se_element_indexes(self, se):
+        """return the indexes of the elements of superelement se"""
+        return self._se_elements[se.key - 1]
+
+    def element_areas(self):
+        """return areas of all elements"""
+        try:
+            return self._element_area
+        except AttributeError:
+            pass
+        x, y = self.node_xy.T
+        ptr = self.element_nodes_ptr
+        self._element_area = np.zeros(len(self.element_type))
+        # vertex indexes of the cross products (see Element)
+        cross = {ElType.LinearTriangle: [(2, 1, 1, 1)],
+                 ElType.LinearRectangle: [(2, 1, 1, 1), (3, 2, 2, 2)],
+                 ElType.SquareTriangle: [(4, 2, 2, 1)],
+                 ElType.SquareRectangle: [(4, 2, 2, 2), (6, 4, 4, 4)]}
+        for t in cross:
+            sel = np.nonzero(self.element_type == t.value)[0]
+            if not len(sel):
+                continue
+            nv = max(max(c) for c in cross[t]) + 1
+            v = self.element_nodes[ptr[sel][:, None] + np.arange(nv)]
+            self._element_area[sel] = np.sum(
+                [(x[v[:, a]] - x[v[:, b]])*(y[v[:, 0]] - y[v[:, c]]) -
+                 (y[v[:, a]] - y[v[:, d]])*(x[v[:, 0]] - x[v[:, c]])
+                 for a, b, c, d in cross[t]], axis=0)/2
+        return self._element_area
+
+    def calc_iron_loss(self, icur, ibeta, pfefun, bmin=0.1,
+                       with_batch=False) -> dict:
         """ calculate iron loss using last simulation results
 
         Args:
-          icur: current index
-          ibeta: beta index
+          icur: current index (list of indexes or None: all load cases)
+          ibeta: beta index (list of indexes or None: all load cases)
           pfefun: custom function with parameters:
             Bxnu, Bynu (1d array): flux density values in T
             fnu (1d array): frequency values in Hz
             losscoeffs (dict): material properties
             axr: float (optional)
           bmin (float): lower limit of flux density amplitudes
+          with_batch (bool): evaluate all elements of a superelement
+            at once. pfefun is called with 2d arrays (rows: elements
+            and load cases, columns: harmonics), axr is a column vector.
+            (implied if icur or ibeta is not a single index)
 
         Returns:
           loss values name of subregion (string),
             hysteresis loss, eddy current loss, exc loss
+            (list of shape (len(icur), len(ibeta), 3) if icur or ibeta
+            is not a single index)
 
         """
+        if not (np.isscalar(icur) and np.isscalar(ibeta)):
+            return self._calc_iron_loss_batch(icur, ibeta, pfefun, bmin)
+        if with_batch:
+            return {k: v[0][0] for k, v in self._calc_iron_loss_batch(
+                [icur], [ibeta], pfefun, bmin).items()}
+
         from .utils import fft
         from inspect import signature
         # check if axis ratio is needed
@@ -1140,6 +1461,63 @@ class Isa7(object):
         return sreg
 
 
+    def _calc_iron_loss_batch(self, icur, ibeta, pfefun, bmin):
+        """return iron losses of iron subregions for all combinations
+        of current and beta indexes (see calc_iron_loss)"""
+        from inspect import signature
+        need_axratio = len(signature(pfefun).parameters) > 4
+        ncur, nbeta = self.el_fe_induction_1.shape[2:]
+        icur = np.arange(ncur) if icur is None else np.atleast_1d(icur)
+        ibeta = np.arange(nbeta) if ibeta is None else np.atleast_1d(ibeta)
+
+        pos = [p
+               for p in self.pos_el_fe_induction
+               if p < 2*np.pi/self.pole_pairs] + [2*np.pi/self.pole_pairs]
+        apos = np.array(pos)/np.pi*180
+        ipos = np.arange(min(len(pos) + 1, self.el_fe_induction_1.shape[1]))
+        f1 = self.speed/60
+        scf = self.scale_factor()
+        area = self.element_areas()
+        sreg = {}
+        for sr in [self.get_subregion(sname)
+                   for sname in self.get_iron_subregions()]:
+            losses = np.zeros((len(icur), len(ibeta), 3))
+            for se in sr.superelements:
+                el = self.se_element_indexes(se)
+                if not len(el):
+                    continue
+                coeffs = self.iron_loss_coefficients[se.mcvtype-1]
+                spw = coeffs['spec_weight']
+                fillfact = coeffs['fillfactor']
+                # rows: element, current, beta, columns: position
+                br, bt = [b[np.ix_(el, ipos, icur, ibeta)].transpose(
+                    0, 2, 3, 1).reshape(-1, len(ipos))
+                          for b in (self.el_fe_induction_1,
+                                    self.el_fe_induction_2)]
+                b1 = _fft_amplitudes(apos, br)
+                b2 = _fft_amplitudes(apos, bt)
+                mask = (b1 > bmin) | (b2 > bmin)
+                cols = np.any(mask, axis=0)
+                if not np.any(cols):
+                    continue
+                mask = mask[:, cols]
+                fnu = np.broadcast_to(
+                    f1*np.arange(b1.shape[1])[cols], mask.shape)
+                args = [b1[:, cols]/fillfact, b2[:, cols]/fillfact,
+                        fnu, coeffs]
+                if need_axratio:
+                    args.append(np.array(
+                        [self._axis_ratio(apos, x, y)
+                         for x, y in zip(br, bt)])[:, None])
+                pl = np.array([np.sum(np.where(mask, p, 0), axis=1)
+                               for p in pfefun(*args)]).T
+                losses += np.sum(
+                    1e3*spw*area[el, None, None, None] *
+                    pl.reshape(len(el), len(icur), len(ibeta), 3), axis=0)
+            logger.debug("%s: %s", sr.name, losses)
+            sreg[sr.name] = (scf*self.arm_length*losses).tolist()
+        return sreg
+
     def flux_dens(self, x, y, icur, ibeta):
         el = self.get_element(x, y)
         return self.flux_density(el, icur, ibeta)
@@ -1442,8 +1820,9 @@ class SuperElement(BaseEntity):
         self.sr_key = sr_key
         self.subregion = None
         self.elements = elements
-        for e in elements:
-            e.superelement = self
+        if not isinstance(elements, _LazyEntities):
+            for e in elements:
+                e.superelement = self
         self.nodechains = nodechains
         self.color = color
         self.nc_keys = nc_keys
@@ -1509,19 +1888,20 @@ class Winding(BaseEntity):
         return [e for s in self.subregions for e in s.elements()]
 
 
-def read(filename):
+def read(filename, use_mmap=False):
     """
     Read ISA7 file and return ISA7 object.
 
     Arguments:
         filename: name of I7/ISA7 file to be read
+        use_mmap: memory-map the file and read blocks as numpy arrays
     """
     import os
     ext = os.path.splitext(filename)[-1]
     if not ext:
         ext = '.I7' if sys.platform == 'win32' else '.ISA7'
         filename += ext
-    isa = Isa7(Reader(filename))
+    isa = Isa7(Reader(filename, use_mmap=use_mmap))
     return isa
 
 
@@ -18,6 +18,11 @@ import femagtools.config as cfg
 import logging
 import uuid
 import importlib
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -72,6 +77,9 @@ class Task(object):
         self.fsl_file = None
         self.id = id
         self.stateofproblem = 'mag_static'
+        self.results = None  # results parsed by engine
+        self.file_store = None
+        self.links = []  # (source, size, destination) to be linked by job
 
     def set_stateofproblem(self, stateofproblem):
         self.stateofproblem = stateofproblem
@@ -89,8 +97,13 @@ class Task(object):
 
         if content is None:
             dest = os.path.join(self.directory, base)
-            if not os.access(dest, os.R_OK):
-                shutil.copy(fname, dest)
+            if not (os.access(dest, os.R_OK) or
+                    dest in [l[-1] for l in self.links]):
+                stored = self.file_store and self.file_store.add(fname)
+                if stored:
+                    self.links.append(stored + (dest,))
+                else:
+                    shutil.copy(fname, dest)
             return
 
         # this file has to be created
@@ -100,6 +113,8 @@ class Task(object):
     def get_results(self):
         """returns result of most recent BCH or ASM file
         (or project specific results if result_func is set)"""
+        if self.results is not None:
+            return self.results
         if self.result_func:
             return self.result_func(self)
 
@@ -223,6 +238,278 @@ class CloudTask(Task):
             id, dir, result_func, result_files)
 
 
+class FileStore(object):
+    """content-addressed store of task input files
+
+    Every unique input file is stored once and linked into the
+    task directories instead of being copied. Only files with one of the
+    given extensions are linked (FEMAG must not write into them), all
+    others are copied.
+
+    Args:
+        dirname: name of store directory
+        symlink: create symbolic links instead of hard links
+        extensions: file name suffixes (lower case) of linked files
+    """
+
+    def __init__(self, dirname, symlink=False,
+                 extensions=('.mcv', '.mc', '.dxf', '.wid', '.msh')):
+        self.dirname = pathlib.Path(dirname).absolute()
+        self.dirname.mkdir(parents=True, exist_ok=True)
+        self.symlink = symlink
+        self.extensions = extensions
+        self.stored = {}  # (path, size, mtime): path in store
+        self.lock = threading.Lock()
+        self.links = 0
+        self.bytes_saved = 0
+        self.link_time = 0
+        self.copy_bytes = 0
+        self.copy_time = 0
+
+    def add(self, fname):
+        """stores a copy of fname
+
+        Return:
+            path of the stored copy and its size (None if
+            fname is not to be linked)
+        """
+        if pathlib.Path(fname).suffix.lower() not in self.extensions:
+            return None
+        st = os.stat(fname)
+        k = (os.path.abspath(fname), st.st_size, st.st_mtime_ns)
+        with self.lock:
+            if k in self.stored:
+                return self.stored[k], st.st_size
+        h = hashlib.sha256()
+        with open(fname, 'rb') as fp:
+            for chunk in iter(lambda: fp.read(1 << 20), b''):
+                h.update(chunk)
+        path = self.dirname / (h.hexdigest() + pathlib.Path(fname).suffix)
+        if not path.exists():
+            tstart = time.perf_counter()
+            tmp = path.with_name(f'{path.name}.{uuid.uuid4().hex}')
+            shutil.copyfile(fname, tmp)
+            if platform.system() != 'Windows':
+                os.chmod(tmp, 0o444)  # linked files must not be changed
+            os.replace(tmp, path)
+            with self.lock:
+                self.copy_time += time.perf_counter() - tstart
+                self.copy_bytes += st.st_size
+        with self.lock:
+            self.stored[k] = path
+        return path, st.st_size
+
+    def link(self, src, size, dest):
+        """link the stored file src of size bytes to dest"""
+        tstart = time.perf_counter()
+        try:
+            if self.symlink:
+                os.symlink(src, dest)
+            else:
+                os.link(src, dest)
+        except FileExistsError:
+            if not os.path.samefile(src, dest):
+                logger.warning("link %s: file exists", dest)
+            return
+        except OSError as e:  # links not supported
+            logger.warning("link %s: %s", dest, e)
+            shutil.copyfile(src, dest)
+            return
+        with self.lock:
+            self.link_time += time.perf_counter() - tstart
+            self.links += 1
+            self.bytes_saved += size
+
+    def stats(self):
+        """returns dict with number of stored files and links, saved
+        bytes and the estimated saved time in seconds"""
+        copy_rate = self.copy_time/self.copy_bytes if self.copy_bytes else 0
+        return dict(files=len(set(self.stored.values())),
+                    links=self.links,
+                    bytes_saved=self.bytes_saved,
+                    time_saved=max(
+                        0, self.bytes_saved*copy_rate - self.link_time))
+
+
+class ResultCache(object):
+    """content-addressed store of FEMAG result files
+
+    The key of a task is the hash of all files in its directory
+    (fsl, magnetizing curves, poc and model files) and the version of
+    the FEMAG executable. The result files of completed tasks are stored
+    in a subdirectory per key and copied back into the directory of a
+    task with identical key instead of running FEMAG again. The least
+    recently used entries are removed if the total size exceeds maxsize.
+
+    Args:
+        dirname: name of cache directory
+        maxsize: max total size of stored result files in bytes
+        version: FEMAG version string (default: path, size and
+            modification time of the executable)
+    """
+
+    def __init__(self, dirname, maxsize=2**30, version=None):
+        self.dirname = pathlib.Path(dirname)
+        self.dirname.mkdir(parents=True, exist_ok=True)
+        self.maxsize = maxsize
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self.inputs = {}  # task directory: key, names of input files
+        self.sizes = {d.name: sum(f.stat().st_size for f in d.iterdir())
+                      for d in self.dirname.iterdir() if d.is_dir()}
+
+    def _executable_version(self, stateofproblem):
+        if self.version is not None:
+            return self.version
+        try:
+            exe = pathlib.Path(cfg.get_executable(stateofproblem))
+            st = exe.stat()
+            return f'{exe} {st.st_size} {st.st_mtime_ns}'
+        except (ValueError, KeyError, OSError):
+            return stateofproblem
+
+    def key(self, task):
+        """returns the key of task from the contents of its input files"""
+        h = hashlib.sha256(self._executable_version(
+            task.stateofproblem).encode())
+        files = sorted(f for f in pathlib.Path(task.directory).iterdir()
+                       if f.is_file())
+        for f in files:
+            h.update(f.name.encode() + b'\0')
+            h.update(f.read_bytes())
+        self.inputs[task.directory] = (h.hexdigest(),
+                                       set(f.name for f in files))
+        return h.hexdigest()
+
+    def get(self, task):
+        """copy the stored result files into the directory of task
+
+        Return:
+            True if task was found (status is set to C)
+        """
+        key = self.key(task)
+        entry = self.dirname / key
+        if key not in self.sizes or not entry.is_dir():
+            self.misses += 1
+            return False
+        for f in entry.iterdir():
+            shutil.copy(f, task.directory)
+        os.utime(entry)  # most recently used
+        self.hits += 1
+        task.status = 'C'
+        task.results = None
+        logger.info("cache hit %s: %s", task.directory, key)
+        return True
+
+    def put(self, task):
+        """store the result files of the completed task"""
+        try:
+            key, inputs = self.inputs.pop(task.directory)
+        except KeyError:
+            logger.warning("no cache key for %s", task.directory)
+            return
+        if task.status != 'C' or key in self.sizes:
+            return
+        tmpdir = self.dirname / f'{key}.tmp'
+        shutil.rmtree(tmpdir, ignore_errors=True)
+        tmpdir.mkdir()
+        size = 0
+        for f in pathlib.Path(task.directory).iterdir():
+            if f.is_file() and f.name not in inputs:
+                shutil.copy(f, tmpdir)
+                size += f.stat().st_size
+        try:
+            os.replace(tmpdir, self.dirname / key)
+        except OSError:  # stored by another process
+            shutil.rmtree(tmpdir, ignore_errors=True)
+        self.sizes[key] = size
+        self._evict()
+
+    def _evict(self):
+        total = sum(self.sizes.values())
+        if total <= self.maxsize:
+            return
+        entries = sorted(self.sizes,
+                         key=lambda k: (self.dirname / k).stat().st_mtime)
+        for key in entries[:-1]:
+            logger.debug("cache evict %s", key)
+            shutil.rmtree(self.dirname / key, ignore_errors=True)
+            total -= self.sizes.pop(key)
+            if total <= self.maxsize:
+                break
+
+    def stats(self):
+        """returns dict with hits, misses, number of entries and size"""
+        return dict(hits=self.hits, misses=self.misses,
+                    entries=len(self.sizes),
+                    size=sum(self.sizes.values()))
+
+
+class ResultJournal(object):
+    """append-only journal of evaluated samples
+
+    Every record (a dict with decision values x, objective values f and
+    status of a sample) is written as a line of JSON and flushed as soon
+    as its task has completed. The journal can thus be read by reporting
+    tools while the calculation continues and allows to resume an
+    interrupted calculation.
+
+    Args:
+        filename: name of journal file
+    """
+
+    def __init__(self, filename):
+        self.filename = pathlib.Path(filename)
+
+    def append(self, **record):
+        """write record to the journal"""
+        with open(self.filename, 'a') as fp:
+            fp.write(json.dumps(record, default=_tolist) + '\n')
+            fp.flush()
+            os.fsync(fp.fileno())
+
+    def read(self):
+        """returns list of all complete records"""
+        if not self.filename.exists():
+            return []
+        records = []
+        with open(self.filename) as fp:
+            for line in fp:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logger.warning("%s: skip incomplete record",
+                                   self.filename)
+        return records
+
+    def resume(self):
+        """removes an incomplete last record (if any)
+
+        Return:
+            list of records with status C
+        """
+        if self.filename.exists():
+            buf = self.filename.read_bytes()
+            if buf and not buf.endswith(b'\n'):
+                with open(self.filename, 'r+b') as fp:
+                    fp.truncate(buf.rfind(b'\n') + 1)
+        return [r for r in self.read() if r.get('status') == 'C']
+
+    def clear(self):
+        """removes all records"""
+        if self.filename.exists():
+            self.filename.unlink()
+
+
+def _tolist(obj):
+    """json conversion of numpy values"""
+    try:
+        return obj.tolist()
+    except AttributeError:
+        raise TypeError(f"{type(obj)} is not JSON serializable")
+
+
 class Job(object):
     """represents a FEMAG job consisting of one or more tasks
     each to be executed by a dedicated process
@@ -233,6 +520,33 @@ class Job(object):
         self.basedir = str(pathlib.Path(basedir).absolute())
         self.tasks = []
         self.num_cur_steps = 0
+        self.file_store = None
+        self.num_threads = 8
+
+    def set_file_store(self, file_store, num_threads=8):
+        """link the input files of all tasks added later from file_store
+
+        Args:
+            file_store: :py:class:`FileStore` or None
+            num_threads: number of threads that set up the task directories
+        """
+        self.file_store = file_store
+        self.num_threads = num_threads
+
+    def prepare(self):
+        """reset the results of all tasks (before they are submitted)
+        and link their input files into their directories"""
+        for t in self.tasks:
+            t.results = None
+        links = [l for t in self.tasks for l in t.links]
+        if not links:
+            return
+        with ThreadPoolExecutor(self.num_threads) as pool:
+            for _ in pool.map(lambda l: self.file_store.link(*l), links):
+                pass
+        for t in self.tasks:
+            t.links = []
+        logger.info("file store %s", self.file_store.stats())
 
     def cleanup(self):
         """removes all task directories of previous run"""
@@ -250,6 +564,7 @@ class Job(object):
                                            len(self.tasks)))
         t = TaskFactory.createTask(
             'Task', taskid, dir, result_func, result_files)
+        t.file_store = self.file_store
         self.tasks.append(t)
         return t
 
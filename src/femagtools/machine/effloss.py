@@ -1,6 +1,9 @@
 import numpy as np
 import scipy.interpolate as ip
 import logging
+import warnings
+import json
+import hashlib
 import multiprocessing
 from .utils import betai1
 from .pm import PmRelMachineLdq, PmRelMachinePsidq, PmRelMachine
@@ -10,8 +13,56 @@ from . import create_from_eecpars
 logger = logging.getLogger("femagtools.effloss")
 
 
+class ProgressLogger:
+    """log the progress of the efficiency map calculation
+
+    Called with the result of each sample (iq, id (iex)).
+    """
+    def __init__(self, nsamples):
+        self.n = 0
+        self.nsamples = nsamples
+        self.num_iv = max(round(nsamples/15), 1)
+
+    def __call__(self, iqd):
+        self.n += 1
+        if self.n % self.num_iv == 0:
+            logger.info("Losses/Eff Map: %d%%",
+                        round(100*self.n/self.nsamples))
+
+
+def _progress_logger(progress, nsamples):
+    """return the custom progress logger prepared for nsamples
+    or the default one"""
+    if progress is None:
+        return ProgressLogger(nsamples)
+    try:
+        progress.nsamples = nsamples
+        progress(0)  # To check conformity
+        progress.n = 0
+    except:
+        logger.warning("Invalid ProgressLogger given to efficiency_losses_map, using default one!")
+        return ProgressLogger(nsamples)
+    return progress
+
+
+class _FractionProgress:
+    """adapt a progress logger called per sample to the
+    fraction done reported by OperatingPointPool"""
+    def __init__(self, progress, nsamples):
+        self.progress = progress
+        self.nsamples = nsamples
+        self.done = 0
+
+    def __call__(self, fraction):
+        done = round(fraction*self.nsamples)
+        for _ in range(done - self.done):
+            self.progress(None)
+        self.done = max(done, self.done)
+
+
 def iqd_tmech_umax(m, u1, with_mtpa, progress, speed_torque, iq, id, iex):
     """calculate iq, id for each load (n, T) from speed_torque at voltage u1
+    (deprecated, use OperatingPointPool)
 
         Args:
           m: PmRelMachine or SynchronousMachine
@@ -21,77 +72,162 @@ def iqd_tmech_umax(m, u1, with_mtpa, progress, speed_torque, iq, id, iex):
           progress: logging pipe
 
     """
-    nsamples = len(speed_torque)
-    num_iv = round(nsamples/7)
+    warnings.warn("iqd_tmech_umax is deprecated, use OperatingPointPool",
+                  DeprecationWarning, stacklevel=2)
     try:
-        for i, nT in enumerate(speed_torque):
-            iqde = m.iqd_tmech_umax(
-                nT[1], 2*np.pi*nT[0]*m.p,
-                u1, with_mtpa=with_mtpa)[:-1]
-            iq[i] = iqde[0]
-            id[i] = iqde[1]
-            if len(iqde) > 2:
-                iex[i] = iqde[2]
-            if i % num_iv == 0:
-                progress.send(f"{100*i/nsamples:.1f}%")
+        with OperatingPointPool(1, m) as pool:
+            iqde = pool.iqd_tmech_umax(
+                np.asarray(speed_torque).T, u1, with_mtpa=with_mtpa,
+                progress=lambda f: progress.send(f"{100*f:.1f}%"))
+        nsamples = iqde.shape[1]
+        iq[:nsamples] = iqde[0]
+        id[:nsamples] = iqde[1]
+        if len(iqde) > 2:
+            iex[:nsamples] = iqde[2]
     except Exception as e:
         progress.send(e)
     finally:
         progress.close()
 
+
 def iqd_tmech_umax_multi(num_proc, ntmesh, m, u1, with_mtpa):
     """calculate iqd for sm and pm using multiproc
+    (deprecated, use OperatingPointPool)
     """
-    progress_readers = []
-    chunksize = int(np.ceil(ntmesh.shape[1]/num_proc))
-    procs = []
-    iq = []
-    id = []
-    iex = []
-    iexk = []
-    k = 0
-    for i in range(0, num_proc*chunksize, chunksize):
-        prog_reader, prog_writer = multiprocessing.Pipe(duplex=False)
-        progress_readers.append(prog_reader)
-        iq.append(multiprocessing.Array('d', chunksize))
-        id.append(multiprocessing.Array('d', chunksize))
-        if isinstance(m, SynchronousMachine):
-            iex.append(multiprocessing.Array('d', chunksize))
-            iexk = iex[k]
-        p = multiprocessing.Process(target=iqd_tmech_umax,
-                                    args=(m, u1, with_mtpa,
-                                          prog_writer,
-                                          ntmesh.T[i:i+chunksize],
-                                          iq[k], id[k], iexk))
-        k += 1
-        p.start()
-        procs.append(p)
-        prog_writer.close()
-
-    i = 0
-    collected_msg = []
-    while progress_readers:
-        for r in multiprocessing.connection.wait(progress_readers):
-            try:
-                collected_msg.append(r.recv())
-                i += 1
-            except EOFError:
-                progress_readers.remove(r)
+    warnings.warn("iqd_tmech_umax_multi is deprecated, "
+                  "use OperatingPointPool",
+                  DeprecationWarning, stacklevel=2)
+    with OperatingPointPool(num_proc, m) as pool:
+        return pool.iqd_tmech_umax(ntmesh, u1, with_mtpa=with_mtpa)
+
+
+def _eecpars_key(eecpars):
+    """return a key identifying eecpars (or machine object)"""
+    if not isinstance(eecpars, dict):
+        return id(eecpars)
+    return hashlib.sha256(json.dumps(
+        eecpars, sort_keys=True,
+        default=lambda o: np.asarray(o).tolist()).encode()).hexdigest()
+
+
+_pool_eecpars = None
+_pool_machines = {}
+
+
+def _init_pool_worker(eecpars):
+    """store eecpars (or machine) in the worker process"""
+    global _pool_eecpars
+    _pool_eecpars = eecpars
+    _pool_machines.clear()
+    if not isinstance(eecpars, dict):
+        _pool_machines[None] = eecpars
+
+
+def _pool_machine(temp):
+    """return machine of temperature (created once per worker)"""
+    try:
+        return _pool_machines[temp]
+    except KeyError:
+        m = create_from_eecpars(list(temp), _pool_eecpars)
+        _pool_machines[temp] = m
+        return m
+
+
+def _iqd_tmech_umax_chunk(args):
+    """calculate iq, id (iex) of a chunk of (n, T) samples in a pool worker"""
+    start, temp, u1, with_mtpa, with_tmech, nt = args
+    m = _pool_machine(temp)
+    if with_tmech:
+        solve = m.iqd_tmech_umax
+    else:
+        solve = m.iqd_torque_umax
+    return start, np.array([
+        solve(T, 2*np.pi*n*m.p, u1, with_mtpa=with_mtpa)[:-1]
+        for n, T in nt.T]).T
+
+
+class OperatingPointPool(object):
+    """persistent pool of worker processes calculating iq, id (iex)
+    of speed, torque samples
+
+    The machine parameters are handed to each worker once at start
+    (inherited without pickling if processes are forked) and machines
+    of different temperatures are created once per worker.
+    Samples are processed in small chunks that are distributed to
+    the workers as they become idle.
+
+    Args:
+      num_proc: number of worker processes
+      eecpars: (dict) EEC Parameter with dicts at different temperatures
+        (or machine object)
+      chunksize: number of samples per task (default 4)
+
+    Example:
+      with OperatingPointPool(8, eecpars) as pool:
+          for temp in ((90, 90), (150, 150)):
+              r = efficiency_losses_map(eecpars, u1, T, temp, n,
+                                        pool=pool)
+    """
+
+    def __init__(self, num_proc, eecpars, chunksize=4):
+        self.num_proc = num_proc
+        self.chunksize = chunksize
+        self._pool = multiprocessing.Pool(num_proc,
+                                          initializer=_init_pool_worker,
+                                          initargs=(eecpars,))
+        self.with_eecpars = isinstance(eecpars, dict)
+        self.eecpars_key = _eecpars_key(eecpars)
+
+    def iqd_tmech_umax(self, ntmesh, u1, temp=None,
+                       with_mtpa=True, with_tmech=True, progress=None):
+        """return iq, id (iex) for each (n, T) sample at voltage u1
+
+        Args:
+          ntmesh: array of speed (1/s) and torque (Nm) samples
+          u1: (float) phase voltage (V rms)
+          temp: (tuple) temperatures of winding and magnet/rotor
+            (ignored if the pool was created with a machine)
+          with_mtpa: (bool) use mtpa in const flux range if True
+          with_tmech: (bool) use shaft torque if True
+          progress: (optional) function called with the fraction done
+        """
+        if self.with_eecpars:
+            if isinstance(temp, (list, tuple)):
+                key = (temp[0], temp[1])
             else:
-                if i % len(progress_readers) == 0:
-                    logger.info("Losses/Eff Map: %s",
-                                ', '.join(collected_msg))
-                    collected_msg = []
-    for p in procs:
-        p.join()
-    siz = ntmesh.shape[1]
-    if iex:
-        return np.array([np.array(iq).flatten(),
-                         np.array(id).flatten(),
-                         np.array(iex).flatten()])[:, :siz]
-
-    return np.array([np.array(iq).flatten(),
-                        np.array(id).flatten()])[:, :siz]
+                key = (temp, temp)
+        else:
+            key = None
+        nsamples = ntmesh.shape[1]
+        tasks = [(i, key, u1, with_mtpa, with_tmech,
+                  ntmesh[:, i:i+self.chunksize])
+                 for i in range(0, nsamples, self.chunksize)]
+        results = {}
+        num_iv = max(round(len(tasks)/15), 1)
+        for k, (start, iqd) in enumerate(
+                self._pool.imap_unordered(_iqd_tmech_umax_chunk, tasks)):
+            results[start] = iqd
+            if progress is not None:
+                progress((k+1)/len(tasks))
+            elif (k+1) % num_iv == 0:
+                logger.info("Losses/Eff Map: %d%%",
+                            round(100*(k+1)/len(tasks)))
+        return np.hstack([results[i] for i in sorted(results)])
+
+    def close(self):
+        """terminate the worker processes"""
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self._pool.terminate()
+            self._pool.join()
 
 
 def rectangular_grid(ntmesh):
@@ -181,7 +317,8 @@ def _generate_mesh(n, T, nb, Tb, npoints):
 def efficiency_losses_map(eecpars, u1, T, temp, n, npoints=(60, 40),
                           with_mtpv=True, with_mtpa=True, with_pmconst=True,
                           with_tmech=True, driving_only=False,
-                          num_proc=0, progress=None, **kwargs) -> dict:
+                          num_proc=0, progress=None, with_batch=False,
+                          pool=None, **kwargs) -> dict:
     """return speed, torque efficiency and losses
 
     Args:
@@ -198,12 +335,18 @@ def efficiency_losses_map(eecpars, u1, T, temp, n, npoints=(60, 40),
       with_tmech -- (optional) use friction and windage losses (default)
       num_proc -- (optional) number of parallel processes (default 0)
       progress  -- (optional) custom function for progress logging
+      with_batch -- (optional) solve all operating points at once (default False)
+      pool -- (optional) OperatingPointPool of eecpars (or machine) for reuse
+              across several calls (num_proc is ignored, raises ValueError
+              if created with other eecpars)
       with_torque_corr -- (optional) T is corrected if out of range (default False)
 
     Returns:
       list of speed, current, voltage, torque, eta and losses
 
     """
+    if pool is not None and pool.eecpars_key != _eecpars_key(eecpars):
+        raise ValueError("pool was created with other eecpars")
     if isinstance(eecpars, dict):
         if isinstance(temp, (list, tuple)):
             xtemp = [temp[0], temp[1]]
@@ -212,6 +355,7 @@ def efficiency_losses_map(eecpars, u1, T, temp, n, npoints=(60, 40),
         m = create_from_eecpars(xtemp, eecpars)
     else:  # must be an instance of Machine
         m = eecpars
+        xtemp = None
     if isinstance(T, list):
         r = {'T': T, 'n': n}
         rb = {'T': [], 'n': []}
@@ -249,29 +393,28 @@ def efficiency_losses_map(eecpars, u1, T, temp, n, npoints=(60, 40),
 
     logger.info("total speed,torque samples %d", ntmesh.shape[1])
     if isinstance(m, (PmRelMachine, SynchronousMachine)):
-        if num_proc > 1:
-            iqd = iqd_tmech_umax_multi(num_proc, ntmesh, m, u1, with_mtpa)
-        else:
-            class ProgressLogger:
-                def __init__(self, nsamples):
-                    self.n = 0
-                    self.nsamples = nsamples
-                    self.num_iv = round(nsamples/15)
-                def __call__(self, iqd):
-                    self.n += 1
-                    if self.n % self.num_iv == 0:
-                        logger.info("Losses/Eff Map: %d%%",
-                                    round(100*self.n/self.nsamples))
-            if progress is None:
-                progress = ProgressLogger(ntmesh.shape[1])
+        if with_batch:
+            iqd = m.iqd_tmech_umax_batch(
+                ntmesh[1], 2*np.pi*ntmesh[0]*m.p, u1,
+                with_mtpa=with_mtpa, with_tmech=with_tmech)[:-1]
+        elif pool is not None or num_proc > 1:
+            if progress is not None:
+                progress = _FractionProgress(
+                    _progress_logger(progress, ntmesh.shape[1]),
+                    ntmesh.shape[1])
+            if pool is not None:
+                iqd = pool.iqd_tmech_umax(ntmesh, u1, xtemp,
+                                          with_mtpa=with_mtpa,
+                                          with_tmech=with_tmech,
+                                          progress=progress)
             else:
-                try:
-                    progress.nsamples=ntmesh.shape[1]
-                    progress(0)  # To check conformity
-                    progress.n = 0
-                except:
-                    logger.warning("Invalid ProgressLogger given to efficiency_losses_map, using default one!")
-                    progress = ProgressLogger(ntmesh.shape[1])
+                with OperatingPointPool(num_proc, m) as tmppool:
+                    iqd = tmppool.iqd_tmech_umax(ntmesh, u1,
+                                                 with_mtpa=with_mtpa,
+                                                 with_tmech=with_tmech,
+                                                 progress=progress)
+        else:
+            progress = _progress_logger(progress, ntmesh.shape[1])
             if with_tmech:
                 iqd = np.array([
                     m.iqd_tmech_umax(
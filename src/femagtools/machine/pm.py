@@ -41,6 +41,65 @@ def parident(workdir, engine, temp, machine,
                       **kwargs)
 
 
+def _newton2(fun, b, i1, k, fscale, tol, maxiter):
+    """solve fun(b, i1, k) = 0 for each point k with a damped newton method
+
+    Args:
+      fun: function returning residuals F (2xN) and jacobian J (2x2xN)
+      b, i1: initial beta (rad) and current (A rms) arrays
+      k: index array of points passed to fun
+      fscale: residual scale factors (2xN)
+
+    Returns:
+      beta, i1 and convergence flags
+    """
+    b = np.array(b, dtype=float)
+    i1 = np.array(i1, dtype=float)
+    npoints = len(b)
+    conv = np.zeros(npoints, dtype=bool)
+    if not npoints:
+        return b, i1, conv
+    F, J = fun(b, i1, k)
+    merit = np.sum((F/fscale)**2, axis=0)
+    done = ~np.isfinite(merit)
+    with np.errstate(all='ignore'):
+        for _ in range(maxiter):
+            conv = np.all(np.abs(F) <= tol*fscale, axis=0)
+            done |= conv
+            a = np.flatnonzero(~done)
+            if not len(a):
+                break
+            det = J[0, 0, a]*J[1, 1, a] - J[0, 1, a]*J[1, 0, a]
+            db = -(J[1, 1, a]*F[0, a] - J[0, 1, a]*F[1, a])/det
+            di = -(J[0, 0, a]*F[1, a] - J[1, 0, a]*F[0, a])/det
+            db = np.clip(db, -0.3, 0.3)
+            imax = np.maximum(np.abs(i1[a]), 1e-3)
+            di = np.clip(di, -0.5*imax, imax)
+            alpha = 1.0
+            pending = np.isfinite(db) & np.isfinite(di)
+            done[a[~pending]] = True
+            for _ in range(8):
+                p = np.flatnonzero(pending)
+                if not len(p):
+                    break
+                ap = a[p]
+                bt = b[ap] + alpha*db[p]
+                it = np.abs(i1[ap] + alpha*di[p])
+                Ft, Jt = fun(bt, it, k[ap])
+                mt = np.sum((Ft/fscale[:, ap])**2, axis=0)
+                ok = np.isfinite(mt) & (mt < merit[ap])
+                acc = ap[ok]
+                b[acc], i1[acc] = bt[ok], it[ok]
+                F[:, acc], J[:, :, acc] = Ft[:, ok], Jt[:, :, ok]
+                merit[acc] = mt[ok]
+                pending[p[ok]] = False
+                alpha /= 2
+            # no descent found: stalled
+            done[a[pending]] = True
+        conv = np.all(np.abs(F) <= tol*fscale, axis=0)
+    return b, i1, conv
+
+
 class PmRelMachine(object):
     """Abstract base class for PmRelMachines
 
@@ -100,6 +159,41 @@ class PmRelMachine(object):
         def nolosses(x, y):
             return 0
         self._losses = {k: nolosses for k in tuple(self.losskeys)}
+        self.reset_solver_stats()
+
+    def reset_solver_stats(self):
+        """reset the counters of solver calls, iterations
+        and function evaluations"""
+        self.solver_stats = dict(calls=0, nit=0, nfev=0)
+
+    def _count_solver(self, nit, nfev):
+        self.solver_stats['calls'] += 1
+        self.solver_stats['nit'] += nit
+        self.solver_stats['nfev'] += nfev
+
+    def _minimize(self, fun, x0, **kwargs):
+        """scipy.optimize.minimize with solver statistics"""
+        res = so.minimize(fun, x0, **kwargs)
+        self._count_solver(res.get('nit', 0), res.get('nfev', 0))
+        return res
+
+    def _fsolve(self, func, x0, full_output=False, **kwargs):
+        """scipy.optimize.fsolve with solver statistics
+        (fsolve does not report iterations: nit counts function calls)"""
+        x, info, ier, mesg = so.fsolve(func, x0, full_output=True, **kwargs)
+        self._count_solver(info['nfev'], info['nfev'])
+        if full_output:
+            return x, info, ier, mesg
+        if ier != 1:
+            # as fsolve without full_output
+            warnings.warn(mesg, RuntimeWarning)
+        return x
+
+    def _fmin(self, func, x0, **kwargs):
+        """scipy.optimize.fmin (full_output) with solver statistics"""
+        res = so.fmin(func, x0, **kwargs)
+        self._count_solver(res[2], res[3])
+        return res
 
     def pfric(self, n):
         """friction and windage losses"""
@@ -124,14 +218,14 @@ class PmRelMachine(object):
         "returns maximum torque of i1 (nan if i1 out of range)"
         def torquei1b(b):
             return -self.torque_iqd(*iqd(b[0], i1))
-        res = so.minimize(torquei1b, (0,))
+        res = self._minimize(torquei1b, (0,))
         return -res.fun
 
     def torquemin(self, i1):
         "returns minimum torque of i1 (nan if i1 out of range)"
         def torquei1b(b):
             return self.torque_iqd(*iqd(b[0], i1))
-        res = so.minimize(torquei1b, (-np.pi/2,))
+        res = self._minimize(torquei1b, (-np.pi/2,))
         return -res.fun
 
     def iqd_torque(self, torque, iqd0=0, with_mtpa=True):
@@ -143,7 +237,7 @@ class PmRelMachine(object):
         else:
             i0 = iqd0
         if with_mtpa:
-            res = so.minimize(
+            res = self._minimize(
                 lambda iqd: la.norm(iqd), i0, method='SLSQP',
                 constraints=({'type': 'eq',
                               'fun': lambda iqd:
@@ -153,16 +247,16 @@ class PmRelMachine(object):
                 return res.x
             def func(i1):
                 return torque - self.mtpa(i1)[2]
-            i1 = so.fsolve(func, res.x[0])[0]
+            i1 = self._fsolve(func, res.x[0])[0]
             return self.mtpa(i1)[:2]
         def func(iq):
             return torque - self.torque_iqd(iq, 0)
-        return so.fsolve(func, 0)[0]
+        return self._fsolve(func, 0)[0]
 
 
         def tqiq(iq):
             return torque - self.torque_iqd(float(iq), 0)
-        iq = so.fsolve(tqiq, (i0[0],))[0]
+        iq = self._fsolve(tqiq, (i0[0],))[0]
         return iq, 0, self.torque_iqd(iq, 0)
 
     def iqd_tmech(self, torque, n, iqd0=0, with_mtpa=True):
@@ -185,7 +279,7 @@ class PmRelMachine(object):
         if with_mtpa:
             k=0
             while k < 6:
-                res = so.minimize(
+                res = self._minimize(
                     lambda iqd: la.norm(iqd), i0, method='SLSQP',
                     constraints=({'type': 'eq',
                                   'fun': lambda iqd:
@@ -202,7 +296,7 @@ class PmRelMachine(object):
                 f'Torque {torque} speed {n} {i0} {res.message}')
         def tqiq(iq):
             return torque - self.tmech_iqd(float(iq), 0, n)
-        iq = so.fsolve(tqiq, (i0[0],))[0]
+        iq = self._fsolve(tqiq, (i0[0],))[0]
         return iq, 0, self.tmech_iqd(iq, 0, n)
 
     def iqd_tmech0(self, torque, n, iqd0=0, with_mtpa=True):
@@ -215,7 +309,7 @@ class PmRelMachine(object):
             i0 = iqd0
 
         if with_mtpa:
-            res = so.minimize(
+            res = self._minimize(
                 lambda iqd: la.norm(iqd), i0, method='SLSQP',
                 constraints=({'type': 'eq',
                               'fun': lambda iqd:
@@ -230,17 +324,25 @@ class PmRelMachine(object):
             #    f'Torque {torque:.1f} speed {60*n:.1f} {res.message}')
             def func(i1):
                 return torque - self.mtpa_tmech(i1, n)[2]
-            i1 = so.fsolve(func, res.x[0])[0]
+            i1 = self._fsolve(func, res.x[0])[0]
             return self.mtpa_tmech(i1, n)[:2]
 
         def tqiq(iq):
             return torque - self.tmech_iqd(float(iq), 0, n)
-        iq = so.fsolve(tqiq, (i0[0],))[0]
+        iq = self._fsolve(tqiq, (i0[0],))[0]
         return iq, 0, self.tmech_iqd(iq, 0, n)
 
     def tloss_iqd(self, iq, id, n):
         """return loss torque of d-q current, iron loss correction factor
         and friction windage losses"""
+        if np.ndim(n) > 0:
+            n = np.asarray(n)
+            f1 = self.p*n
+            plfe = self.kpfe * (self.iqd_plfe1(iq, id, f1) + self.iqd_plfe2(iq, id, f1))
+            pmag = self.kpmag * self.iqd_plmag(iq, id, f1)
+            nx = np.where(n > 1e-3, n, 1)
+            return np.where(n > 1e-3,
+                            (plfe + pmag + self.pfric(n))/(2*np.pi*nx), 0)
         if n > 1e-3:
             f1 = self.p*n
             plfe = self.kpfe * (self.iqd_plfe1(iq, id, f1) + self.iqd_plfe2(iq, id, f1))
@@ -268,7 +370,7 @@ class PmRelMachine(object):
         u -- the maximum voltage (RMS)
         iq, id -- the d-q currents"""
         w10 = np.sqrt(2)*u/la.norm(self.psi(iq, id))
-        return so.fsolve(
+        return self._fsolve(
             lambda w1: la.norm(self.uqd(w1, iq, id))-u*np.sqrt(2),
             w10)[0]
 
@@ -281,7 +383,7 @@ class PmRelMachine(object):
         iq, id, T = self.mtpa(i1max)
         n0 = u1max/np.linalg.norm(self.psi(iq, id))/2/2/np.pi/self.p
         sign = -1 if i1max > 0 else 1
-        res = so.minimize(
+        res = self._minimize(
             lambda n: sign*self.mtpa_tmech(i1max, n)[2],
             n0,
             constraints={
@@ -304,7 +406,7 @@ class PmRelMachine(object):
 
     def w2_imax_umax(self, imax, umax, maxtorque=True):
         """return frequency at max current and max voltage"""
-        w, info, ier, mesg = so.fsolve(lambda x: np.linalg.norm(
+        w, info, ier, mesg = self._fsolve(lambda x: np.linalg.norm(
             self.uqd(x, *iqd(-np.pi/2, imax))) - umax*np.sqrt(2),
             np.sqrt(2)*umax/la.norm(self.psi(*self.io)),
             full_output=True)
@@ -316,27 +418,27 @@ class PmRelMachine(object):
 
     def beta_u(self, w1, u, i1):
         "beta at given frequency, voltage and current"
-        return so.fsolve(lambda b:
+        return self._fsolve(lambda b:
                          la.norm(self.uqd(w1, *(iqd(b, i1))))-u*np.sqrt(2),
                          np.arctan2(self.io[1], self.io[0]))[0]
 
     def iq_u(self, w1, u, id):
         "iq at given frequency, voltage and id current"
         iq0 = max(self.io[0]/4, id*np.tan(self.betarange[0]))
-        return so.fsolve(lambda iq:
+        return self._fsolve(lambda iq:
                          la.norm(
                              self.uqd(w1, iq, np.array([id])))-u*np.sqrt(2),
                          iq0)[0]
 
     def iqd_uqd(self, w1, uq, ud):
         "return iq, id current at given frequency, voltage"
-        return so.fsolve(lambda iqd:
+        return self._fsolve(lambda iqd:
                          np.array((uq, ud)) - self.uqd(w1, *iqd),
                          (0, self.io[1]))
 
     def i1_tmech(self, torque, beta, n):
         "return i1 current with given torque and beta"
-        i1, info, ier, mesg = so.fsolve(
+        i1, info, ier, mesg = self._fsolve(
             lambda i1: self.tmech_iqd(*iqd(beta, i1), n)-torque,
             self.i1range[1]/2,
             full_output=True)
@@ -347,7 +449,7 @@ class PmRelMachine(object):
 
     def i1_torque(self, torque, beta):
         "return i1 current with given torque and beta"
-        i1, info, ier, mesg = so.fsolve(
+        i1, info, ier, mesg = self._fsolve(
             lambda i1: self.torque_iqd(*iqd(beta, i1))-torque,
             self.i1range[1]/2,
             full_output=True)
@@ -358,7 +460,7 @@ class PmRelMachine(object):
 
     def i1_voltage(self, w1, u1, beta):
         "return i1 current with given w1, u1 and beta"
-        i1, info, ier, mesg = so.fsolve(
+        i1, info, ier, mesg = self._fsolve(
             lambda i1: la.norm(self.uqd(w1, *iqd(beta, i1)))-np.sqrt(2)*u1,
             la.norm(self.io),
             full_output=True)
@@ -370,7 +472,7 @@ class PmRelMachine(object):
     def id_torque(self, torque, iq):
         "return d current with given torque and d-current"
         id0 = self.iqd_torque(torque)[1]
-        return so.fsolve(
+        return self._fsolve(
             lambda id: self.torque_iqd(np.array([iq]), id)-torque, id0)[0]
 
     def iqd_tmech_umax(self, torque, w1, u1max, log=0, with_mtpa=True):
@@ -387,11 +489,11 @@ class PmRelMachine(object):
             beta, i1 = betai1(*i0)
             with warnings.catch_warnings():
                 warnings.simplefilter("ignore")
-                i0 = iqd(so.fsolve(lambda b: u1max - np.linalg.norm(
+                i0 = iqd(self._fsolve(lambda b: u1max - np.linalg.norm(
                     self.uqd(w1, *iqd(b, i1)))/np.sqrt(2),
                                    beta)[0], i1)
 
-            res = so.minimize(lambda iqd: np.linalg.norm(iqd), i0, method='SLSQP',
+            res = self._minimize(lambda iqd: np.linalg.norm(iqd), i0, method='SLSQP',
                           constraints=(
                               {'type': 'eq',
                                'fun': lambda iqd:
@@ -426,11 +528,11 @@ class PmRelMachine(object):
             beta, i1 = betai1(*i0)
             with warnings.catch_warnings():
                 warnings.simplefilter("ignore")
-                i0 = iqd(so.fsolve(lambda b: u1max - np.linalg.norm(
+                i0 = iqd(self._fsolve(lambda b: u1max - np.linalg.norm(
                     self.uqd(w1, *iqd(b, i1)))/np.sqrt(2),
                                    beta)[0], i1)
 
-        res = so.minimize(lambda iqd: la.norm(iqd), i0, method='SLSQP',
+        res = self._minimize(lambda iqd: la.norm(iqd), i0, method='SLSQP',
                           constraints=(
                               {'type': 'eq',
                                'fun': lambda iqd:
@@ -447,14 +549,199 @@ class PmRelMachine(object):
                          self.uqd(w1, *res.x))/np.sqrt(2))
         return res.x[0], res.x[1], self.torque_iqd(*res.x)
 
-    def iqd_pmech_imax_umax(self, n, P, i1max, u1max, with_mtpa, with_tmech, log=0):
-        """return d-q current and shaft torque at speed n, P const and max voltage"""
+    def iqd_tmech_umax_batch(self, torque, w1, u1max, with_mtpa=True,
+                             with_tmech=True, tol=1e-6, maxiter=40):
+        """return d-q currents and shaft torque of all load points
+        at stator frequency and max voltage with minimal current
+
+        All points are solved together by a vectorized Newton method
+        on beta, i1: first on MTPA (or beta=0 if with_mtpa is False),
+        then on the voltage limit for those points whose MTPA current
+        exceeds u1max. Points that do not converge are restarted from
+        the nearest converged neighbor and finally solved with
+        iqd_tmech_umax (iqd_torque_umax).
+
+        Args:
+          torque: (array) shaft torque (torque if with_tmech is False) in Nm
+          w1: (array) stator frequency in rad/s
+          u1max: (float) maximum phase voltage (V rms)
+          with_mtpa: (bool) use mtpa in const flux range if True
+          with_tmech: (bool) use shaft torque if True
+          tol: (float) relative tolerance of torque and voltage
+          maxiter: (int) max number of newton iterations
+
+        Returns:
+          array of iq, id, torque
+        """
+        torque = np.asarray(torque, dtype=float).ravel()
+        w1 = np.broadcast_to(np.asarray(w1, dtype=float),
+                             torque.shape).copy()
+        n = w1/2/np.pi/self.p
+        check_extrapolation = self.check_extrapolation
+        self.check_extrapolation = False
+        try:
+            b, i1, phase2, conv = self._iqd_batch_solve(
+                torque, w1, n, u1max, with_mtpa, with_tmech, tol, maxiter)
+        finally:
+            self.check_extrapolation = check_extrapolation
+
+        iq, id = iqd(b, i1)
+        tq = self._batch_torque(iq, id, n, with_tmech)
+        u1 = la.norm(self.uqd(w1, iq, id), axis=0)/np.sqrt(2)
+        failed = ~(conv & np.isfinite(tq) &
+                   (u1 <= u1max*(1+10*tol)))
+        logger.info("batch solver: %d points, %d voltage limited, %d fallback",
+                    len(torque), np.sum(phase2), np.sum(failed))
+        for k in np.flatnonzero(failed):
+            if with_tmech:
+                iq[k], id[k], tq[k] = self.iqd_tmech_umax(
+                    torque[k], w1[k], u1max, with_mtpa=with_mtpa)
+            else:
+                iq[k], id[k], tq[k] = self.iqd_torque_umax(
+                    torque[k], w1[k], u1max, with_mtpa=with_mtpa)
+        return np.array([iq, id, tq])
+
+    def _batch_torque(self, iq, id, n, with_tmech):
+        if with_tmech:
+            return self.tmech_iqd(iq, id, n)
+        return self.torque_iqd(iq, id)
+
+    def _iqd_batch_solve(self, torque, w1, n, u1max, with_mtpa,
+                         with_tmech, tol, maxiter):
+        """return beta, i1, voltage limit and convergence flags
+        of batch solver"""
+        def tq(b, i1, k):
+            return self._batch_torque(*iqd(b, i1), n[k], with_tmech)
+
+        def u1(b, i1, k):
+            return la.norm(self.uqd(w1[k], *iqd(b, i1)), axis=0)/np.sqrt(2)
+
+        def fmtpa(b, i1, k):
+            """torque and mtpa condition dT/dbeta = 0 with jacobian"""
+            d = 1e-3
+            e = 1e-4*i1 + 1e-6
+            t0 = tq(b, i1, k)
+            tbp, tbm = tq(b+d, i1, k), tq(b-d, i1, k)
+            tip, tim = tq(b, i1+e, k), tq(b, i1-e, k)
+            F = np.array([t0 - torque[k], (tbp - tbm)/2/d])
+            J = np.empty((2, 2, len(k)))
+            J[0, 0] = (tbp - tbm)/2/d
+            J[0, 1] = (tip - tim)/2/e
+            if with_mtpa:
+                J[1, 0] = (tbp - 2*t0 + tbm)/d**2
+                J[1, 1] = (tq(b+d, i1+e, k) - tq(b+d, i1-e, k) -
+                           tq(b-d, i1+e, k) + tq(b-d, i1-e, k))/4/d/e
+            else:
+                F[1] = b
+                J[0, 0] = 0
+                J[1, 0] = 1
+                J[1, 1] = 0
+            return F, J
+
+        def fumax(b, i1, k):
+            """torque and voltage limit with jacobian"""
+            d = 1e-5
+            e = 1e-5*i1 + 1e-6
+            F = np.array([tq(b, i1, k) - torque[k], u1(b, i1, k) - u1max])
+            J = np.empty((2, 2, len(k)))
+            J[0, 0] = (tq(b+d, i1, k) - tq(b-d, i1, k))/2/d
+            J[0, 1] = (tq(b, i1+e, k) - tq(b, i1-e, k))/2/e
+            J[1, 0] = (u1(b+d, i1, k) - u1(b-d, i1, k))/2/d
+            J[1, 1] = (u1(b, i1+e, k) - u1(b, i1-e, k))/2/e
+            return F, J
+
+        npoints = len(torque)
+        tscale = np.maximum(np.abs(torque), 1)
+        b, i1 = self._iqd_batch_initial(torque, with_mtpa)
+        zero = np.abs(torque) < 1e-2
+        k = np.flatnonzero(~zero)
+        b[zero], i1[zero] = 0, 0
+        conv = zero.copy()
+        b[k], i1[k], conv[k] = _newton2(
+            fmtpa, b[k], i1[k], k, np.array([tscale, tscale])[:, k],
+            tol, maxiter)
+
+        u = u1(b, i1, np.arange(npoints))
+        phase2 = conv & ~zero & (u > u1max)
+        conv[zero & (u > u1max)] = False
+        k = np.flatnonzero(phase2)
+        if len(k):
+            # move beta at constant current to the voltage limit
+            blo, bhi = b[k].copy(), np.full(len(k), -np.pi/2)
+            for _ in range(30):
+                bm = (blo + bhi)/2
+                over = u1(bm, i1[k], k) > u1max
+                blo = np.where(over, bm, blo)
+                bhi = np.where(over, bhi, bm)
+            b[k] = bhi
+            fscale = np.array([tscale[k], np.full(len(k), u1max)])
+            b[k], i1[k], conv[k] = _newton2(
+                fumax, b[k], i1[k], k, fscale, tol, maxiter)
+
+        # restart from nearest converged neighbor (speed, torque)
+        nscale = max(np.ptp(n), 1e-3)
+        tqscale = max(np.ptp(torque), 1e-3)
+        for fun, sel in ((fmtpa, ~phase2), (fumax, phase2)):
+            k = np.flatnonzero(~conv & sel & ~zero)
+            kc = np.flatnonzero(conv & sel & ~zero)
+            if not len(k) or not len(kc):
+                continue
+            dist = (((n[k, None] - n[None, kc])/nscale)**2 +
+                    ((torque[k, None] - torque[None, kc])/tqscale)**2)
+            nb = kc[np.argmin(dist, axis=1)]
+            if fun is fmtpa:
+                fscale = np.array([tscale[k], tscale[k]])
+            else:
+                fscale = np.array([tscale[k], np.full(len(k), u1max)])
+            b[k], i1[k], conv[k] = _newton2(
+                fun, b[nb], i1[nb], k, fscale, tol, maxiter)
+        return b, i1, phase2, conv
+
+    def _iqd_batch_initial(self, torque, with_mtpa):
+        """return initial beta, i1 of torque values
+        interpolated from a torque table on a beta, i1 grid"""
+        if np.isfinite(self.i1range[1]):
+            i1max = self.i1range[1]
+        else:
+            i1max = max(la.norm(self.io), 1)
+        bgrid = np.linspace(max(self.betarange[0], -np.pi),
+                            min(self.betarange[1], np.pi), 91)
+        if not with_mtpa:
+            bgrid = np.array([0.0])
+        tmax = np.max(np.abs(torque))
+        for _ in range(12):
+            igrid = np.linspace(0, i1max, 41)
+            bx, ix = np.meshgrid(bgrid, igrid, indexing='ij')
+            tqgrid = self.torque_iqd(*iqd(bx, ix))
+            tqgrid[~np.isfinite(tqgrid)] = 0
+            if (np.isfinite(self.i1range[1]) or
+                    np.max(np.abs(tqgrid)) > tmax):
+                break
+            i1max *= 2
+
+        b0 = np.zeros_like(torque)
+        i0 = np.zeros_like(torque)
+        for sign, pos in ((1, torque >= 0), (-1, torque < 0)):
+            kbopt = np.argmax(sign*tqgrid, axis=0)
+            topt = np.maximum.accumulate(
+                sign*tqgrid[kbopt, np.arange(len(igrid))])
+            i0[pos] = np.interp(sign*torque[pos], topt, igrid)
+            b0[pos] = np.interp(sign*torque[pos], topt, bgrid[kbopt])
+        return b0, i0
+
+    def iqd_pmech_imax_umax(self, n, P, i1max, u1max, with_mtpa, with_tmech, log=0,
+                            iqd0=0):
+        """return d-q current and shaft torque at speed n, P const and max voltage
+        (iqd0: initial d-q current, calculated if scalar)"""
         T = P / n / 2 / np.pi
         w1 = 2*np.pi *n * self.p
         logger.debug("field weakening mode %.2f kW @ %.0f rpm %.1f Nm; "
                      "u1=%.0f V; plfric=%.2f W",
                      P/1000, n*60, T, u1max, self.pfric(n))
-        iq, id = self.iqd_torque_imax_umax(T, n, u1max, with_tmech=with_tmech)[:2]
+        if np.isscalar(iqd0):
+            iq, id = self.iqd_torque_imax_umax(T, n, u1max, with_tmech=with_tmech)[:2]
+        else:
+            iq, id = iqd0
 
         if with_tmech:
             tcon = {'type': 'eq',
@@ -465,7 +752,7 @@ class PmRelMachine(object):
                     'fun': lambda iqd:
                     self.torque_iqd(*iqd) - T}
 
-        res = so.minimize(lambda iqd: np.linalg.norm(iqd), (iq, id),
+        res = self._minimize(lambda iqd: np.linalg.norm(iqd), (iq, id),
                           method='SLSQP',
                           constraints=[tcon,
                                        {'type': 'ineq',
@@ -599,7 +886,7 @@ class PmRelMachine(object):
         """return iq, id, torque at maximum torque of current i1"""
         sign = -1 if i1 > 0 else 1
         b0 = 0 if i1 > 0 else -np.pi
-        bopt, fopt, iter, funcalls, warnflag = so.fmin(
+        bopt, fopt, iter, funcalls, warnflag = self._fmin(
             lambda x: sign*self.torque_iqd(*iqd(x, abs(i1))), b0,
             full_output=True,
             disp=0)
@@ -610,7 +897,7 @@ class PmRelMachine(object):
         """return iq, id, shaft torque at maximum torque of current i1"""
         sign = -1 if i1 > 0 else 1
         b0 = 0 if i1 > 0 else -np.pi
-        bopt, fopt, iter, funcalls, warnflag = so.fmin(
+        bopt, fopt, iter, funcalls, warnflag = self._fmin(
             lambda x: sign*self.tmech_iqd(*iqd(x, abs(i1)), n), b0,
             full_output=True,
             disp=0)
@@ -634,7 +921,7 @@ class PmRelMachine(object):
             constraints.append({'type': 'ineq',
                                 'fun': lambda iqd:
                                  i1max - betai1(*iqd)[1]})
-        res = so.minimize(lambda iqd: sign*self.torque_iqd(*iqd), i0,
+        res = self._minimize(lambda iqd: sign*self.torque_iqd(*iqd), i0,
                           method='SLSQP', constraints=constraints)
         #logger.info("mtpv %s", res)
         if res['success']:
@@ -658,7 +945,7 @@ class PmRelMachine(object):
             constraints.append({'type': 'ineq',
                                 'fun': lambda iqd:
                                  i1max - betai1(*iqd)[1]})
-        res = so.minimize(lambda iqd: sign*self.tmech_iqd(*iqd, n), i0,
+        res = self._minimize(lambda iqd: sign*self.tmech_iqd(*iqd, n), i0,
                           method='SLSQP',
                           constraints=constraints)
         #logger.info("mtpv_torque %s", res)
@@ -775,7 +1062,7 @@ class PmRelMachine(object):
                             return np.sqrt(2)*i1 - np.linalg.norm(
                                 self.mtpv(wx, u1max, iqd0=(iq, id),
                                           maxtorque=T > 0)[:2])
-                    w, _, ier, _ = so.fsolve(voltw1, wx, full_output=True)
+                    w, _, ier, _ = self._fsolve(voltw1, wx, full_output=True)
                     logger.debug("fsolve ier %d T %f w %f w1 %f", ier, T, w, wx)
                     if ier in (1, 4, 5):
                         if abs(w[0]) <= wx:
@@ -888,10 +1175,34 @@ class PmRelMachine(object):
 
         return r
 
+    def _continuation(self, solve, n0, n1, iqd0, maxdepth=3):
+        """return solve(n1, iqd0) where iqd0 is the solution at speed n0.
+        The speed step is halved (maxdepth times) if the solver fails,
+        finally solve(n1, 0) is called with its default initial values"""
+        try:
+            return self._continuation_step(solve, n0, n1, iqd0, maxdepth)
+        except ValueError:
+            return solve(n1, 0)
+
+    def _continuation_step(self, solve, n0, n1, iqd0, maxdepth):
+        try:
+            res = solve(n1, iqd0)
+            if np.all(np.isfinite(res)):
+                return res
+        except ValueError:
+            pass
+        if maxdepth == 0:
+            raise ValueError(f"continuation failed at n {n1}")
+        nm = (n0 + n1)/2
+        logger.debug("continuation: refine step %g -> %g", n0, nm)
+        iqdm = self._continuation_step(solve, n0, nm, iqd0, maxdepth-1)[:2]
+        return self._continuation_step(solve, nm, n1, iqdm, maxdepth-1)
+
     def characteristics(self, T, n, u1max, nsamples=60,
                         with_mtpv=True, with_mtpa=True,
                         with_pmconst=True, with_tmech=True,
-                        with_torque_corr=False, **kwargs):
+                        with_torque_corr=False, with_continuation=False,
+                        **kwargs):
         """calculate torque speed characteristics.
         return dict with list values of
         id, iq, n, T, ud, uq, u1, i1,
@@ -907,6 +1218,11 @@ class PmRelMachine(object):
         with_mtpa -- (optional) use mtpa if True (default) in const speed range, set id=0 if false
         with_tmech -- (optional) use friction and windage losses if True (default)
         with_torque_corr -- (optional) T is corrected if out of range
+        with_continuation -- (optional) start the solver of each speed sample
+                     in the fieldweakening range at the d-q current of
+                     the previous sample (default False).
+                     Not used in the MTPA range without with_pmconst:
+                     its bisection of beta takes no initial value.
         """
         r = dict(id=[], iq=[], uq=[], ud=[], u1=[], i1=[], T=[],
                  beta=[], gamma=[], phi=[], cosphi=[], pmech=[], n=[])
@@ -1001,29 +1317,46 @@ class PmRelMachine(object):
                     dn = (nu - r['n'][-1])/ns
                     logger.info("RANGE %s %d: %f -- %f",
                                 iv, ns, r['n'][-1] + dn, nu)
+                    warm_start = with_continuation
+                    if iv == 'MTPA':
+                        if with_pmconst:
+                            def solve(nx, iqd0):
+                                return self.iqd_pmech_imax_umax(
+                                    nx, Pmax, i1max, u1max,
+                                    with_mtpa=with_mtpa,
+                                    with_tmech=with_tmech, iqd0=iqd0)
+                        else:
+                            # bisection: iqd0 is not used
+                            warm_start = False
+
+                            def solve(nx, iqd0):
+                                return self.iqd_imax_umax(
+                                    i1max, 2*np.pi*nx*self.p, u1max,
+                                    Tf, with_tmech=with_tmech,
+                                    with_mtpv=with_mtpv)
+                    elif with_tmech:
+                        def solve(nx, iqd0):
+                            return self.mtpv_tmech(2*np.pi*nx*self.p, u1max,
+                                                   iqd0=iqd0, maxtorque=T > 0)
+                    else:
+                        def solve(nx, iqd0):
+                            return self.mtpv(2*np.pi*nx*self.p, u1max,
+                                             iqd0=iqd0, maxtorque=T > 0)
                     try:
                         for nn in np.linspace(r['n'][-1]+dn, nu, ns):
                             w1 = 2*np.pi*nn*self.p
                             logger.debug("fieldweakening: n %g T %g i1max %g w1 %g u1 %g",
                                          nn*60, Tf, i1max, w1, u1max)
-                            if iv == 'MTPA':
-                                if with_pmconst:
-                                    iq, id, tq = self.iqd_pmech_imax_umax(
-                                        nn, Pmax, i1max, u1max,
-                                        with_mtpa=with_mtpa,
-                                        with_tmech=with_tmech)
-                                else:
-                                    iq, id, tq = self.iqd_imax_umax(
-                                        i1max, w1, u1max,
-                                        Tf, with_tmech=with_tmech,
-                                        with_mtpv=with_mtpv)
+                            if warm_start:
+                                # linear predictor from the last 2 samples
+                                iqd0 = np.array((r['iq'][-1], r['id'][-1]))
+                                if len(r['n']) > 1 and r['n'][-1] > r['n'][-2]:
+                                    iqd0 += ((iqd0 - (r['iq'][-2], r['id'][-2])) *
+                                             (nn - r['n'][-1])/(r['n'][-1] - r['n'][-2]))
+                                iq, id, tq = self._continuation(
+                                    solve, r['n'][-1], nn, iqd0)
                             else:
-                                if with_tmech:
-                                    iq, id, tq = self.mtpv_tmech(w1, u1max,
-                                                                 maxtorque=T > 0)
-                                else:
-                                    iq, id, tq = self.mtpv(w1, u1max,
-                                                           maxtorque=T > 0)
+                                iq, id, tq = solve(nn, 0)
                             if (T > 0 and tq > 0) or (T < 0 and tq < 0):
                                 r['id'].append(id)
                                 r['iq'].append(iq)
@@ -1154,6 +1487,7 @@ class PmRelMachineLdq(PmRelMachine):
     optional keyword args:
     psid D-Flux in Vs (RMS)
     psiq Q-Flux in Vs (RMS)
+    cache_splines fit ld, lq, psim splines once (default True)
     """
 
     def __init__(self,  m, p, psim=[], ld=[], lq=[],
@@ -1255,6 +1589,14 @@ class PmRelMachineLdq(PmRelMachine):
 
         self.betarange = min(beta), max(beta)
         self.i1range = (0, np.max(i1))
+        if kwargs.get('cache_splines', True):
+            # fit each surface once, ev is vectorized over arrays
+            self.ld = ip.RectBivariateSpline(beta, i1, np.asarray(ld)).ev
+            self.psim = ip.RectBivariateSpline(beta, i1, np.asarray(psim)).ev
+            self.lq = ip.RectBivariateSpline(beta, i1, np.asarray(lq)).ev
+            logger.debug("rectbivariatespline (cached) beta %s i1 %s",
+                         beta, i1)
+            return
         def interp(x, b, i):
             return ip.RectBivariateSpline(beta, i1, np.asarray(x)).ev(b, i)
         self.ld = partial(interp, ld)
@@ -1265,6 +1607,9 @@ class PmRelMachineLdq(PmRelMachine):
     def psi(self, iq, id, tol=1e-4):
         """return psid, psiq of currents iq, id"""
         beta, i1 = betai1(np.asarray(iq), np.asarray(id))
+        if np.ndim(beta) > 0:
+            return self._psi_array(np.asarray(iq), np.asarray(id),
+                                   beta, i1, tol)
         if np.isclose(beta, np.pi, atol=1e-4):
             beta = -np.pi
         #logger.debug('beta %f (%f, %f) i1 %f %f',
@@ -1282,6 +1627,25 @@ class PmRelMachineLdq(PmRelMachine):
         psiq = self.lq(beta, i1)*iq
         return (psid, psiq)
 
+    def _psi_array(self, iq, id, beta, i1, tol):
+        """return psid, psiq of current arrays iq, id
+        (nan where out of range if check_extrapolation is set)"""
+        beta = np.where(np.isclose(beta, np.pi, atol=1e-4), -np.pi, beta)
+        if self.psid:
+            psid = np.asarray(self.psid(beta, i1), dtype=float)
+            psiq = np.asarray(self.psiq(beta, i1), dtype=float)
+        else:
+            psid = np.asarray(self.ld(beta, i1)*id +
+                              np.sqrt(2)*self.psim(beta, i1), dtype=float)
+            psiq = np.asarray(self.lq(beta, i1)*iq, dtype=float)
+        if self.check_extrapolation:
+            outside = ((self.betarange[0]-tol > beta) |
+                       (self.betarange[1]+tol < beta) |
+                       (i1 > 1.01*self.i1range[1]))
+            psid = np.where(outside, np.nan, psid)
+            psiq = np.where(outside, np.nan, psiq)
+        return (psid, psiq)
+
     def iqdmin(self, i1):
         """max iq, min id for given current"""
         if self.betarange[0] <= -np.pi/2 <= self.betarange[1]:
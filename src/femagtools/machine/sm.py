@@ -525,6 +525,36 @@ class SynchronousMachine(object):
                        res['message'], w1, torque, u1max, io)
         raise ValueError(res['message'])
 
+    def iqd_tmech_umax_batch(self, torque, w1, u1max, with_mtpa=True,
+                             with_tmech=True):
+        """return currents and shaft torque of all load points
+        at stator frequency and max voltage with minimal losses
+
+        Scalar fallback: the excitation current adds a third unknown,
+        the points are solved one by one with iqd_tmech_umax
+        (iqd_torque_umax).
+
+        Args:
+          torque: (array) shaft torque (torque if with_tmech is False) in Nm
+          w1: (array) stator frequency in rad/s
+          u1max: (float) maximum phase voltage (V rms)
+          with_mtpa: (bool) must be True (minimal losses)
+          with_tmech: (bool) use shaft torque if True
+
+        Returns:
+          array of iq, id, iex, torque
+        """
+        if not with_mtpa:
+            raise ValueError("with_mtpa=False is not supported")
+        torque = np.asarray(torque, dtype=float).ravel()
+        w1 = np.broadcast_to(np.asarray(w1, dtype=float), torque.shape)
+        if with_tmech:
+            solve = self.iqd_tmech_umax
+        else:
+            solve = self.iqd_torque_umax
+        return np.array([solve(t, w, u1max)
+                         for t, w in zip(torque, w1)]).T
+
     def w1_imax_umax(self, i1max, u1max):
         """return frequency w1 and shaft torque at voltage u1max and current i1max
 
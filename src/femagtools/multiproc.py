@@ -3,6 +3,8 @@
 """
 import platform
 import multiprocessing
+import pickle
+import json
 import subprocess
 import time
 import os
@@ -10,8 +12,11 @@ import re
 import threading
 import pathlib
 import logging
+import atexit
+from queue import Queue
 from .job import Job
 import femagtools.config as cfg
+import femagtools.femag
 try:
     from subprocess import DEVNULL
 except ImportError:
@@ -153,6 +158,137 @@ def run_femag(cmd, workdir, fslfile):
     return proc.returncode
 
 
+def run_femag_task(cmd, workdir, fslfile, task):
+    """Start the femag command as subprocess and read the results
+    of the task if it was successful.
+
+    :internal:
+
+    Args:
+        cmd: (list) The program (executable image) to be run
+        workdir: The workdir where the calculation files are stored
+        fslfile: The name of the start file (usually femag.fsl)
+        task: the task whose results are read
+
+    Return:
+        return code and results (None if failed)
+    """
+    returncode = run_femag(cmd, workdir, fslfile)
+    results = None
+    if returncode == 0:
+        try:
+            results = task.get_results()
+        except Exception as e:
+            logger.warning("Reading results of %s failed: %s", workdir, e)
+    return returncode, results
+
+
+class FemagWorker(threading.Thread):
+    """Feeds the FSL commands of queued tasks to a long-lived
+    FEMAG process in ZMQ mode.
+
+    :internal:
+
+    Args:
+        queue: the task queue shared by all workers, its items are
+            pairs of task and the queue of completed tasks
+        port: port number of the req socket of the FEMAG process
+        workdir: the working directory of the FEMAG process
+        parse_results: read the results of each task right after
+            it has finished
+        timeout: max duration of a task in seconds (None: no limit)
+    """
+    control_timeout = 60000  # ms
+
+    def __init__(self, queue, port, workdir, parse_results=False,
+                 timeout=None):
+        threading.Thread.__init__(self, daemon=True)
+        self.queue = queue
+        self.femag = femagtools.femag.ZmqFemag(port, workdir=workdir)
+        self.parse_results = parse_results
+        self.timeout = timeout
+        self.cmd = None
+
+    def _is_running(self):
+        """returns True if the FEMAG process is alive"""
+        proc = getattr(getattr(self.femag, 'femagTask', None), 'proc', None)
+        return proc is not None and proc.poll() is None
+
+    def _start(self, cmd):
+        """(re)starts the FEMAG process if cmd has changed
+        or the process has terminated"""
+        if cmd == self.cmd and self._is_running():
+            return
+        if self.cmd:
+            if self._is_running():
+                self.femag.quit()
+            else:
+                logger.warning('%s (port %d) has terminated: restart',
+                               self.cmd, self.femag.port)
+        self.cmd = None
+        self.femag.cmd = cmd[0]
+        pid = self.femag.run(options=cmd[1:] + ['-b'], restart=True)
+        if not pid:
+            raise femagtools.femag.FemagError(
+                f'{cmd} (port {self.femag.port}) did not start')
+        logger.info('%s (pid %d, port %d)', cmd, pid, self.femag.port)
+        self.cmd = cmd
+
+    def _do_task(self, task):
+        response = self.femag.change_case(task.directory,
+                                          timeout=self.control_timeout)
+        status = json.loads(response[0])
+        if status['status'] != 'ok':
+            return status
+        with open(os.path.join(task.directory, task.fsl_file)) as f:
+            fslcmds = f.readlines()
+        response = self.femag.send_fsl(
+            fslcmds, timeout=int(1000*self.timeout) if self.timeout else None)
+        return json.loads(response[0])
+
+    def run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                break
+            task, done = item
+            try:
+                self._start(task.cmd)
+                status = self._do_task(task)
+                if status['status'] == 'ok':
+                    task.status = 'C'
+                    if self.parse_results:
+                        try:
+                            task.results = task.get_results()
+                        except Exception as e:
+                            logger.warning("Reading results of %s failed: %s",
+                                           task.directory, e)
+                else:
+                    task.status = 'X'
+                    task.errmsg = status.get('message', '')
+                    logger.error("%s: %s", task.directory, task.errmsg)
+            except Exception as e:
+                task.status = 'X'
+                task.errmsg = str(e)
+                logger.error("%s: %s", task.directory, e)
+            finally:
+                if task.status == 'X' and self.femag.request_socket is None:
+                    # no response: kill, the next task restarts it
+                    self.stop()
+                done.put(task)
+                self.queue.task_done()
+        if self.cmd:
+            self.femag.quit()
+        self.femag.close()
+
+    def stop(self):
+        """kills the FEMAG process"""
+        if self.cmd:
+            self.femag.stopFemag()
+            self.cmd = None
+
+
 class Engine:
     """The MultiProc engine uses a pool of local calculation processes.
 
@@ -164,10 +300,26 @@ class Engine:
             (femag dc is used if None)
         process_count: number of processes (cpu_count() if None)
         progress_timestep: time step in seconds for progress log messages if > 0)
+        parse_results: read the results (BCH files) of each task in the
+            calculation process right after it has finished (default False)
+        persistent: keep process_count FEMAG processes (ZMQ mode) alive
+            across all submit calls and stream the FSL commands of the
+            tasks to idle processes (default False, requires FEMAG 9.2)
+        port: port number of the first FEMAG process in persistent mode
+            (default 5555). Each process uses 3 consecutive ports.
+        timeout: max duration of a task in seconds in persistent mode
+            (default None: no limit). The FEMAG process of a task
+            that times out is restarted.
+
+    The persistent FEMAG processes save the start of a FEMAG process per
+    task only: each task runs its complete FSL (including the model
+    creation or opening). They are stopped by close, at the end of a
+    with block or at the exit of the program.
     """
 
     def __init__(self, **kwargs):
         self.process_count = kwargs.get('process_count', None)
+        self.parse_results = kwargs.get('parse_results', False)
         cmd = kwargs.get('cmd', '')
         if cmd:
             self.cmd = [cmd]
@@ -176,6 +328,10 @@ class Engine:
 
         self.progressLogger = 0
         self.progress_timestep = kwargs.get('timestep', 5)
+        self.persistent = kwargs.get('persistent', False)
+        self.port = kwargs.get('port', 5555)
+        self.timeout = kwargs.get('timeout', None)
+        self.workers = []
 
     def create_job(self, workdir):
         """Create a FEMAG :py:class:`Job`
@@ -196,6 +352,7 @@ class Engine:
         Return:
             length of started tasks
         """
+        self.job.prepare()
         # must check if cmd is set:
         args = []
         if platform.system() == 'Windows':
@@ -209,13 +366,10 @@ class Engine:
                 t.cmd = [cfg.get_executable(
                     t.stateofproblem)] + args
 
-        self.pool = multiprocessing.Pool(self.process_count)
-        self.tasks = [self.pool.apply_async(run_femag,
-                                            args=(t.cmd,
-                                                  t.directory,
-                                                  t.fsl_file))
-                      for t in self.job.tasks]
-        self.pool.close()
+        if self.persistent:
+            self._submit_workers()
+        else:
+            self._submit_pool()
 
         if (self.progress_timestep and
                 self.job.num_cur_steps):
@@ -224,7 +378,76 @@ class Engine:
                 num_cur_steps=self.job.num_cur_steps,
                 timestep=self.progress_timestep)
             self.progressLogger.start()
-        return len(self.tasks)
+        return len(self.job.tasks)
+
+    def _submit_workers(self):
+        """queue tasks for the persistent FEMAG processes
+        which are started on first use"""
+        if not self.workers:
+            self.queue = Queue()
+            self.workers = [
+                FemagWorker(self.queue, self.port + 3*i,
+                            self.job.basedir, self.parse_results,
+                            self.timeout)
+                for i in range(self.process_count or
+                               multiprocessing.cpu_count())]
+            for w in self.workers:
+                w.start()
+            atexit.register(self.close)
+        self.done = Queue()
+        for t in self.job.tasks:
+            self.queue.put((t, self.done))
+
+    def _submit_pool(self):
+        self.pool = multiprocessing.Pool(self.process_count)
+        self.tasks = []
+        self.done = Queue()
+        for i, t in enumerate(self.job.tasks):
+            def completed(result, i=i):
+                self.done.put(i)
+            if self.parse_results and self._is_picklable(t.result_func):
+                self.tasks.append(self.pool.apply_async(
+                    run_femag_task,
+                    args=(t.cmd, t.directory, t.fsl_file, t),
+                    callback=completed, error_callback=completed))
+            else:
+                self.tasks.append(self.pool.apply_async(
+                    run_femag,
+                    args=(t.cmd, t.directory, t.fsl_file),
+                    callback=completed, error_callback=completed))
+        self.pool.close()
+
+    @staticmethod
+    def _set_status(t, ec):
+        """set status (and results) of task t from its process result"""
+        if isinstance(ec, tuple):
+            ec, t.results = ec
+        t.status = 'C'
+        if ec != 0:
+            t.status = 'X'
+            errmsg = pathlib.Path(t.directory) / 'femag.err'
+            if errmsg.exists():
+                t.errmsg = errmsg.read_text()
+                if t.errmsg:
+                    logger.error(t.errmsg)
+
+    def as_completed(self):
+        """Iterate over the submitted tasks in the order
+        in which their calculations finish
+
+        Return:
+            generator of tasks (with status C = Ok, X = error)
+        """
+        for _ in self.job.tasks:
+            if self.persistent:
+                yield self.done.get()
+            else:
+                i = self.done.get()
+                t = self.job.tasks[i]
+                self._set_status(t, self.tasks[i].get())
+                yield t
+        if self.progressLogger:
+            self.progressLogger.stop()
 
     def join(self):
         """Wait until all calculations are finished
@@ -232,26 +455,54 @@ class Engine:
         Return:
             list of all calculations status (C = Ok, X = error)
         """
+        if self.persistent:
+            self.queue.join()
+            if self.progressLogger:
+                self.progressLogger.stop()
+            return [t.status for t in self.job.tasks]
+
         exitcodes = [task.get() for task in self.tasks]
         status = []
         for t, ec in zip(self.job.tasks, exitcodes):
-            t.status = 'C'
-            if ec != 0:
-                t.status = 'X'
-                errmsg = pathlib.Path(t.directory) / 'femag.err'
-                if errmsg.exists():
-                    t.errmsg = errmsg.read_text()
-                    if t.errmsg:
-                        logger.error(t.errmsg)
+            self._set_status(t, ec)
             status.append(t.status)
         if self.progressLogger:
             self.progressLogger.stop()
         return status
 
+    @staticmethod
+    def _is_picklable(result_func):
+        """check if result_func can be passed to a calculation process"""
+        try:
+            pickle.dumps(result_func)
+            return True
+        except Exception:
+            logger.debug("results are read after join: %s", result_func)
+            return False
+
+    def close(self):
+        """Stop the persistent FEMAG processes (if any)"""
+        if not self.workers:
+            return
+        atexit.unregister(self.close)
+        for _ in self.workers:
+            self.queue.put(None)
+        for w in self.workers:
+            w.join()
+        self.workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def terminate(self):
         logger.info("terminate Engine")
         if self.progressLogger:
             self.progressLogger.stop()
+        for w in self.workers:
+            w.stop()
         # terminate pool
         try:
             self.pool.terminate()
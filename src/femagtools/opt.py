@@ -9,12 +9,16 @@
 
 """
 import time
+import itertools
 import logging
 import pathlib
+import numpy as np
 import femagtools
 import femagtools.fsl
 import femagtools.moproblem
 import femagtools.getset
+import femagtools.job
+import femagtools.condor
 from .moo.algorithm import Nsga2
 from .moo.population import Population
 from .femag import set_magnet_properties
@@ -61,15 +65,59 @@ class Optimizer(object):
                                       magnetizingCurves=magnetizingCurves,
                                       magnets=magnetMat,
                                       condMat=condMat)
+        self.cache = None
+        self.file_store = None
+        self.journal = None
+        self.done = {}
+
+    def set_result_cache(self, cache):
+        """reuses the result files of individuals with identical
+        input files instead of running FEMAG again.
+        (not available with the condor engine which
+        maps the task directories by process number:
+        calling it with a condor engine raises ValueError)
+        Args:
+          cache: :py:class:`femagtools.job.ResultCache` or None
+        """
+        self.cache = cache
+
+    def set_file_store(self, file_store):
+        """links the input files of the tasks from a content-addressed
+        store instead of copying them into every task directory.
+        Args:
+          file_store: :py:class:`femagtools.job.FileStore` or None
+        """
+        self.file_store = file_store
+
+    def set_journal(self, filename):
+        """appends a record with generation, decision vars, objectives
+        and status of every individual to this file as soon as its
+        task has completed.
+        Args:
+          filename: name of journal file
+        """
+        self.journal = femagtools.job.ResultJournal(filename)
 
     def _update_population(self, generation, pop, engine):
         self.job.cleanup()
 
+        individuals = {}  # task: individual
         for k, i in enumerate(pop.individuals):
+            x = tuple(np.asarray(i.cur_x).tolist())
+            if x in self.done:
+                i.cur_f = self.done[x]
+                i.generation = generation
+                continue
             task = self.job.add_task(self.result_func)
+            individuals[id(task)] = i
             pop.problem.prepare(i.cur_x, self.model)
-            for mc in self.femag.copy_magnetizing_curves(self.model,
-                                                         task.directory):
+            if self.file_store:
+                mc_files = self.femag.stage_magnetizing_curves(
+                    self.model, self.staged_mc)
+            else:
+                mc_files = self.femag.copy_magnetizing_curves(
+                    self.model, task.directory)
+            for mc in mc_files:
                 task.add_file(mc)
             if 'wdgdef' in self.model.winding:
                 self.model.winding['wdgfile'] = self.femag.create_wdg_def(
@@ -83,16 +131,30 @@ class Optimizer(object):
                               self.fea['poc'].content())
             if 'stateofproblem' in self.fea:
                 task.set_stateofproblem(self.fea['stateofproblem'])
+        self.job.prepare()
         tstart = time.time()
-        ntasks = engine.submit()
-        status = engine.join()
-        tend = time.time()
+        tasks = self.job.tasks
+        if self.cache:
+            self.job.tasks = [t for t in tasks if not self.cache.get(t)]
+            logger.info('Result cache %s', self.cache.stats())
+        completed = [t for t in tasks if t.status == 'C']
+        if self.job.tasks:
+            ntasks = engine.submit()
+            if hasattr(engine, 'as_completed'):
+                completed = itertools.chain(completed,
+                                            engine.as_completed())
+            else:
+                status = engine.join()
+                completed = tasks
 
-        for t, i in zip(self.job.tasks, pop.individuals):
+        for t in completed:
+            i = individuals[id(t)]
+            status = t.status
             if t.status == 'C':
                 r = t.get_results()
                 if isinstance(r, dict) and 'error' in r:
                     logger.warn("Task %s failed: %s", t.id, r['error'])
+                    status = 'X'
                 else:
                     if isinstance(r, dict):
                         pop.problem.setResult(
@@ -104,21 +166,48 @@ class Optimizer(object):
                     i.results = {k: v for k, v in r.items()}
             else:
                 logger.warn("Task %s failed with status %s", t.id, t.status)
+            if status != 'C':
                 i.cur_f = [float('nan')]*pop.problem.f_dim
+            elif self.cache:
+                self.cache.put(t)
 
             i.generation = generation  # for reporting purposes
+            if self.journal:
+                self.journal.append(generation=generation,
+                                    x=np.asarray(i.cur_x).tolist(),
+                                    f=i.cur_f, status=status)
+        if self.job.tasks and hasattr(engine, 'as_completed'):
+            status = engine.join()
+        self.job.tasks = tasks
+        tend = time.time()
 
         pop.update()
         return tend - tstart
 
     def __call__(self, num_generations, opt, pmMachine,
-                 operatingConditions, engine):
+                 operatingConditions, engine, resume=False):
         return self.optimize(num_generations, opt, pmMachine,
-                             operatingConditions, engine)
+                             operatingConditions, engine, resume)
 
     def optimize(self, num_generations, opt, pmMachine,
-                 operatingConditions, engine):
-        """execute optimization"""
+                 operatingConditions, engine, resume=False):
+        """execute optimization
+
+        Args:
+          resume: reuse the objectives of individuals recorded in the
+            journal (see :py:meth:`set_journal`) instead of starting
+            a new journal
+        """
+        if self.cache and isinstance(engine, femagtools.condor.Engine):
+            raise ValueError("result cache not supported by condor engine")
+        self.done = {}
+        self.staged_mc = {}  # mc files to be linked from file store
+        if self.journal and resume:
+            self.done = {tuple(r['x']): r['f']
+                         for r in self.journal.resume()}
+            logger.info('resume: %d individuals completed', len(self.done))
+        elif self.journal:
+            self.journal.clear()
         decision_vars = opt['decision_vars']
         objective_vars = opt['objective_vars']
         population_size = opt['population_size']
@@ -138,6 +227,7 @@ class Optimizer(object):
         algo = Nsga2()
 
         self.job = engine.create_job(self.femag.workdir)
+        self.job.set_file_store(self.file_store)
         # for progress logger
         self.job.num_cur_steps = femagtools.model.FeaModel(
             self.fea).get_num_cur_steps()
@@ -9,11 +9,13 @@ import os
 import time
 import shutil
 import functools
+import itertools
 import pathlib
 import numpy as np
 import femagtools
 import femagtools.model
 import femagtools.fsl
+import femagtools.job
 import femagtools.condor
 import femagtools.moproblem
 import femagtools.getset
@@ -64,6 +66,7 @@ class ParameterStudy(object):
     CAUTION: choose the workdir exclusively for this usage.
              do not share it with anything else.
     """
+    random_sampling = False  # samples differ on each call
 
     def __init__(self, workdir,
                  magnetizingCurves=None, magnets=None, condMat=[], result_func=None,
@@ -78,6 +81,9 @@ class ParameterStudy(object):
         # rudimentary: gives the ability to stop a running parameter variation. thomas.maier/OSWALD
         self.stop = False
         self.reportdir = ''
+        self.cache = None
+        self.file_store = None
+        self.journal = None
         self.repname = repname  # prefix for report filename ..-report.csv
         """
         the "owner" of the Grid have to take care to terminate all running xfemag64 or wfemagw64
@@ -105,6 +111,36 @@ class ParameterStudy(object):
             raise ValueError("directory {} is not empty".format(dirname))
         self.reportdir = dirname
 
+    def set_result_cache(self, cache):
+        """reuses the result files of tasks with identical input files
+        instead of running FEMAG again.
+        (not available with the condor engine which
+        maps the task directories by process number:
+        calling it with a condor engine raises ValueError)
+        Args:
+          cache: :py:class:`femagtools.job.ResultCache` or None
+        """
+        self.cache = cache
+
+    def set_file_store(self, file_store):
+        """links the input files of the tasks from a content-addressed
+        store instead of copying them into every task directory.
+        Args:
+          file_store: :py:class:`femagtools.job.FileStore` or None
+        """
+        self.file_store = file_store
+
+    def set_journal(self, filename):
+        """appends a record with decision vars, objectives and status
+        of every sample to this file as soon as its task has completed.
+        The first record holds the samples of the study which are reused
+        when resuming with random sampling (LatinHypercube); otherwise
+        they must match the samples of the decision vars.
+        Args:
+          filename: name of journal file
+        """
+        self.journal = femagtools.job.ResultJournal(filename)
+
     def setup_model(self, builder, model, recsin=''):
         """builds model in current workdir and returns its filenames"""
         # get and write mag curves
@@ -139,7 +175,8 @@ class ParameterStudy(object):
 
     def __call__(self, opt, machine, simulation,
                  engine, bchMapper=None,
-                 extra_files=[], num_samples=0):
+                 extra_files=[], num_samples=0, stream=False,
+                 resume=False):
         """calculate objective vars for all decision vars
         Args:
           opt: variation parameter dict (decision_vars, objective_vars)
@@ -149,9 +186,17 @@ class ParameterStudy(object):
           bchMapper: bch result transformation function
           extra_files: list of additional input file names to be copied
           num_samples: number of samples (ingored with Grid sampling)
+          stream: submit all samples at once and collect the results
+            as the tasks complete (engine must provide as_completed,
+            population_size is ignored)
+          resume: skip the completed samples of the journal
+            (see :py:meth:`set_journal`) instead of starting a new journal
+            (raises ValueError if the samples of the journal differ)
         """
 
         self.stop = False  # make sure the calculation will start. thomas.maier/OSWALD
+        if self.cache and isinstance(engine, femagtools.condor.Engine):
+            raise ValueError("result cache not supported by condor engine")
 
         decision_vars = opt['decision_vars']
         objective_vars = opt.get('objective_vars', {})
@@ -162,6 +207,32 @@ class ParameterStudy(object):
         dvarnames, domain, par_range = self._get_names_and_range(
             decision_vars, num_samples)
 
+        done = {}  # completed samples of journal
+        if self.journal and resume:
+            completed = self.journal.resume()
+            samples = [r['samples'] for r in self.journal.read()
+                       if 'samples' in r]
+            if not samples:
+                self.journal.append(samples=np.asarray(par_range).tolist())
+            elif samples[0] != np.asarray(par_range).tolist():
+                if not self.random_sampling:
+                    raise ValueError(
+                        f"samples of {self.journal.filename} do not "
+                        "match the decision vars")
+                # continue with the random samples of the journal
+                par_range = np.asarray(samples[0])
+                domain = par_range.T.tolist()
+            for r in completed:
+                k = r['index']
+                if (k < len(par_range) and
+                        r['x'] == np.asarray(par_range[k]).tolist()):
+                    done[k] = r['f']
+            logger.info('resume: %d of %d samples completed',
+                        len(done), len(par_range))
+        elif self.journal:
+            self.journal.clear()
+            self.journal.append(samples=np.asarray(par_range).tolist())
+
         # check if this model needs to be modified
         immutable_model = len([d for d in dvarnames
                                if hasattr(model,
@@ -198,23 +269,28 @@ class ParameterStudy(object):
             logger.info("Files %s", modelfiles+extra_files)
 
         job = engine.create_job(self.femag.workdir)
+        job.set_file_store(self.file_store)
         # for progress logger
         job.num_cur_steps = fea.get_num_cur_steps()
 
         f = []
         p = 1
-        calcid = 0
         logger.debug(par_range)
 
         if hasattr(fea, 'poc'):
             fea.poc.pole_pitch = 2*360/model.get('poles')
             fea.pocfilename = fea.poc.filename()
         elapsedTime = 0
-        self.bchmapper_data = []  # clear bch data
+        staged_mc = {}  # mc files to be linked from file store
+        # bch data by sample index (None if failed or resumed)
+        self.bchmapper_data = [None]*len(par_range)
         # split x value (par_range) array in handy chunks:
         popsize = 0
-        for population in baskets(par_range, opt.get('population_size',
-                                                     len(par_range))):
+        offset = 0  # index of first sample in population
+        population_size = opt.get('population_size', len(par_range))
+        if stream:
+            population_size = len(par_range)
+        for population in baskets(par_range, population_size):
             if self.stop:  # try to return the results so far. thomas.maier/OSWALD
                 logger.info(
                     'stopping grid execution... returning results so far...')
@@ -247,8 +323,12 @@ class ParameterStudy(object):
                         p, int(np.ceil(len(par_range)/popsize)),
                         np.shape(f))
             job.cleanup()
-            for k, x in enumerate(population):
+            samples = {}  # task: sample index
+            for k, x in enumerate(population, offset):
+                if k in done:
+                    continue
                 task = job.add_task(self.result_func)
+                samples[id(task)] = k
                 for fn in extra_files:
                     task.add_file(fn)
                 if immutable_model:
@@ -266,10 +346,15 @@ class ParameterStudy(object):
                 else:
                     prob.prepare(x, [model, fea, self.femag.magnets])
                     logger.info("prepare %s", x)
-                    for mc in self.femag.copy_magnetizing_curves(
+                    if self.file_store:
+                        mc_files = self.femag.stage_magnetizing_curves(
+                            model, staged_mc, recsin=fea.recsin)
+                    else:
+                        mc_files = self.femag.copy_magnetizing_curves(
                             model,
                             dir=task.directory,
-                            recsin=fea.recsin):
+                            recsin=fea.recsin)
+                    for mc in mc_files:
                         task.add_file(mc)
                     set_magnet_properties(model, fea, self.femag.magnets)
                     task.add_file(
@@ -284,52 +369,61 @@ class ParameterStudy(object):
                 if hasattr(fea, 'stateofproblem'):
                     task.set_stateofproblem(fea.stateofproblem)
 
+            job.prepare()
             tstart = time.time()
-            status = engine.submit(extra_result_files)
-            logger.info('Started %s', status)
-            status = engine.join()
+            tasks = job.tasks
+            if self.cache:
+                job.tasks = [t for t in tasks if not self.cache.get(t)]
+                logger.info('Result cache %s', self.cache.stats())
+            completed = [t for t in tasks if t.status == 'C']
+            if job.tasks:
+                status = engine.submit(extra_result_files)
+                logger.info('Started %s', status)
+                if hasattr(engine, 'as_completed'):
+                    completed = itertools.chain(completed,
+                                                engine.as_completed())
+                else:
+                    engine.join()
+                    completed = tasks
+            results = {}  # objective values by sample index
+            for n, t in enumerate(completed):
+                k = samples[id(t)]
+                repdir = ''
+                if self.reportdir and t.status == 'C':
+                    repdir = os.path.join(self.reportdir, str(k))
+                results[k], status = self._task_result(
+                    t, k, prob, objective_vars, bchMapper, repdir)
+                if self.cache and status == 'C':
+                    self.cache.put(t)
+                self._journal_append(k, par_range[k], results[k], status)
+                logger.info('........ %d / %d results',
+                            n+1, len(tasks))
+                if stream and self.stop:
+                    logger.info('stopping grid execution... '
+                                'returning results so far...')
+                    if job.tasks:
+                        engine.terminate()
+                    break
+            else:
+                if job.tasks and hasattr(engine, 'as_completed'):
+                    engine.join()
+            job.tasks = tasks
+            status = [t.status for t in tasks]
             tend = time.time()
             elapsedTime += (tend-tstart)
             logger.info("Elapsed time %d s Status %s",
                         (tend-tstart), status)
-            for t in job.tasks:
-                if t.status == 'C':
-                    r = t.get_results()
-                    # save result file if requested:
-                    if self.reportdir:
-                        repdir = os.path.join(self.reportdir,
-                                              str(calcid))
-                        os.makedirs(repdir)
-                        try:
-                            shutil.copy(glob.glob(os.path.join(
-                                t.directory, r.filename)+'.B*CH')[0], repdir)
-                        except (FileNotFoundError, AttributeError):
-                            # must be a failure, copy all files
-                            for ff in glob.glob(
-                                    os.path.join(t.directory, '*')):
-                                shutil.copy(ff, repdir)
-                        calcid += 1
-                    if isinstance(r, dict) and 'error' in r:
-                        logger.warn("job %d failed: %s", k, r['error'])
-                        if objective_vars:
-                            f.append([float('nan')]*len(objective_vars))
-                        else:
-                            f.append(dict())
-                    else:
-                        if bchMapper:
-                            bchData = bchMapper(r)
-                            self.addBchMapperData(bchData)
-                            prob.setResult(bchData)
-                        elif isinstance(r, dict):
-                            prob.setResult(femagtools.getset.GetterSetter(r))
-                        else:
-                            prob.setResult(r)
-                        f.append(prob.objfun([]))
-                else:
-                    if objective_vars:
-                        f.append([float('nan')]*len(objective_vars))
-                    else:
-                        f.append(dict())
+            if stream:
+                f = [done[k] if k in done else
+                     results.get(k, self._nan_result(objective_vars))
+                     for k in range(len(par_range))]
+                break
+            for k in range(offset, offset + len(population)):
+                if k in done:
+                    f.append(done[k])
+                    continue
+                f.append(results[k])
+            offset += len(population)
             p += 1
 
         logger.info('Total elapsed time %d s ...... DONE', elapsedTime)
@@ -349,8 +443,54 @@ class ParameterStudy(object):
             logger.error(v)
             return dict(f=f, x=domain, status=status)
 
-    def addBchMapperData(self, bchData):
-        self.bchmapper_data.append(bchData)
+    def _journal_append(self, k, x, f, status):
+        if self.journal:
+            self.journal.append(index=k, x=np.asarray(x).tolist(),
+                                f=f, status=status)
+
+    @staticmethod
+    def _nan_result(objective_vars):
+        if objective_vars:
+            return [float('nan')]*len(objective_vars)
+        return dict()
+
+    def _task_result(self, t, k, prob, objective_vars, bchMapper, repdir):
+        """returns the objective values and status of task t of sample k
+        (status X if its results contain an error) and saves its result
+        file into repdir if not empty"""
+        if t.status != 'C':
+            return self._nan_result(objective_vars), t.status
+        r = t.get_results()
+        # save result file if requested:
+        if repdir:
+            os.makedirs(repdir, exist_ok=True)
+            try:
+                shutil.copy(glob.glob(os.path.join(
+                    t.directory, r.filename)+'.B*CH')[0], repdir)
+            except (FileNotFoundError, AttributeError):
+                # must be a failure, copy all files
+                for ff in glob.glob(
+                        os.path.join(t.directory, '*')):
+                    shutil.copy(ff, repdir)
+        if isinstance(r, dict) and 'error' in r:
+            logger.warn("job %s failed: %s", t.id, r['error'])
+            return self._nan_result(objective_vars), 'X'
+        if bchMapper:
+            bchData = bchMapper(r)
+            self.addBchMapperData(bchData, k)
+            prob.setResult(bchData)
+        elif isinstance(r, dict):
+            prob.setResult(femagtools.getset.GetterSetter(r))
+        else:
+            prob.setResult(r)
+        return prob.objfun([]), t.status
+
+    def addBchMapperData(self, bchData, k=None):
+        """stores bchData of sample k (appended if k is None)"""
+        if k is None:
+            self.bchmapper_data.append(bchData)
+        else:
+            self.bchmapper_data[k] = bchData
 
     def getBchMapperData(self):
         return self.bchmapper_data
@@ -389,6 +529,7 @@ class List(ParameterStudy):
 
 class LatinHypercube(ParameterStudy):
     """Latin Hypercube sampling parameter variation calculation"""
+    random_sampling = True
 
     def __init__(self, workdir,
                  magnetizingCurves=None, magnets=None, condMat=[],
@@ -6,9 +6,12 @@ import femagtools.nc
 import femagtools.vtu as vtu
 import numpy as np
 import scipy.integrate as integrate
+import multiprocessing
 import warnings
 import pathlib
 import logging
+import os
+from time import perf_counter
 
 logger = logging.getLogger('femagtools.asm')
 
@@ -110,6 +113,251 @@ def losscoeff_frequency_to_time(B0, f0, c, exp):
     return c/(B0**exp*f0**exp)/((2*np.pi)**exp * y)
 
 
+# default number of elements that are evaluated at once
+_CHUNKSIZE = 4096
+
+
+def _iron_losses_fft(freq, bx, by, c):
+    '''Iron losses of elements from the spectrum of the flux density
+    (see Losses.iron_losses_fft_el)
+        Parameters
+        ----------
+        freq : float
+            Base frequency [Hz]
+        bx, by : array (time, elements)
+            Flux density divided by fillfactor [T]
+        c : dict
+            Iron loss coefficients
+
+        Returns
+        -------
+        losses : array (3, elements)
+            Hysteresis, eddy current and excess losses [W/kg]
+    '''
+    nt, nel = bx.shape
+    cols = np.arange(nel)
+    spx = np.fft.fft(bx, axis=0)
+    bx_spec = abs(spx)/(nt/2)
+    bx_spec[0] = bx_spec[0]/2
+    bx_phi = np.arctan2(spx.imag, spx.real)
+    spy = np.fft.fft(by, axis=0)
+    by_spec = abs(spy)/(nt/2)
+    by_spec[0] = by_spec[0]/2
+    by_phi = np.arctan2(spy.imag, spy.real)
+
+    b_abs = np.sqrt(bx**2 + by**2)
+    b_spec = np.sqrt(bx_spec**2 + by_spec**2)
+
+    # phase shift of the fundamental components
+    i_max = np.argmax(b_spec, axis=0)
+    dphi = bx_phi[i_max, cols] - by_phi[i_max, cols]
+    while np.any(dphi > np.pi/2):
+        dphi[dphi > np.pi/2] -= np.pi
+    while np.any(dphi < -np.pi/2):
+        dphi[dphi < -np.pi/2] += np.pi
+    b_dc = np.maximum(abs(bx_spec[0]), abs(by_spec[0]))
+    # axis ratio of the ellipse in main direction
+    j_max = np.argmax(b_abs, axis=0)
+    phi = np.arctan2(by[j_max, cols], bx[j_max, cols])
+    max_bxt = np.max(abs(np.cos(phi)*bx + np.sin(phi)*by), axis=0)
+    max_byt = np.max(abs(np.sin(phi)*bx - np.cos(phi)*by), axis=0)
+    axis = np.zeros(nel)
+    k = max_byt > 1.0e-3
+    axis[k] = max_bxt[k]/max_byt[k]
+    k = axis > 1.0
+    axis[k] = 1.0/axis[k]
+
+    # correction factor for rotating fields
+    kz = np.ones(nel)
+    kz[(abs(dphi) > np.pi/3) & (axis > 0.3)] = 1.55
+    k = b_dc > 0.2
+    kz[k] = 1.0 + 0.65*b_dc[k]**2.1
+    kz[np.max(b_spec, axis=0) > 1.85] = 1.1
+
+    fr = (np.arange(nt//2)*freq/c['base_frequency'])[:, None]
+    br = b_spec[:nt//2]/c['base_induction']
+    return np.array([
+        kz*c['ch']*np.sum(fr**c['ch_freq_exp']*br**c['ch_ind_exp'], axis=0),
+        c['cw']*np.sum(fr**c['cw_freq_exp']*br**c['cw_ind_exp'], axis=0),
+        c['ce']*np.sum(fr**c['ce_freq_exp']*br**c['ce_ind_exp'], axis=0)])
+
+
+def _iron_lossenergy_time(time, bx, by, c):
+    '''Iron loss energy of elements in time domain
+    (see Losses.iron_lossenergy_time_el)
+        Parameters
+        ----------
+        time : array (time)
+            Time vector [s]
+        bx, by : array (time, elements)
+            Flux density divided by fillfactor [T]
+        c : dict
+            Iron loss coefficients
+
+        Returns
+        -------
+        energies : array (3, elements)
+            Hysteresis, eddy current and excess loss energies [Ws/kg]
+
+    The waterfall method processes the time steps of all elements
+    at once: the reversal points of each element are kept in the rows
+    of a stack array.
+    '''
+    kh, chbe, khml = c['kh'], c['ch_ind_exp'], c['khml']
+    nt, nel = bx.shape
+    cols = np.arange(nel)
+    # peak value and direction of the main field
+    j_max = np.argmax(np.sqrt(bx**2 + by**2), axis=0)
+    phi = np.arctan2(by[j_max, cols], bx[j_max, cols])
+    # transformation to main direction
+    br = np.cos(phi)*bx + np.sin(phi)*by
+    bt = np.sin(phi)*bx - np.cos(phi)*by
+    b = np.sqrt(br**2 + bt**2)
+
+    hyst = np.zeros(nel)
+    bpeak = np.zeros(nel)
+    bpeak_p = np.sqrt(bx[0]**2 + by[0]**2)
+    tp = np.zeros(nel)
+    tp_beg = np.zeros(nel)
+    tp_end = np.zeros(nel)
+    nzeros = np.zeros(nel, dtype=int)
+    zero = br[0] >= 0
+    up = br[1] > br[0]
+    stack = np.zeros((nel, nt))  # reversal points
+    pos = np.arange(nt)
+    sp = np.zeros(nel, dtype=int)  # number of reversal points
+    bm = np.zeros(nel)
+    db = np.zeros(nel)
+    has_bm = np.zeros(nel, dtype=bool)
+    for i in range(1, nt):
+        b1, b2 = b[i-1], b[i]
+        # peak value within last period
+        bpeak_p = np.maximum(bpeak_p, b2)
+        # zero crossings and period
+        cross = zero != (br[i] >= 0)
+        if np.any(cross):
+            zero = zero ^ cross
+            tp_beg = np.where(cross, tp_end, tp_beg)
+            tp_end = np.where(cross, time[i], tp_end)
+            period = cross & (tp_beg > 0.0)
+            nzeros += period
+            tp = np.where(period, 2*(tp_end - tp_beg), tp)
+            bpeak = np.where(period, bpeak_p, bpeak)
+            k = period & (nzeros > 1)
+            hyst[k] += kh*bpeak[k]**chbe/2
+            k = period & (nzeros == 1)
+            hyst[k] += kh*bpeak[k]**chbe*(tp_end[k] - time[0])/tp[k]
+            bpeak_p[period] = 0.0
+            sp[cross] = 0
+        # reversal points
+        push = np.where(up, b2 < b1, b2 > b1)
+        stack[cols[push], sp[push]] = b1[push]
+        sp += push
+        up = b2 > b1
+        # closed minor loops
+        full = sp > 1
+        last = stack[cols, np.maximum(sp - 1, 0)]
+        prev = stack[cols, np.maximum(sp - 2, 0)]
+        rising = full & (b2 > 0) & up & (b2 > prev)
+        falling = full & (b2 > 0) & ~up & (last > prev) & has_bm
+        bm = np.where(rising, abs(prev + last)/2, bm)
+        db = np.where(rising, abs(prev - last), db)
+        has_bm |= rising
+        k = np.nonzero(rising | falling)[0]
+        if len(k):
+            hyst[k] += kh*bm[k]**(chbe-1)*khml*db[k]/2
+            # remove the first occurrence of the last two reversal
+            # points (as list.remove, periodic fields repeat values)
+            s, n = stack[k], sp[k]
+            for p in (2, 1):
+                v = s[np.arange(len(k)), n-p]
+                j = np.argmax((s == v[:, None]) & (pos < n[:, None]), axis=1)
+                shift = (pos[:-1] >= j[:, None]) & (pos[:-1] < n[:, None]-1)
+                s[:, :-1] = np.where(shift, s[:, 1:], s[:, :-1])
+                n = n - 1
+            stack[k], sp[k] = s, n
+
+    k = nzeros >= 1
+    hyst[k] += kh*bpeak[k]**chbe*(time[-1] - tp_end[k])/tp[k]
+
+    dt = np.diff(time)[:, None]
+    dbdt = np.sqrt(np.diff(br, axis=0)**2 + np.diff(bt, axis=0)**2)/dt
+    return np.array([hyst,
+                     np.sum(c['kw']*dbdt**c['cw_ind_exp']*dt, axis=0),
+                     np.sum(c['ke']*dbdt**c['ce_ind_exp']*dt, axis=0)])
+
+
+def _equidistant(times, y):
+    '''Interpolate the columns of y on the equidistant time vector'''
+    if times.equidistant or y.shape[1] == 0:
+        return y
+    return np.array([np.interp(times.vector_equi,
+                               times.vector, yi,
+                               period=1.0/times.freq)
+                     for yi in y.T]).T
+
+
+def _element_losses_chunk(methode, data, times, c=None):
+    '''Losses of a chunk of elements
+        Parameters
+        ----------
+        methode : str
+            "ohm time", "ohm fft", "iron time" or "iron fft"
+        data : array (time, elements, components)
+            Current density or flux density of the elements
+        times : object
+            TimeRange
+        c : dict
+            Iron loss coefficients
+
+        Returns
+        -------
+        losses : array
+            Ohmic losses (elements) without material and geometry factors
+            or iron losses (3, elements) [W/kg] or [Ws/kg]
+    '''
+    time = np.asarray(times.vector)
+    if methode == "ohm time":
+        cd = (data[1:, :, 0] + data[:-1, :, 0])/2
+        return np.sum(np.diff(time)[:, None]*cd**2, axis=0)
+    if methode == "ohm fft":
+        cd = _equidistant(times, data[:, :, 0])
+        cd_spec = abs(np.fft.fft(cd, axis=0))/(len(cd)/2)
+        return np.sum(cd_spec[:len(cd)//2]**2/2, axis=0)
+    ff = c['fillfactor']
+    if methode == "iron time":
+        return _iron_lossenergy_time(
+            time, data[:, :, 0]/ff, data[:, :, 1]/ff, c)
+    return _iron_losses_fft(times.freq,
+                            _equidistant(times, data[:, :, 0])/ff,
+                            _equidistant(times, data[:, :, 1])/ff, c)
+
+
+# shared memory blocks attached by the pool worker
+_shared_tensors = {}
+
+
+def _shared_tensor(name, shape, dtype):
+    '''return array of shared memory block (attached once per worker)'''
+    try:
+        return _shared_tensors[name][1]
+    except KeyError:
+        from multiprocessing import shared_memory
+        shm = shared_memory.SharedMemory(name=name)
+        a = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        _shared_tensors[name] = (shm, a)
+        return a
+
+
+def _element_losses_task(args):
+    '''calculate losses of a chunk of elements in a pool worker'''
+    start, methode, tensor, tslice, index, times, c = args
+    t0 = perf_counter()
+    data = np.asarray(_shared_tensor(*tensor)[tslice][:, index], dtype=float)
+    losses = _element_losses_chunk(methode, data, times, c)
+    return start, losses, os.getpid(), perf_counter() - t0
+
+
 class TimeRange(object):
     def __init__(self, vtu_data, nc_model):
         '''Read time vector in and generate an equidistant vector if necessary.
@@ -149,15 +397,33 @@ class TimeRange(object):
 
 
 class Losses(object):
-    def __init__(self, modelname, dirname):
+    def __init__(self, modelname, dirname, num_proc=0,
+                 chunksize=_CHUNKSIZE):
         '''Loss calculation for FEMAG-TS simulations
         Parameters
         ----------
         dirname : str
             Name of the model (nc-file)
         ncmodel : object
-
+        num_proc : int
+            Number of worker processes (optional, default 0)
+        chunksize : int
+            Number of elements that are evaluated at once (optional)
+
+        The elements are evaluated in chunks. With num_proc > 1 the
+        chunks are distributed to a pool of worker processes which read
+        the vtu arrays from shared memory. The pool and the shared
+        memory are released by close (or at the end of a with block).
+        The time used for each chunk is appended to chunk_timing.
+        The vtu data of the elements is evaluated in double precision
+        (the per-element methods keep the single precision of the vtu
+        data, their results differ in the 7th significant digit).
         '''
+        self.num_proc = num_proc
+        self.chunksize = chunksize
+        self.chunk_timing = []
+        self._pool = None
+        self._shared = {}
         self.vtu_data = vtu.read(dirname)
         self.nc_model = femagtools.nc.read(modelname)
         # Read iron losses coefficients
@@ -173,6 +439,234 @@ class Losses(object):
                     'Waterfall method not possible, specify parameter kw')
                 kw = 0.0
 
+    def _cell_data(self, name, index):
+        '''Cell data of elements within the time window
+        as array (time, elements, components)'''
+        t = self.vtu_data.get_tensor(name)
+        return np.asarray(t[self.vtu_data.time_slice(len(t))][:, index],
+                          dtype=float)
+
+    def _shared_tensor(self, data_name):
+        '''Copy the array of data_name to shared memory
+        and return name, shape and dtype of the block'''
+        if data_name not in self._shared:
+            from multiprocessing import shared_memory
+            t = self.vtu_data.get_tensor(data_name)
+            shm = shared_memory.SharedMemory(create=True,
+                                             size=max(t.nbytes, 1))
+            np.ndarray(t.shape, dtype=t.dtype, buffer=shm.buf)[:] = t
+            self._shared[data_name] = (shm, (shm.name, t.shape, t.dtype.str))
+        return self._shared[data_name][1]
+
+    def _element_losses(self, methode, index, c=None):
+        '''Losses of elements (see _element_losses_chunk)
+        evaluated in chunks, in worker processes if num_proc > 1'''
+        data_name = 'curd' if methode.startswith('ohm') else 'b'
+        if methode.startswith('ohm'):
+            losses = np.zeros(len(index))
+        else:
+            losses = np.zeros((3, len(index)))
+        chunks = range(0, len(index), self.chunksize)
+        if self.num_proc > 1 and len(chunks) > 1:
+            tensor = self._shared_tensor(data_name)
+            tslice = self.vtu_data.time_slice(tensor[1][0])
+            if self._pool is None:
+                self._pool = multiprocessing.Pool(self.num_proc)
+            results = self._pool.imap_unordered(
+                _element_losses_task,
+                [(k, methode, tensor, tslice, index[k:k+self.chunksize],
+                  self.times, c) for k in chunks])
+        else:
+            def serial():
+                for k in chunks:
+                    t0 = perf_counter()
+                    data = self._cell_data(data_name,
+                                           index[k:k+self.chunksize])
+                    yield (k, _element_losses_chunk(methode, data,
+                                                    self.times, c),
+                           os.getpid(), perf_counter() - t0)
+            results = serial()
+
+        for k, chunk_losses, pid, elapsed in results:
+            n = chunk_losses.shape[-1]
+            losses[..., k:k+n] = chunk_losses
+            self.chunk_timing.append({'methode': methode, 'start': k,
+                                      'size': n, 'pid': pid,
+                                      'elapsed': elapsed})
+            logger.debug("%s elements %d..%d: %.3f s (pid %d)",
+                         methode, k, k+n, elapsed, pid)
+        return losses
+
+    def close(self):
+        '''Terminate the worker processes and release the shared memory'''
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        for shm, _ in self._shared.values():
+            shm.close()
+            shm.unlink()
+        self._shared = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None and self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        self.close()
+
+    def _is_iron(self, se):
+        el = se.elements[0]
+        return ((el.reluc[0] < 1.0 or el.reluc[1] < 1.0) and
+                (el.mag[0] == 0.0 and el.mag[1] == 0.0))
+
+    def _iron_loss_coefficients(self, se):
+        '''Iron loss coefficients of superelement'''
+        if se.mcvtype > 0:
+            return self.iron_loss_coefficients[se.mcvtype-1]
+        center_pnt = se.elements[0].center
+        try:
+            if (np.sqrt(center_pnt[0]**2+center_pnt[1]**2) > self.nc_model.FC_RADIUS):
+                return self.iron_loss_coefficients[-2]  # outside
+        except AttributeError:
+            pass
+        return self.iron_loss_coefficients[-1]  # inside
+
+    def _se_element_index(self, superelements):
+        '''Element indexes of superelements and number of elements'''
+        index = [self.nc_model.se_element_indexes(se)
+                 for se in superelements]
+        counts = np.array([len(i) for i in index], dtype=int)
+        if index:
+            return np.concatenate(index), counts
+        return np.zeros(0, dtype=int), counts
+
+    def _se_losses(self, superelements, counts, losses):
+        '''Sum up element losses (components, elements) of superelements,
+        the results are multiplied by the scale factor'''
+        seidx = np.repeat(np.arange(len(superelements)), counts)
+        losses = np.atleast_2d(losses)
+        selosses = self.nc_model.scale_factor()*np.array(
+            [np.bincount(seidx, weights=l, minlength=len(superelements))
+             for l in losses]).reshape(len(losses), -1)
+        return {se.key: selosses[:, i]
+                for i, se in enumerate(superelements)}
+
+    def _ohm_element_losses(self, superelements, methode="time"):
+        '''Ohmic losses of all elements of superelements with conductivity
+        Parameters
+        ----------
+        superelements : list
+            Superelements
+        methode : str
+            "time": loss energy (see ohm_lossenergy_el)
+            "fft": power losses (see ohm_powerlosses_fft_el)
+
+        Returns
+        -------
+        superelements : list
+            Superelements with conductivity
+        counts : array
+            Number of elements of each superelement
+        index : array
+            Element indexes
+        losses : array
+            Ohmic loss energy or power losses of the elements
+        '''
+        ses = [se for se in superelements if se.conduc > 0.0]
+        index, counts = self._se_element_index(ses)
+
+        def se_values(attr):
+            return np.repeat(np.array([getattr(se, attr) for se in ses],
+                                      dtype=float), counts)
+        ff = se_values('fillfactor')
+        ff[ff == 0.0] = 1.0
+        temp_corr = 1+se_values('temp_coef')*(
+            self.nc_model.element_temperature[index]-20)
+        factor = (self.nc_model.element_areas()[index]/ff /
+                  se_values('conduc')*temp_corr*se_values('length') *
+                  self.nc_model.arm_length)
+
+        losses = self._element_losses(
+            "ohm time" if methode == "time" else "ohm fft", index)
+        return ses, counts, index, losses*factor
+
+    def _iron_element_losses(self, superelements, methode="fft"):
+        '''Iron losses of all elements of iron superelements
+        Parameters
+        ----------
+        superelements : list
+            Superelements
+        methode : str
+            "fft": power losses (see iron_losses_fft_el)
+            "time": loss energy (see iron_lossenergy_time_el)
+
+        Returns
+        -------
+        superelements : list
+            Iron superelements, grouped by loss coefficients
+        counts : array
+            Number of elements of each superelement
+        index : array
+            Element indexes
+        losses : array (3, elements)
+            Hysteresis, eddy current and excess losses of the elements
+
+        The elements are evaluated in chunks per iron material
+        (see _element_losses).
+        '''
+        groups = {}
+        for se in superelements:
+            if self._is_iron(se):
+                c = self._iron_loss_coefficients(se)
+                groups.setdefault(id(c), (c, []))[1].append(se)
+
+        length = self.nc_model.arm_length
+        ses, counts, index, losses = [], [], [], []
+        for c, group in groups.values():
+            idx, n = self._se_element_index(group)
+            el_losses = self._element_losses(
+                "iron time" if methode == "time" else "iron fft", idx, c)
+            ff = c['fillfactor']
+            sw = c['spec_weight']*1000
+            el_losses *= self.nc_model.element_areas()[idx]*length*ff*sw
+            ses += group
+            counts.append(n)
+            index.append(idx)
+            losses.append(el_losses)
+        if not ses:
+            return [], np.zeros(0, dtype=int), np.zeros(0, dtype=int), \
+                np.zeros((3, 0))
+        return (ses, np.concatenate(counts), np.concatenate(index),
+                np.concatenate(losses, axis=1))
+
+    def _iron_se_losses(self, superelements, methode="fft"):
+        '''Iron losses of superelements as dict of superelement keys'''
+        ses, counts, index, losses = self._iron_element_losses(
+            superelements, methode)
+        selosses = self._se_losses(ses, counts, losses)
+        results = {}
+        for se in superelements:
+            hyst, eddy, exce = selosses.get(se.key, np.zeros(3))
+            results[se.key] = {'total': hyst + eddy + exce,
+                               'hysteresis': hyst,
+                               'eddycurrent': eddy,
+                               'excess': exce}
+        return results
+
+    def _ohm_sr_losses(self, methode="time"):
+        '''Ohmic losses of all subregions as dict of subregion keys'''
+        ses, counts, index, losses = self._ohm_element_losses(
+            self.nc_model.superelements, methode)
+        selosses = self._se_losses(ses, counts, losses)
+        return {sr.key: sum([selosses[se.key][0]
+                             for se in sr.superelements
+                             if se.key in selosses], 0.0)
+                for sr in self.nc_model.subregions}
+
     def ohm_lossenergy_el(self, el, supel):
         '''Ohmic loss energy of an element
         Parameters
@@ -220,18 +714,9 @@ class Losses(object):
         The loss energy is determined by adding up the loss energy of the
         individual elements.
         '''
-        scale_factor = self.nc_model.scale_factor()
-        srlossenergy = 0.0
-        for se in sr.superelements:
-            selossenergy = 0.0
-            if se.conduc > 0.0:
-                for el in se.elements:
-                    ellossenergy = self.ohm_lossenergy_el(el, se)
-                    selossenergy = selossenergy + ellossenergy * scale_factor
-
-            srlossenergy = srlossenergy + selossenergy
-
-        return srlossenergy
+        ses, counts, index, losses = self._ohm_element_losses(
+            sr.superelements, "time")
+        return self.nc_model.scale_factor()*np.sum(losses)
 
     def ohm_lossenergy_subregion(self, srname, start=0.0, end=0.0):
         '''Ohmic loss energy of a subregion
@@ -254,7 +739,7 @@ class Losses(object):
         If start and end are not specified, the time window of the
         previous calculation is used.
         '''
-        data_list = ['time [s]', 'curd']
+        data_list = ['time [s]']
         self.vtu_data.read_data(data_list)
 
         if start != 0.0 or end != 0.0:
@@ -314,7 +799,7 @@ class Losses(object):
         previous calculation is used.
         '''
 
-        data_list = ['time [s]', 'curd']
+        data_list = ['time [s]']
         self.vtu_data.read_data(data_list)
 
         if start != 0.0 or end != 0.0:
@@ -322,9 +807,10 @@ class Losses(object):
 
         self.times = TimeRange(self.vtu_data, self.nc_model)
 
+        srlosses = self._ohm_sr_losses("time")
         loss_data = []
         for sr in self.nc_model.subregions:
-            srlossenergy = self.ohm_lossenergy_sr(sr)
+            srlossenergy = srlosses[sr.key]
 
             srname = sr.name
             if sr.wb_key >= 0:
@@ -358,7 +844,7 @@ class Losses(object):
         previous calculation is used.
         '''
 
-        data_list = ['time [s]', 'curd']
+        data_list = ['time [s]']
         self.vtu_data.read_data(data_list)
 
         if start != 0.0 or end != 0.0:
@@ -368,10 +854,10 @@ class Losses(object):
         #self.time_vector = self.vtu_data.get_data_vector('time [s]')
         time = self.times.vector[-1]-self.times.vector[0]
 
+        srlosses = self._ohm_sr_losses("time")
         loss_data = []
         for sr in self.nc_model.subregions:
-            srlossenergy = self.ohm_lossenergy_sr(sr)
-            srpowerlosses = srlossenergy / time
+            srpowerlosses = srlosses[sr.key] / time
 
             srname = sr.name
             if sr.wb_key >= 0:
@@ -439,19 +925,9 @@ class Losses(object):
         A FFT from the current density is made.
         The power losses of each harmonic is determined and added.
         '''
-        scale_factor = self.nc_model.scale_factor()
-
-        srpowerlosses = 0.0
-        for se in sr.superelements:
-            sepowerlosses = 0.0
-            if se.conduc > 0.0:
-                for el in se.elements:
-                    elpowerlosses = self.ohm_powerlosses_fft_el(el, se)
-                    sepowerlosses = sepowerlosses + elpowerlosses * scale_factor
-
-            srpowerlosses = srpowerlosses + sepowerlosses
-
-        return srpowerlosses
+        ses, counts, index, losses = self._ohm_element_losses(
+            sr.superelements, "fft")
+        return self.nc_model.scale_factor()*np.sum(losses)
 
     def ohm_powerlosses_fft_subregion(self, srname, start=0.0, end=0.0):
         '''Power dissipation of a subregion
@@ -475,7 +951,7 @@ class Losses(object):
         If start and end are not specified, the time window of the
         previous calculation is used.
         '''
-        data_list = ['time [s]', 'curd']
+        data_list = ['time [s]']
         self.vtu_data.read_data(data_list)
 
         if start != 0.0 or end != 0.0:
@@ -508,7 +984,7 @@ class Losses(object):
         previous calculation is used.
         '''
 
-        data_list = ['time [s]', 'curd']
+        data_list = ['time [s]']
         self.vtu_data.read_data(data_list)
 
         if start != 0.0 or end != 0.0:
@@ -516,9 +992,10 @@ class Losses(object):
 
         self.times = TimeRange(self.vtu_data, self.nc_model)
 
+        srlosses = self._ohm_sr_losses("fft")
         loss_data = []
         for sr in self.nc_model.subregions:
-            srpowerlosses = self.ohm_powerlosses_fft_sr(sr)
+            srpowerlosses = srlosses[sr.key]
 
             srname = sr.name
             if sr.wb_key >= 0:
@@ -701,27 +1178,7 @@ class Losses(object):
         represent also the whole machine.
         '''
 
-        scale_factor = self.nc_model.scale_factor()
-
-        sehystlosses = 0.0
-        seeddylosses = 0.0
-        seexcelosses = 0.0
-        if (se.elements[0].reluc[0] < 1.0 or se.elements[0].reluc[1] < 1.0) and \
-                (se.elements[0].mag[0] == 0.0 and se.elements[0].mag[1] == 0.0):
-            for el in se.elements:
-                ellosses = self.iron_losses_fft_el(el, se)
-                sehystlosses = sehystlosses + \
-                    ellosses['hysteresis'] * scale_factor
-                seeddylosses = seeddylosses + \
-                    ellosses['eddycurrent'] * scale_factor
-                seexcelosses = seexcelosses + ellosses['excess'] * scale_factor
-
-        setotallosses = sehystlosses + seeddylosses + seexcelosses
-
-        return {'total': setotallosses,
-                'hysteresis': sehystlosses,
-                'eddycurrent': seeddylosses,
-                'excess': seexcelosses}
+        return self._iron_se_losses([se], "fft")[se.key]
 
     def iron_losses_fft_subregion(self, srname, start=0.0, end=0.0):
         '''Iron losses of a subregion
@@ -745,8 +1202,6 @@ class Losses(object):
         if start != 0.0 or end != 0.0:
             self.vtu_data.set_time_window(start, end)
 
-        data_list = ['b']
-        self.vtu_data.read_data(data_list)
         self.times = TimeRange(self.vtu_data, self.nc_model)
 
         srtotallosses = 0.0
@@ -754,8 +1209,9 @@ class Losses(object):
         sreddylosses = 0.0
         srexcelosses = 0.0
         sr = self.nc_model.get_subregion(srname)
+        losses = self._iron_se_losses(sr.superelements, "fft")
         for se in sr.superelements:
-            selosses = self.iron_losses_fft_se(se)
+            selosses = losses[se.key]
             srtotallosses = srtotallosses + selosses['total']
             srhystlosses = srhystlosses + selosses['hysteresis']
             sreddylosses = sreddylosses + selosses['eddycurrent']
@@ -790,14 +1246,13 @@ class Losses(object):
         if start != 0.0 or end != 0.0:
             self.vtu_data.set_time_window(start, end)
 
-        data_list = ['b']
-        self.vtu_data.read_data(data_list)
         self.times = TimeRange(self.vtu_data, self.nc_model)
 
+        losses = self._iron_se_losses(self.nc_model.superelements, "fft")
         losseslist = []
 
         for se in self.nc_model.superelements:
-            selosses = self.iron_losses_fft_se(se)
+            selosses = losses[se.key]
 
             if se.subregion:
                 for sr in self.nc_model.subregions:
@@ -1023,27 +1478,7 @@ class Losses(object):
         represent also the whole machine.
         '''
 
-        scale_factor = self.nc_model.scale_factor()
-
-        sehystenergy = 0.0
-        seeddyenergy = 0.0
-        seexceenergy = 0.0
-        if (se.elements[0].reluc[0] < 1.0 or se.elements[0].reluc[1] < 1.0) and \
-                (se.elements[0].mag[0] == 0.0 and se.elements[0].mag[1] == 0.0):
-            for el in se.elements:
-                elenergy = self.iron_lossenergy_time_el(el, se)
-                sehystenergy = sehystenergy + \
-                    elenergy['hysteresis'] * scale_factor
-                seeddyenergy = seeddyenergy + \
-                    elenergy['eddycurrent'] * scale_factor
-                seexceenergy = seexceenergy + elenergy['excess'] * scale_factor
-
-        setotalenergy = sehystenergy + seeddyenergy + seexceenergy
-
-        return {'total': setotalenergy,
-                'hysteresis': sehystenergy,
-                'eddycurrent': seeddyenergy,
-                'excess': seexceenergy}
+        return self._iron_se_losses([se], "time")[se.key]
 
     def iron_lossenergy_time_subregion(self, srname, start=0.0, end=0.0):
         '''Iron loss energy of a subregion
@@ -1067,8 +1502,6 @@ class Losses(object):
         if start != 0.0 or end != 0.0:
             self.vtu_data.set_time_window(start, end)
 
-        data_list = ['b']
-        self.vtu_data.read_data(data_list)
         self.times = TimeRange(self.vtu_data, self.nc_model)
 
         srtotalenergy = 0.0
@@ -1076,8 +1509,9 @@ class Losses(object):
         sreddyenergy = 0.0
         srexceenergy = 0.0
         sr = self.nc_model.get_subregion(srname)
+        energies = self._iron_se_losses(sr.superelements, "time")
         for se in sr.superelements:
-            seenergy = self.iron_lossenergy_time_se(se)
+            seenergy = energies[se.key]
             srtotalenergy = srtotalenergy + seenergy['total']
             srhystenergy = srhystenergy + seenergy['hysteresis']
             sreddyenergy = sreddyenergy + seenergy['eddycurrent']
@@ -1145,14 +1579,13 @@ class Losses(object):
         if start != 0.0 or end != 0.0:
             self.vtu_data.set_time_window(start, end)
 
-        data_list = ['b']
-        self.vtu_data.read_data(data_list)
         self.times = TimeRange(self.vtu_data, self.nc_model)
 
+        energies = self._iron_se_losses(self.nc_model.superelements, "time")
         energylist = []
 
         for se in self.nc_model.superelements:
-            selossenergy = self.iron_lossenergy_time_se(se)
+            selossenergy = energies[se.key]
 
             if se.subregion:
                 for sr in self.nc_model.subregions:
@@ -1239,6 +1672,7 @@ class Losses(object):
         '''
 
         import vtk
+        from vtkmodules.util.numpy_support import numpy_to_vtk
 
         if start != 0.0 or end != 0.0:
             self.vtu_data.set_time_window(start, end)
@@ -1279,35 +1713,19 @@ class Losses(object):
         dest_grid.SetCells(cell_types, cells)
 
         # insert cell values
-        cell_data = vtk.vtkDoubleArray()
-        cell_data.SetNumberOfComponents(1)
+        lossdensity = np.zeros(num_cells)
+        areas = self.nc_model.element_areas()
+        for element_losses in (self._ohm_element_losses,
+                               self._iron_element_losses):
+            ses, counts, index, losses = element_losses(
+                self.nc_model.superelements, methode)
+            if losses.ndim > 1:
+                losses = np.sum(losses, axis=0)
+            lossdensity[index] += losses / (areas[index] * length)
+        if methode == "time":
+            lossdensity /= time
+        cell_data = numpy_to_vtk(lossdensity, deep=True)
         cell_data.SetName("lossdensity [W/m3]")
-        cell_data.SetNumberOfValues(num_cells)
-
-        for se in self.nc_model.superelements:
-            for el in se.elements:
-                ellossdensity = 0
-                if se.conduc > 0.0:
-                    if methode == "time":
-                        ellossenergy = self.ohm_lossenergy_el(el, se)
-                        ellossdensity = ellossenergy / \
-                            (time * el.area * length)
-                    else:
-                        ellosses = self.ohm_powerlosses_fft_el(el, se)
-                        ellossdensity = ellosses / (el.area * length)
-
-                if (se.elements[0].reluc[0] < 1.0 or se.elements[0].reluc[1] < 1.0) and \
-                   (se.elements[0].mag[0] == 0.0 and se.elements[0].mag[1] == 0.0):
-                    if methode == "time":
-                        ellossenergy = self.iron_lossenergy_time_el(el, se)
-                        ellossdensity = ellossdensity + \
-                            ellossenergy['total'] / (time * el.area * length)
-                    else:
-                        ellosses = self.iron_losses_fft_el(el, se)
-                        ellossdensity = ellossdensity + \
-                            ellosses['total'] / (el.area * length)
-
-                cell_data.InsertValue(el.key-1, ellossdensity)
 
         dest_grid.GetCellData().AddArray(cell_data)
 
@@ -3,6 +3,9 @@
 """
 import logging
 import pathlib
+import hashlib
+import os
+import re
 import numpy as np
 import vtk
 from vtkmodules.util.numpy_support import vtk_to_numpy
@@ -13,11 +16,20 @@ class Reader(object):
 
         Args:
           pathname : str Directory of result files (vtu-files) or a single vtu file
+          use_cache : bool load point and cell data of all time steps
+            into one array (time x points/cells x components) and serve
+            the point and cell vectors as views of it
+          persist : bool store the cached arrays as npy files in the
+            subdirectory vtu-cache of the result files and map them
+            on subsequent reads (implies use_cache)
 
     '''
 
-    def __init__(self, pathname):
+    def __init__(self, pathname, use_cache=False, persist=False):
         self.data = {}
+        self.tensors = {}
+        self.use_cache = use_cache or persist
+        self.persist = persist
 
         self.reader = vtk.vtkXMLUnstructuredGridReader()
         self.output = self.reader.GetOutput()
@@ -64,6 +76,15 @@ class Reader(object):
           data_list : fist of str List of values to extract from vtu_files
 
         '''
+        if self.use_cache:
+            tensor_names = [d for d in data_list
+                            if d not in self.field_data_names]
+            self.read_tensors(tensor_names)
+            data_list = [d for d in data_list
+                         if d in self.field_data_names]
+            if not data_list:
+                return "done"
+
         for data_name in data_list:
             if data_name in self.field_data_names:
                 self.data[data_name] = []
@@ -91,6 +112,88 @@ class Reader(object):
 
         return "done"
 
+    def _cache_file(self, data_name):
+        '''return the npy file of a cached array, its name depends on the
+        names, sizes and modification times of the vtu files'''
+        h = hashlib.sha1()
+        for f in self.filenames:
+            st = f.stat()
+            h.update(f"{f.name}:{st.st_size}:{st.st_mtime_ns};".encode())
+        name = re.sub(r'[^0-9A-Za-z_.-]+', '_', data_name).strip('_')
+        return (self.filenames[0].parent / 'vtu-cache' /
+                f"{name}-{h.hexdigest()[:16]}.npy")
+
+    def read_tensors(self, data_list):
+        '''Load point or cell data of all vtu files
+
+        Args:
+          data_list : list of str Names of point or cell data
+
+        The arrays of shape (time, points or cells, components) are
+        stored in tensors, with persist they are loaded from
+        or saved to npy files.
+        '''
+        names = []
+        for data_name in data_list:
+            if data_name in self.tensors:
+                continue
+            if (data_name not in self.point_data_names and
+                    data_name not in self.cell_data_names):
+                raise Exception('unknown data name "' + data_name+'"')
+            if self.persist:
+                cachefile = self._cache_file(data_name)
+                if cachefile.exists():
+                    self.tensors[data_name] = np.load(cachefile,
+                                                      mmap_mode='r')
+                    continue
+            names.append(data_name)
+        if not names:
+            return
+
+        tensors = {}
+        for i, filename in enumerate(self.filenames):
+            self.reader.SetFileName(str(filename))
+            self.reader.Update()
+            for data_name in names:
+                if data_name in self.point_data_names:
+                    a = self.output.GetPointData().GetAbstractArray(data_name)
+                else:
+                    a = self.output.GetCellData().GetAbstractArray(data_name)
+                a = vtk_to_numpy(a).reshape(a.GetNumberOfTuples(), -1)
+                if data_name not in tensors:
+                    tensors[data_name] = np.empty(
+                        (len(self.filenames),) + a.shape, dtype=a.dtype)
+                tensors[data_name][i] = a
+
+        for data_name in names:
+            if self.persist:
+                cachefile = self._cache_file(data_name)
+                cachefile.parent.mkdir(exist_ok=True)
+                tmpfile = cachefile.with_suffix(f'.{os.getpid()}.tmp')
+                with open(tmpfile, 'wb') as fp:
+                    np.save(fp, tensors[data_name])
+                os.replace(tmpfile, cachefile)
+                logging.debug("saved %s", cachefile)
+            self.tensors[data_name] = tensors[data_name]
+
+    def get_tensor(self, data_name):
+        '''Read point or cell data of all vtu files
+
+        Args:
+          data_name : str Name of point or cell data
+
+        Returns:
+          array of shape (time, points or cells, components)
+        '''
+        if data_name not in self.tensors:
+            self.read_tensors([data_name])
+        return self.tensors[data_name]
+
+    def time_slice(self, n):
+        """return the slice of the time window (set_time_window)
+        of n time steps"""
+        return slice(self.istart or 0, self.iend or n)
+
     def set_time_window(self, start, end):
         '''Set time window
 
@@ -168,6 +271,11 @@ class Reader(object):
           List of point values within the time window
 
         '''
+        if self.use_cache:
+            t = self.get_tensor(pnt_data)
+            return t.reshape(t.shape[0], -1)[self.time_slice(t.shape[0]),
+                                             pnt-1]
+
         if pnt_data not in self.data:
             self.read_data([pnt_data])
 
@@ -196,6 +304,13 @@ class Reader(object):
             List of cell values within the time window
 
         '''
+        if self.use_cache and cell > 0:
+            t = self.get_tensor(cell_data)
+            tslice = self.time_slice(t.shape[0])
+            if t.shape[2] == 1:
+                return t[tslice, cell-1, 0]
+            return t[tslice, cell-1, :3].T
+
         if cell_data not in self.data:
             self.read_data([cell_data])
 
@@ -316,11 +431,13 @@ class Reader(object):
         return '\n'.join(fmt)
 
 
-def read(filename) -> Reader:
+def read(filename, use_cache=False, persist=False) -> Reader:
     """
     Read vtu file and return Reader object.
 
     Args:
         filename: name of vtu file to be read
+        use_cache: load point and cell data of all time steps into arrays
+        persist: store the arrays in npy files next to the vtu files
     """
-    return Reader(filename)
+    return Reader(filename, use_cache=use_cache, persist=persist)
@@ -19,6 +19,25 @@ class BchReaderTest(unittest.TestCase):
             r.read(f)
         return r
 
+    def test_pickle(self):
+        import pickle
+        bch = self.read_bch('ldq-losses.BATCH')
+        r = pickle.loads(pickle.dumps(bch))
+        self.assertEqual(r.ldq['losses'], bch.ldq['losses'])
+        self.assertEqual(r.machine, bch.machine)
+        self.assertTrue(r.dispatch)
+
+    def test_read_keys(self):
+        bch = self.read_bch('ldq-losses.BATCH')
+        testPath = os.path.join(os.path.split(__file__)[0], 'data')
+        r = femagtools.bch.read(os.path.join(testPath, 'ldq-losses.BATCH'),
+                                keys=['ldq'])
+        self.assertEqual(r.ldq, bch.ldq)
+        self.assertEqual(r.type, bch.type)
+        self.assertFalse(r.airgapInduction)
+        self.assertFalse(r.flux)
+        self.assertTrue(bch.flux)
+
     def test_read_cogging(self):
         bch = self.read_bch('cogging.BATCH')
         self.assertEqual(bch.version, '7.9.147 November 2012')
@@ -183,3 +183,49 @@ def test_jmag_to_msh(tmpdir):
     convert.to_msh("src/tests/data/convert/Designer.jplot", mshfile)
     with open(mshfile) as f:
         assert len(f.readlines()) == 8317
+
+
+def test_msh_binary(tmpdir):
+    from femagtools import nc
+    isa = nc.read("src/tests/data/zzz_pm_model_ts.nc")
+    msh = str(tmpdir.join("pm.msh"))
+    convert.to_msh(isa, msh, binary=True)
+
+    m = meshio.read(msh)
+    assert len(m.points) == 5652
+    assert len(m.point_data["potential"]) == len(m.points)
+    numcells = {}
+    for c in m.cells:
+        numcells[c.type] = numcells.get(c.type, 0) + len(c.data)
+    assert numcells == {'line': 646, 'triangle': 10654, 'quad': 180}
+
+
+def test_vtu_binary(tmpdir):
+    import numpy as np
+    from femagtools import nc
+    isa = nc.read("src/tests/data/zzz_pm_model_ts.nc")
+    vtu = str(tmpdir.join("pm.vtu"))
+    convert.to_vtu(isa, vtu, binary=True)
+
+    with open(vtu, 'rb') as f:
+        head, data = f.read().split(
+            b'<AppendedData encoding="raw">\n_', 1)
+    root = ET.fromstring(head + b'</VTKFile>')
+    assert root.get('header_type') == 'UInt64'
+    piece = root[0][0]
+    assert piece.get('NumberOfPoints') == '5652'
+    assert piece.get('NumberOfCells') == '11480'
+    arrays = {}
+    for da in root.iter('DataArray'):
+        offset = int(da.get('offset'))
+        nbytes = int(np.frombuffer(data[offset:offset+8], '<u8')[0])
+        arrays[da.get('Name')] = np.frombuffer(
+            data[offset+8:offset+8+nbytes],
+            dict(Float32='<f4', Float64='<f8', Int64='<i8',
+                 UInt8='u1')[da.get('type')])
+    assert arrays['Points'].shape == (3*5652,)
+    assert arrays['potential'].shape == (5652,)
+    assert arrays['potential'].dtype == np.float32
+    assert arrays['types'].tolist().count(9) == 180
+    assert arrays['offsets'][-1] == len(arrays['connectivity'])
+    assert arrays['b'].shape == (3*11480,)
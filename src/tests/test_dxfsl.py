@@ -10,3 +10,128 @@ def test_convert():
     totnumsl = [l for l in r['fsl'] if l.startswith('m.tot_num_slot')]
     assert len(totnumsl) == 1
     assert totnumsl[0].split()[-1] == '12'
+
+
+def test_intersect_and_split():
+    from femagtools.dxfsl.geom import intersect_and_split
+    from femagtools.dxfsl.shape import Element, Line
+    elements = [Line(Element(start=(0, 0), end=(2, 2))),
+                Line(Element(start=(0, 2), end=(2, 0))),
+                Line(Element(start=(10, 0), end=(12, 0))),
+                Line(Element(start=(11, -1), end=(11, 1))),
+                Line(Element(start=(20, 0), end=(22, 0)))]
+    out = [e for e in intersect_and_split(elements, 1e-3, 5e-3) if e]
+    lines = [(tuple(e.p1), tuple(e.p2)) for e in out]
+    assert len(lines) == 9
+    assert ((10, 0), (11.0, 0.0)) in lines
+    assert ((0, 0), (1.0, 1.0)) in lines
+    assert ((20, 0), (22, 0)) in lines
+
+
+def test_find_nodes():
+    import random
+    from femagtools.dxfsl.geom import Geometry
+    from femagtools.dxfsl.shape import Element, Line
+    random.seed(4)
+    points = [(round(random.uniform(0, 5), 3), round(random.uniform(0, 5), 3))
+              for i in range(200)]
+    geom = Geometry([Line(Element(start=p1, end=p2))
+                     for p1, p2 in zip(points[::2], points[1::2])],
+                    rtol=1e-3, atol=0.05)
+    queries = points + [(p[0] + 0.02, p[1] - 0.01) for p in points]
+    nodes = list(geom.g)  # brute force search
+    for p in queries:
+        assert geom.find_nodes(p) == geom.find_nodes(p, g=nodes)
+        assert geom.find_node(p) == geom.find_node(p, g=nodes)
+        assert geom.find_the_node(p) == geom.find_the_node(p, g=nodes)
+
+    n = geom.find_the_node(points[0])
+    geom.g.remove_node(n)
+    assert geom.find_the_node(points[0]) != n
+    geom.add_edge((10.0, 10.0), (11.0, 10.0), Line(
+        Element(start=(10.0, 10.0), end=(11.0, 10.0))))
+    assert geom.find_nodes((10.01, 10.0)) == [(10.0, 10.0)]
+
+
+def test_convert_batch(tmp_path):
+    import json
+    import shutil
+    from femagtools.dxfsl.batch import convert_batch
+    indir = tmp_path / 'in'
+    indir.mkdir()
+    shutil.copy(pathlib.Path(__file__).parent / 'data' / 'IPM-130-4.dxf',
+                indir)
+    (indir / 'broken.dxf').write_text('no dxf')
+    (indir / 'notes.txt').write_text('ignored')
+    outdir = tmp_path / 'out'
+
+    r = convert_batch(indir, outdir, num_proc=2)
+    assert r['status'] == dict(ok=1, skipped=0, error=1, timeout=0)
+    ok = [f for f in r['files'] if f['status'] == 'ok'][0]
+    assert ok['params']['num_poles'] == 4
+    assert set(ok['timings']) >= {'hash', 'convert', 'write', 'total',
+                                  'parse', 'fsl'}
+    assert ok['profile']['stages'][0]['elements'] > 0
+    assert (outdir / 'IPM-130-4.fsl').exists()
+    assert json.loads((outdir / 'summary.json').read_text())['status'] == \
+        r['status']
+
+    r = convert_batch(indir, outdir, num_proc=2)
+    assert r['status'] == dict(ok=0, skipped=1, error=1, timeout=0)
+
+    r = convert_batch([str(indir / 'IPM-130-4.dxf')], outdir,
+                      timeout=0.01, force=True)
+    assert r['status']['timeout'] == 1
+
+
+def test_convert_profile(tmp_path):
+    import json
+    p = pathlib.Path(__file__).parent / 'data' / 'IPM-130-4.dxf'
+    trace = tmp_path / 'trace.json'
+    r = convert(str(p), trace_file=str(trace))
+    stages = [s['name'] for s in r['profile']['stages']]
+    assert stages[0] == 'parse'
+    assert stages[-1] == 'fsl'
+    assert r['profile']['stages'][0]['nodes'] > 0
+    assert r['profile']['totals']['create_list_of_areas']['calls'] > 0
+    events = json.loads(trace.read_text())['traceEvents']
+    assert [e['name'] for e in events if e['tid'] == 0] == stages
+
+
+def test_convert_error_closes_profiler(tmp_path):
+    import tracemalloc
+    import pytest
+    from femagtools.dxfsl.functions import Profiler
+    p = tmp_path / 'machine.txt'  # unsupported format
+    p.write_text('')
+    with pytest.raises(NameError):
+        convert(str(p), trace_memory=True)
+    assert Profiler.get_current() is None
+    assert not tracemalloc.is_tracing()
+
+
+def test_profiler_threads():
+    import threading
+    import time
+    from femagtools.dxfsl.functions import Profiler
+    main = Profiler()
+    profiles = []
+
+    def run(name):
+        p = Profiler()
+        p.start(name)
+        Profiler.record(name, time.perf_counter())
+        p.stop()
+        profiles.append(p.done(dict())['profile'])
+
+    threads = [threading.Thread(target=run, args=(n,))
+               for n in ('a', 'b')]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert Profiler.get_current() is main
+    assert main.events == []
+    assert sorted([list(p['totals']) for p in profiles]) == [['a'], ['b']]
+    main.close()
+    assert Profiler.get_current() is None
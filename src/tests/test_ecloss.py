@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from femagtools import ecloss
+
+
+def magnloss(is_x, segx, segz):
+    m = ecloss.MagnLoss.__new__(ecloss.MagnLoss)
+    m.mur = 1.05
+    m.sigma = 625000
+    m.lm = 0.02
+    m.ls = 0.1
+    m.numpoles = 8
+    m.segx = segx
+    m.segz = segz
+    m.is_x = is_x
+    m.tgrid = 0.0025
+    return m
+
+
+@pytest.fixture
+def bfft():
+    rng = np.random.default_rng(1)
+    shape = (4, 6, 9)
+    return 0.1*rng.random(shape), 0.2*rng.random(shape)
+
+
+@pytest.mark.parametrize("is_x, segx, segz, expected", [
+    (False, [1], [1], 4412.755500172318),
+    (True, [1, 2, 4], [1, 3], 13242.928407583597)])
+def test_loss(bfft, is_x, segx, segz, expected):
+    m = magnloss(is_x, segx, segz)
+    bx_fft, by_fft = bfft
+    px_se = np.zeros_like(bx_fft)
+    py_se = np.zeros_like(by_fft)
+    loss = m.loss(bx_fft, by_fft, px_se, py_se, 0.015, 0.004)
+    assert loss == pytest.approx(expected, rel=1e-10)
+    assert np.all(py_se[1:] == 0)
+    assert np.any(py_se[0] > 0)
+
+
+def test_calc_pvpm_broadcast():
+    m = magnloss(False, [1], [1])
+    bamp = np.array([0.1, 0.05, 0.02])
+    f = np.array([1e-6, 400, 2000])
+    nu = np.array([1, 2, 3])
+    p = m.calc_pvpm(bamp, f, nu, 0.015, 0.004, 0)
+    assert p.shape == (3,)
+    for k in range(3):
+        assert p[k] == pytest.approx(
+            m.calc_pvpm(bamp[k], f[k], nu[k], 0.015, 0.004, 0), rel=1e-12)
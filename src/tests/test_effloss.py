@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 #
 import pytest
+import femagtools.machine
 import femagtools.machine.effloss
 
 
@@ -31,3 +32,84 @@ def test_imeffloss(impars):
          -10.8, -0.5, 0.4, 10.1,
          -8.0, -0.5, 0.4, 7.4,
          -6.4, -0.5, 0.4, 6.0], abs=1e-1)
+
+
+def test_pmeffloss_batch():
+    pm = femagtools.machine.PmRelMachineLdq(
+        3, 4, psim=0.11171972, ld=0.0014522728, lq=0.0038278836,
+        r1=0.0806)
+    nmax = 4000/60
+    T = 170
+    u1 = 340
+
+    r = femagtools.machine.effloss.efficiency_losses_map(
+        pm, u1, T, 0, nmax, npoints=(6, 6))
+    rb = femagtools.machine.effloss.efficiency_losses_map(
+        pm, u1, T, 0, nmax, npoints=(6, 6), with_batch=True)
+    assert rb['T'] == pytest.approx(r['T'])
+    assert rb['iq'] == pytest.approx(r['iq'], abs=1e-2)
+    assert rb['id'] == pytest.approx(r['id'], abs=1e-2)
+    assert rb['eta'] == pytest.approx(r['eta'], abs=1e-4)
+
+
+def test_pmeffloss_pool():
+    pm = femagtools.machine.PmRelMachineLdq(
+        3, 4, psim=0.11171972, ld=0.0014522728, lq=0.0038278836,
+        r1=0.0806)
+    nmax = 4000/60
+    T = 170
+    with femagtools.machine.effloss.OperatingPointPool(2, pm) as pool:
+        for u1 in (300, 340):
+            r = femagtools.machine.effloss.efficiency_losses_map(
+                pm, u1, T, 0, nmax, npoints=(4, 4))
+            rp = femagtools.machine.effloss.efficiency_losses_map(
+                pm, u1, T, 0, nmax, npoints=(4, 4), pool=pool)
+            assert rp['T'] == pytest.approx(r['T'])
+            assert rp['iq'] == pytest.approx(r['iq'])
+            assert rp['id'] == pytest.approx(r['id'])
+
+
+def test_pmeffloss_pool_progress():
+    class Progress:
+        def __init__(self):
+            self.calls = 0
+
+        def __call__(self, iqd):
+            self.calls += 1
+
+    pm = femagtools.machine.PmRelMachineLdq(
+        3, 4, psim=0.11171972, ld=0.0014522728, lq=0.0038278836,
+        r1=0.0806)
+    progress = Progress()
+    r = femagtools.machine.effloss.efficiency_losses_map(
+        pm, 340, 170, 0, 4000/60, npoints=(4, 4), num_proc=2,
+        progress=progress)
+    # conformity check and one call per sample
+    assert progress.calls == 1 + len(r['T'])
+
+
+def test_pmeffloss_pool_other_machine():
+    pm = femagtools.machine.PmRelMachineLdq(
+        3, 4, psim=0.11171972, ld=0.0014522728, lq=0.0038278836,
+        r1=0.0806)
+    other = femagtools.machine.PmRelMachineLdq(
+        3, 4, psim=0.1, ld=0.0014522728, lq=0.0038278836,
+        r1=0.0806)
+    with femagtools.machine.effloss.OperatingPointPool(1, pm) as pool:
+        with pytest.raises(ValueError):
+            femagtools.machine.effloss.efficiency_losses_map(
+                other, 340, 170, 0, 4000/60, npoints=(4, 4), pool=pool)
+
+
+def test_iqd_tmech_umax_multi():
+    import numpy as np
+    pm = femagtools.machine.PmRelMachineLdq(
+        3, 4, psim=0.11171972, ld=0.0014522728, lq=0.0038278836,
+        r1=0.0806)
+    ntmesh = np.array([[10, 20, 30], [50, 100, 150]])
+    with pytest.deprecated_call():
+        iqd = femagtools.machine.effloss.iqd_tmech_umax_multi(
+            2, ntmesh, pm, 340, True)
+    assert iqd.shape == (2, 3)
+    assert iqd[:, 1] == pytest.approx(
+        pm.iqd_tmech_umax(100, 2*np.pi*20*pm.p, 340)[:-1])
@@ -77,3 +77,43 @@ def test_run_script(monkeypatch, tmpdir):
 
     assert isinstance(r, femagtools.bch.Reader)
     assert tmpdir.join("femag.fsl").exists()
+
+
+def test_zmq_send_fsl_no_response(tmp_path):
+    import json
+    import time
+    import types
+    import zmq
+    rep = zmq.Context.instance().socket(zmq.REP)
+    port = rep.bind_to_random_port('tcp://127.0.0.1')
+    try:
+        femag = femagtools.femag.ZmqFemag(port, workdir=str(tmp_path))
+        tstart = time.monotonic()
+        status = json.loads(femag.send_fsl('x = 1', timeout=300)[0])
+        assert status['status'] == 'error'
+        assert time.monotonic() - tstart < 5
+        assert femag.request_socket is None
+
+        # femag process has terminated: no timeout required
+        femag.femagTask = types.SimpleNamespace(proc=object(), returncode=1)
+        status = json.loads(femag.change_case(str(tmp_path))[0])
+        assert status == {'status': 'error',
+                          'message': 'Femag is not running'}
+    finally:
+        rep.close(linger=0)
+
+
+def test_stage_magnetizing_curves(tmp_path):
+    import copy
+    import os
+    import femagtools.model
+    femag = femagtools.femag.Femag(str(tmp_path),
+                                   magnetizingCurves=mcv, magnets=magnetmat)
+    staged = {}
+    files = [femag.stage_magnetizing_curves(
+        femagtools.model.MachineModel(copy.deepcopy(machine)), staged)
+             for i in range(3)]
+    # written once
+    assert len(staged) == 1
+    assert files[0] and files[0] == files[1] == files[2]
+    assert all(os.path.isabs(f) and os.path.exists(f) for f in files[0])
@@ -508,6 +508,36 @@ class FslBuilderTest(unittest.TestCase):
         self.assertEqual(rlen[0].split('=')[-1].strip(),
                          str(100*magnetmat[0]['rlen']))
 
+    def test_render_cache(self):
+        self.m['magnet'] = dict(
+            magnetSector=dict(
+                magn_height=0.005,
+                magn_width_pct=0.8,
+                condshaft_r=0.0591,
+                magn_rfe=0.0,
+                magn_len=1.0,
+                magn_shape=0.0,
+                bridge_height=0.0,
+                bridge_width=0.0,
+                magn_ori=2,
+                magn_type=1,
+                magn_num=1))
+        self.m['inner_diam'] = 0.1
+        nocache = femagtools.fsl.Builder(render_cache_size=0)
+        for h in (0.005, 0.006, 0.005):
+            self.m['magnet']['magnetSector']['magn_height'] = h
+            fsl = [b.create_new_model(femagtools.MachineModel(self.m)) +
+                   b.create_magnet_model(femagtools.MachineModel(self.m))
+                   for b in (self.builder, nocache)]
+            self.assertEqual(fsl[0], fsl[1])
+        # new_model does not read the magnet parameters
+        self.assertEqual(
+            len([k for k in self.builder.render_cache
+                 if k[0] == 'new_model.mako']), 1)
+        self.assertEqual(
+            len([k for k in self.builder.render_cache
+                 if k[0] == 'magnetSector.mako']), 2)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -117,3 +117,214 @@ def test_windings(disp_stat):
     for sr in wd.subregions:
         assert type(sr) == isa7.SubRegion
     assert wd.num_turns == 100
+
+
+def test_next_block_mmap(tmp_path):
+    import struct
+    import numpy as np
+    fmt = "?hh4sf"
+    recs = [(1, 2, -3, b'Stat', 0.5), (0, 4, 5, b'Ro  ', -1.25)]
+    data = b''.join([struct.pack("=ihh4sf", *r) for r in recs])
+    ints = struct.pack("=3i", 7, 8, 9)
+    blocks = b''.join([struct.pack("=i", len(b)) + b + struct.pack("=i", len(b))
+                       for b in (data, ints)])
+    filename = tmp_path / 'blocks.bin'
+    filename.write_bytes(blocks)
+
+    expected = []
+    for use_mmap in (False, True):
+        r = isa7.Reader.__new__(isa7.Reader)
+        if use_mmap:
+            import mmap
+            with open(filename, 'rb') as f:
+                r.file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            r.file = blocks
+        r.use_mmap = use_mmap
+        r.pos = 0
+        values = r.next_block(fmt), r.next_block("i")
+        if not use_mmap:
+            expected = values
+            continue
+        assert r.pos == len(blocks)
+        for a, b in zip(values[0], expected[0]):
+            assert list(a) == b
+        assert values[0][0].dtype == bool
+        assert values[0][4].dtype == np.float32
+        assert values[1].tolist() == expected[1] == [7, 8, 9]
+        r.pos = len(data) + 8
+        assert r.next_values("i") == [7, 8, 9]
+        r.pos = len(data) + 8
+        assert type(r.next_values("i")[0]) is int
+        # no views of the mapping remain
+        r.file.close()
+        assert values[0][4].tolist() == expected[0][4]
+
+
+def _tolist(v):
+    if isinstance(v, (list, tuple)):
+        return [_tolist(x) for x in v]
+    try:
+        return v.tolist()
+    except AttributeError:
+        return v
+
+
+@pytest.mark.parametrize("filename", [
+    'src/tests/data/minimal.ISA7',
+    'src/tests/data/test_disp_stat.ISA7'])
+def test_read_mmap(filename):
+    import numpy as np
+    r = isa7.Reader(filename)
+    rm = isa7.Reader(filename, use_mmap=True)
+    for k, v in vars(r).items():
+        if k in ('file', 'use_mmap'):
+            continue
+        vm = getattr(rm, k)
+        assert _tolist(vm) == _tolist(v), k
+        if not isinstance(vm, (np.ndarray, list, tuple)):
+            assert type(vm) is type(v), k
+
+    isa = isa7.Isa7(r)
+    isam = isa7.Isa7(rm)
+    assert type(isam.arm_length) is type(isa.arm_length)
+    assert isam.arm_length == isa.arm_length
+    assert len(isam.elements) == len(isa.elements)
+    assert np.array_equal(isam.node_xy, isa.node_xy)
+    assert [[v.key for v in e.vertices] for e in isam.elements] == [
+        [v.key for v in e.vertices] for e in isa.elements]
+
+
+@pytest.fixture
+def mesh_reader():
+    """3 elements: 1 rectangle (outside), 2 triangles (inside/center)"""
+    import numpy as np
+    from types import SimpleNamespace
+    xy = [(1.0, 0.0), (2.0, 0.0), (2.0, 1.0), (1.0, 1.0),
+          (0.2, 0.1), (0.5, 0.1), (0.5, 0.4)]
+    r = SimpleNamespace()
+    r.POINT_ISA_POINT_REC_PT_CO_X = [0.0]
+    r.POINT_ISA_POINT_REC_PT_CO_Y = [1.0]
+    r.LINE_ISA_LINE_REC_LN_PNT_1 = [1]
+    r.LINE_ISA_LINE_REC_LN_PNT_2 = [1]
+    r.NODE_ISA_NODE_REC_ND_BND_CND = [0, 1, 0, 0, 0, 0, 0]
+    r.NODE_ISA_NODE_REC_ND_PER_NOD = [0]*7
+    r.NODE_ISA_NODE_REC_ND_CO_1 = [x for x, y in xy]
+    r.NODE_ISA_NODE_REC_ND_CO_2 = [y for x, y in xy]
+    r.NODE_ISA_ND_CO_RAD = [np.hypot(x, y) for x, y in xy]
+    r.NODE_ISA_ND_CO_PHI = [np.arctan2(y, x) for x, y in xy]
+    r.NODE_ISA_NODE_REC_ND_VP_RE = [0.1*i for i in range(7)]
+    r.NODE_ISA_NODE_REC_ND_VP_IM = [20.0]*7
+    r.NDCHN_ISA_NDCHN_REC_NC_NOD_1 = [1, 5]
+    r.NDCHN_ISA_NDCHN_REC_NC_NOD_2 = [2, 6]
+    r.NDCHN_ISA_NDCHN_REC_NC_NOD_MID = [0, 0]
+    # element 1: nodes 1,2,3,4; element 2: 5,6,7; element 3: 1,6,7
+    r.ELEM_ISA_EL_NOD_PNTR = [1, 5, 8]
+    r.ELE_NOD_ISA_ND_KEY = [1, 2, 3, 4, 5, 6, 7, 1, 6, 7]
+    r.ELE_NOD_ISA_NXT_ND_PNTR = [2, 3, 4, 0, 6, 7, 0, 9, 10, 0]
+    r.ELEM_ISA_ELEM_REC_EL_TYP = [2, 1, 1]
+    r.ELEM_ISA_ELEM_REC_EL_SE_KEY = [1, 2, 2]
+    r.ELEM_ISA_ELEM_REC_EL_RELUC = [1.0, 0.001, 1.0]
+    r.ELEM_ISA_ELEM_REC_EL_RELUC_2 = [1.0, 0.001, 1.0]
+    r.ELEM_ISA_ELEM_REC_EL_MAG_1 = [0.0, 0.0, 1.2]
+    r.ELEM_ISA_ELEM_REC_EL_MAG_2 = [0.0, 0.0, 0.0]
+    r.ELEM_ISA_ELEM_REC_LOSS_DENS = [0.0, 10.0]
+    r.BR_TEMP_COEF = -0.1
+    r.SUPEL_ISA_SE_NDCHN_PNTR = [1, 2]
+    r.SE_NDCHN_ISA_NC_KEY = [1, -2]
+    r.SE_NDCHN_ISA_NXT_NC_PNTR = [0, 0]
+    r.SUPEL_ISA_SE_EL_PNTR = [1, 2]
+    r.SE_EL_ISA_EL_KEY = [1, 2, 3]
+    r.SE_EL_ISA_NXT_EL_PNTR = [0, 3, 0]
+    for a, v in (('SR_KEY', 0), ('COL', 1), ('MCV_TYP', 0), ('COND_TYP', 0),
+                 ('CONDUC', 0.0), ('LENGHT', 1.0), ('VEL_SYS', 0),
+                 ('VELO_1', 0.0), ('VELO_2', 0.0), ('CURD_RE', 0.0),
+                 ('CURD_IM', 0.0)):
+        setattr(r, 'SUPEL_ISA_SUPEL_REC_SE_' + a, [v, v])
+    r.SR_ISA_SR_SE_PNTR = []
+    r.WB_ISA_WB_SR_PNTR = []
+    r.FC_RADIUS = 0.9
+    r.pos_el_fe_induction = []
+    r.el_fe_induction_1 = []
+    r.el_fe_induction_2 = []
+    r.eddy_cu_vpot = []
+    r.PS_FILFACTOR_CU = [0, 0]
+    r.PS_LENGTH_CU = [0, 0]
+    r.PS_SIGMA_CU = [0, 0]
+    return r
+
+
+@pytest.fixture
+def mesh(mesh_reader):
+    return isa7.Isa7(mesh_reader)
+
+
+def test_mesh_arrays(mesh):
+    assert mesh.element_nodes_ptr.tolist() == [0, 4, 7, 10]
+    assert mesh.element_nodes.tolist() == [0, 1, 2, 3, 4, 5, 6, 0, 5, 6]
+    assert mesh.element_type.tolist() == [2, 1, 1]
+    assert mesh.element_se_key.tolist() == [0, 1, 1]
+    assert mesh.element_reluc[1].tolist() == [0.001, 0.001]
+    assert mesh.node_xy.shape == (7, 2)
+    assert mesh.element_pos[0] == pytest.approx((1.5, 0.5))
+
+
+def test_lazy_elements(mesh):
+    assert mesh.elements.created() == []
+    el = mesh.elements[2]
+    assert mesh.elements[-1] is el
+    assert [v.key for v in el.vertices] == [1, 6, 7]
+    assert el.superelement is mesh.superelements[1]
+    assert el.is_magnet()
+    assert len(mesh.elements.created()) == 1
+    assert [e.key for e in mesh.superelements[1].elements] == [2, 3]
+    assert [e.key for e in mesh.airgap_outer_elements] == [1]
+    assert [e.key for e in mesh.airgap_inner_elements] == [2]
+    assert [e.key for e in mesh.airgap_center_elements] == [3]
+    assert mesh.nodes[0].outside and not mesh.nodes[4].outside
+    assert mesh.get_element(0.4, 0.2).key == 2
+
+
+def test_calc_iron_loss_batch(mesh_reader):
+    import numpy as np
+    r = mesh_reader
+    r.SUPEL_ISA_SUPEL_REC_SE_MCV_TYP = [0, 1]
+    r.SR_ISA_SR_SE_PNTR = [1]
+    r.SR_SE_ISA_SE_KEY = [2]
+    r.SR_SE_ISA_NXT_SE_PNTR = [0]
+    for a, v in (('TYP', 1), ('COL', 1), ('NAME', 'Stat'), ('NTURNS', 1),
+                 ('CUR_DIR', 1), ('WB_KEY', 0)):
+        setattr(r, 'SR_ISA_SR_REC_SR_' + a, [v])
+    isa = isa7.Isa7(r)
+    isa.pole_pairs = isa.poles_sim = 2
+    isa.speed = 3000
+    isa.arm_length = 0.1
+    isa.iron_loss_coefficients = [dict(
+        spec_weight=7.65, fillfactor=0.97, base_frequency=50,
+        base_induction=1.5, ch=2, cw=0.5, ce=0.1)]
+    isa.pos_el_fe_induction = np.linspace(0, np.pi, 91)
+    pos = isa.pos_el_fe_induction[None, :, None, None]
+    phi = np.arange(3*3*2).reshape(3, 1, 3, 2)
+    isa.el_fe_induction_1 = (np.cos(2*pos + phi) +
+                             0.2*np.cos(10*pos + phi))
+    isa.el_fe_induction_2 = np.sin(2*pos + phi) + 0.3*np.cos(6*pos)
+
+    pfe = isa.calc_iron_loss(None, None, isa7.bertotti_pfe)
+    assert np.shape(pfe['Stat']) == (3, 2, 3)
+    for icur in range(3):
+        for ibeta in range(2):
+            expected = isa.calc_iron_loss(icur, ibeta, isa7.bertotti_pfe)
+            assert pfe['Stat'][icur][ibeta] == pytest.approx(
+                expected['Stat'])
+            assert isa.calc_iron_loss(
+                icur, ibeta, isa7.bertotti_pfe,
+                with_batch=True)['Stat'] == pytest.approx(expected['Stat'])
+
+
+def test_get_element(mesh):
+    # nearest element center is that of element 2
+    assert mesh.get_element(0.52, 0.2).key == 3
+    assert mesh.get_super_element(0.52, 0.2) is mesh.superelements[1]
+    assert mesh.get_super_element(1.5, 0.5) is mesh.superelements[0]
+    assert [e.key for e in mesh.get_elements(
+        [(0.4, 0.2), (1.5, 0.5), (0.52, 0.2)])] == [2, 1, 3]
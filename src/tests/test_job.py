@@ -25,6 +25,34 @@ def test_condor():
         pass # no femag installed on ci server.
     
 
+def test_condor_as_completed(tmp_path, monkeypatch):
+    import json
+    import femagtools.condor
+    engine = femagtools.condor.Engine()
+    job = engine.create_job(str(tmp_path))
+    for i in range(2):
+        job.add_task()
+    engine.clusterId = '17'
+    polls = []
+
+    def check_output(cmd):
+        if cmd[0] == 'condor_q':
+            return b'[]'  # queue has drained
+        polls.append(cmd)
+        # task 1 appears in the history with delay
+        hist = [dict(ProcId=0, JobStatus=4)]
+        if len(polls) > 2:
+            hist.append(dict(ProcId=1, JobStatus=4))
+        return json.dumps(hist).encode()
+
+    monkeypatch.setattr(femagtools.condor.subprocess, 'check_output',
+                        check_output)
+    monkeypatch.setattr(femagtools.condor.time, 'sleep', lambda t: None)
+    tasks = list(engine.as_completed())
+    assert tasks == [job.tasks[0], job.tasks[1]]
+    assert [t.status for t in tasks] == ['C', 'C']
+
+
 def test_job():
     workdir = tempfile.mkdtemp()
     job = femagtools.job.Job(workdir)
@@ -35,3 +63,300 @@ def test_job():
         x = [l.strip().split('=') for l in f]
     d = {k: v for k, v in x}
     d['exit_on_end'] == 'True'
+
+
+def test_prepare_resets_results(tmp_path):
+    job = femagtools.job.Job(tmp_path)
+    task = job.add_task()
+    task.add_file('femag.fsl', ['exit_on_end=True'])
+    task.results = dict(p=2)  # parsed by a previous run
+    job.prepare()
+    assert task.results is None
+    assert 'error' in task.get_results()
+
+
+def test_multiproc_parse_results(tmp_path):
+    import sys
+    import pathlib
+    import shutil
+    import pytest
+    import femagtools.multiproc
+    if sys.platform == 'win32':
+        pytest.skip("needs a shell script")
+    bchfile = pathlib.Path(__file__).parent / 'data' / 'pmsim.BATCH'
+    cmd = tmp_path / 'femag'
+    cmd.write_text(f"#!/bin/sh\ncp {bchfile} result_001.BATCH\n")
+    cmd.chmod(0o755)
+    engine = femagtools.multiproc.Engine(cmd=str(cmd), process_count=2,
+                                         parse_results=True)
+    job = engine.create_job(tmp_path / 'work')
+    for i in range(3):
+        task = job.add_task()
+        task.add_file('femag.fsl', ['exit_on_end=True'])
+    engine.submit()
+    assert engine.join() == ['C', 'C', 'C']
+    for t in job.tasks:
+        assert t.results is not None
+        # results must not be read again
+        shutil.rmtree(t.directory)
+        assert t.get_results().machine['p'] == t.results.machine['p']
+
+
+def test_multiproc_persistent(tmp_path, monkeypatch):
+    import json
+    import types
+    import pathlib
+    import shutil
+    import femagtools.femag
+    import femagtools.multiproc
+    bchfile = pathlib.Path(__file__).parent / 'data' / 'pmsim.BATCH'
+    started = []
+    stopped = []
+
+    class Proc:
+        def poll(self):
+            return None
+
+    class ZmqFemag:
+        def __init__(self, port, workdir=''):
+            self.port = port
+            self.casedir = workdir
+            self.request_socket = None
+            self.femagTask = None
+
+        def run(self, options, restart=False):
+            started.append((self.cmd, self.port))
+            self.femagTask = types.SimpleNamespace(proc=Proc())
+            return len(started)
+
+        def change_case(self, dirname, timeout=None):
+            self.casedir = dirname
+            return ['{"status": "ok"}']
+
+        def send_fsl(self, fsl, timeout=None):
+            shutil.copy(bchfile, pathlib.Path(self.casedir) / 'result_001.BATCH')
+            return [json.dumps(dict(status='ok'))]
+
+        def quit(self):
+            stopped.append(self.port)
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(femagtools.femag, 'ZmqFemag', ZmqFemag)
+    with femagtools.multiproc.Engine(cmd='femag', process_count=2,
+                                     parse_results=True,
+                                     persistent=True) as engine:
+        job = engine.create_job(tmp_path / 'work')
+        for n in range(2):
+            job.cleanup()
+            for i in range(3):
+                task = job.add_task()
+                task.add_file('femag.fsl', ['exit_on_end=True'])
+            assert engine.submit() == 3
+            if n:
+                assert len(list(engine.as_completed())) == 3
+            assert engine.join() == ['C', 'C', 'C']
+            for t in job.tasks:
+                assert t.results.machine['p'] == 2
+        assert not stopped
+    assert sorted(stopped) == sorted(set(p for c, p in started))
+    assert engine.workers == []
+    # each femag process is started once only
+    assert len(started) == len(set(started))
+    assert set(started) <= {('femag', 5555), ('femag', 5558)}
+
+
+def test_multiproc_persistent_crash(tmp_path, monkeypatch):
+    import json
+    import types
+    import pathlib
+    import femagtools.femag
+    import femagtools.multiproc
+    started = []
+
+    class Proc:
+        returncode = None
+
+        def poll(self):
+            return self.returncode
+
+        def kill(self):
+            self.returncode = -9
+
+        def wait(self):
+            return self.returncode
+
+    class ZmqFemag:
+        def __init__(self, port, workdir=''):
+            self.port = port
+            self.request_socket = None
+            self.femagTask = None
+
+        def run(self, options, restart=False):
+            started.append(self.port)
+            if len(started) == 1:  # first start fails
+                return 0
+            self.femagTask = types.SimpleNamespace(proc=Proc())
+            self.request_socket = object()
+            return len(started)
+
+        def change_case(self, dirname, timeout=None):
+            self.casedir = pathlib.Path(dirname)
+            return ['{"status": "ok"}']
+
+        def send_fsl(self, fsl, timeout=None):
+            action = (self.casedir / 'action').read_text()
+            if action == 'ok':
+                return [json.dumps(dict(status='ok'))]
+            if action == 'crash':
+                self.femagTask.proc.returncode = -11
+                msg = 'Femag is not running'
+            else:  # no response
+                assert timeout == 2000
+                msg = f'no response within {timeout} ms'
+            self.request_socket = None
+            return [json.dumps(dict(status='error', message=msg))]
+
+        def stopFemag(self):
+            self.femagTask.proc.kill()
+            self.femagTask = None
+
+        def quit(self):
+            pass
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(femagtools.femag, 'ZmqFemag', ZmqFemag)
+    engine = femagtools.multiproc.Engine(cmd='femag', process_count=1,
+                                         persistent=True, timeout=2)
+    job = engine.create_job(tmp_path / 'work')
+    for action in ('ok', 'ok', 'crash', 'ok', 'hang', 'ok'):
+        task = job.add_task()
+        task.add_file('action', [action])
+        task.add_file('femag.fsl', ['exit_on_end=True'])
+    engine.submit()
+    assert engine.join() == ['X', 'C', 'X', 'C', 'X', 'C']
+    engine.close()
+    # failed start, start, restart after crash and no response
+    assert len(started) == 4
+
+
+def test_multiproc_as_completed(tmp_path):
+    import sys
+    import pytest
+    import femagtools.multiproc
+    if sys.platform == 'win32':
+        pytest.skip("needs a shell script")
+    cmd = tmp_path / 'femag'
+    cmd.write_text("#!/bin/sh\nsleep $(cat delay)\n")
+    cmd.chmod(0o755)
+    engine = femagtools.multiproc.Engine(cmd=str(cmd), process_count=2)
+    job = engine.create_job(tmp_path / 'work')
+    for delay in ('1.5', '0'):
+        task = job.add_task()
+        task.add_file('delay', [delay])
+        task.add_file('femag.fsl', ['exit_on_end=True'])
+    engine.submit()
+    tasks = list(engine.as_completed())
+    assert tasks == [job.tasks[1], job.tasks[0]]
+    assert [t.status for t in tasks] == ['C', 'C']
+    assert engine.join() == ['C', 'C']
+
+
+def test_result_cache(tmp_path):
+    cache = femagtools.job.ResultCache(tmp_path / 'cache', maxsize=100,
+                                       version='9.2')
+    job = femagtools.job.Job(tmp_path / 'work')
+    tasks = [job.add_task() for i in range(4)]
+    for t, fsl in zip(tasks, ['a=1', 'a=2', 'a=1', 'a=2']):
+        t.add_file('femag.fsl', [fsl])
+
+    for t in tasks[:2]:
+        assert not cache.get(t)
+        with open(os.path.join(t.directory, 'result_001.BCH'), 'w') as f:
+            f.write(60*'x')
+        t.status = 'C'
+        cache.put(t)
+    # LRU eviction: only the most recent entry fits
+    assert cache.stats() == dict(hits=0, misses=2, entries=1, size=60)
+
+    assert not cache.get(tasks[2])
+    assert cache.get(tasks[3])
+    assert tasks[3].status == 'C'
+    assert os.path.exists(os.path.join(tasks[3].directory, 'result_001.BCH'))
+    assert cache.stats()['hits'] == 1
+
+
+def test_result_journal(tmp_path):
+    import numpy as np
+    journal = femagtools.job.ResultJournal(tmp_path / 'journal.json')
+    assert journal.read() == []
+    journal.append(index=0, x=[1.0, 2.0], f=[np.float32(3.5)], status='C')
+    journal.append(index=1, x=np.array([1.0, 3.0]), f=[np.nan], status='X')
+    # interrupted write
+    with open(tmp_path / 'journal.json', 'a') as fp:
+        fp.write('{"index": 2, "x": [1.0')
+    assert len(journal.read()) == 2
+    assert journal.resume() == [
+        dict(index=0, x=[1.0, 2.0], f=[3.5], status='C')]
+    journal.append(index=2, x=[1.0, 4.0], f=[4.5], status='C')
+    assert [r['index'] for r in journal.resume()] == [0, 2]
+    journal.clear()
+    assert journal.read() == []
+
+
+def test_file_store(tmp_path):
+    mcv = tmp_path / 'M270.MCV'
+    mcv.write_bytes(1000*b'x')
+    model = tmp_path / 'model.nc'
+    model.write_bytes(100*b'y')
+    for symlink in (False, True):
+        store = femagtools.job.FileStore(tmp_path / f'store{symlink}',
+                                         symlink=symlink)
+        job = femagtools.job.Job(tmp_path / f'work{symlink}')
+        job.set_file_store(store)
+        for i in range(3):
+            task = job.add_task()
+            task.add_file(str(mcv))
+            task.add_file(str(model))
+        job.prepare()
+        for t in job.tasks:
+            linked = os.path.join(t.directory, 'M270.MCV')
+            copied = os.path.join(t.directory, 'model.nc')
+            assert open(linked, 'rb').read() == mcv.read_bytes()
+            assert os.path.islink(linked) == symlink
+            assert os.path.samefile(
+                linked, os.path.join(store.dirname, os.listdir(store.dirname)[0]))
+            assert not os.path.samefile(copied, model)
+        stats = store.stats()
+        assert stats['files'] == 1
+        assert stats['links'] == 3
+        assert stats['bytes_saved'] == 3000
+
+
+def test_file_store_duplicate(tmp_path):
+    import pathlib
+    mcv = tmp_path / 'M270.MCV'
+    mcv.write_bytes(1000*b'x')
+    store = femagtools.job.FileStore(tmp_path / 'store')
+    job = femagtools.job.Job(tmp_path / 'work')
+    job.set_file_store(store)
+    task = job.add_task()
+    task.add_file(str(mcv))
+    task.add_file(str(mcv))
+    assert len(task.links) == 1
+    # already linked
+    src, size, dest = store.add(str(mcv)) + (
+        os.path.join(task.directory, 'M270.MCV'),)
+    store.link(src, size, dest)
+    job.prepare()
+    assert store.stats()['links'] == 1
+    # other file: not overwritten
+    other = tmp_path / 'other.MCV'
+    other.write_bytes(10*b'y')
+    dest = os.path.join(task.directory, 'other.MCV')
+    pathlib.Path(dest).write_bytes(b'z')
+    store.link(*store.add(str(other)), dest)
+    assert pathlib.Path(dest).read_bytes() == b'z'
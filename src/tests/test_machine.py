@@ -4,6 +4,7 @@ import femagtools.bch
 import femagtools.machine
 import femagtools.windings
 import math
+import numpy as np
 import pathlib
 import pytest
 
@@ -266,6 +267,56 @@ def test_ldq_losses(data_dir):
     assert pm.betai1_plfe2(beta, i1, f1) == pytest.approx(51.2, rel=1e-1)
 
 
+def test_ldq_cached_splines():
+    beta = [-90.0, -60.0, -30.0, 0.0]
+    i1 = [0.0, 40.0, 80.0, 120.0, 160.0]
+    bx, ix = [x.T for x in np.meshgrid(beta, i1)]
+    ld = 1.4e-3 - 1e-6*ix + 1e-6*bx
+    lq = 3.8e-3 - 5e-6*ix
+    psim = 0.111 - 2e-5*ix
+    args = (3, 4, psim, ld, lq, 0.08, beta, i1)
+    pm = femagtools.machine.PmRelMachineLdq(*args)
+    pm0 = femagtools.machine.PmRelMachineLdq(*args, cache_splines=False)
+
+    iq = np.array([10.0, 50.0, 100.0, 150.0])
+    id = np.array([-5.0, -40.0, -60.0, -90.0])
+    psid, psiq = pm.psi(iq, id)
+    for k, (q, d) in enumerate(zip(iq, id)):
+        assert pm0.psi(q, d) == pytest.approx((psid[k], psiq[k]))
+    # out of range
+    psid, psiq = pm.psi(np.array([10.0, 10.0]), np.array([-5.0, 5.0]))
+    assert np.isnan(psid[1]) and np.isnan(psiq[1])
+    assert not np.isnan(psid[0])
+
+
+def test_char_continuation(data_dir):
+    bch = femagtools.bch.read(str(data_dir / 'ldq-losses.BATCH'))
+    pm = femagtools.machine.create(bch, r1=0.05, ls=1e-4)
+    T, nmax, u1 = 150, 100, 230
+    pm.reset_solver_stats()
+    r = pm.characteristics(T, nmax, u1, nsamples=30)
+    stats = dict(pm.solver_stats)
+    pm.reset_solver_stats()
+    rc = pm.characteristics(T, nmax, u1, nsamples=30,
+                            with_continuation=True)
+    assert pm.solver_stats['calls'] > 0
+    assert pm.solver_stats['nit'] < stats['nit']
+    assert pm.solver_stats['nfev'] < stats['nfev']
+    assert rc['n'] == pytest.approx(r['n'])
+    assert rc['T'] == pytest.approx(r['T'], abs=1e-3)
+    assert rc['i1'] == pytest.approx(r['i1'], abs=1e-3)
+
+
+def test_fsolve_warning(data_dir):
+    bch = femagtools.bch.read(str(data_dir / 'ldq-losses.BATCH'))
+    pm = femagtools.machine.create(bch, r1=0.05, ls=1e-4)
+    with pytest.warns(RuntimeWarning):
+        pm._fsolve(lambda x: x**2 + 1, 1.0)
+    x, info, ier, mesg = pm._fsolve(lambda x: x**2 + 1, 1.0,
+                                    full_output=True)
+    assert ier != 1
+
+
 def test_invpark():
     w1 = 314.15
     w1t = [w1*t/500.0 for t in range(6)]
@@ -5,6 +5,10 @@ import femagtools.grid
 import femagtools.parstudy
 import numpy as np
 import functools
+import json
+import pathlib
+import femagtools.job
+import femagtools.multiproc
 
 
 def test_create_parameter_range():
@@ -96,3 +100,207 @@ def test_lhs(decision_vars):
     n, d, r = parvar._get_names_and_range(decision_vars, N)
     assert [d['name'] for d in decision_vars] == n
     assert r.shape == (N, len(decision_vars))
+
+
+def test_result_cache_condor(tmpdir):
+    import femagtools.condor
+    study = femagtools.parstudy.Grid(str(tmpdir))
+    study.set_result_cache(femagtools.job.ResultCache(str(tmpdir / 'cache')))
+    with pytest.raises(ValueError):
+        study({'decision_vars': []}, {}, {}, femagtools.condor.Engine())
+
+
+machine = dict(
+    name="PM 130 L4",
+    outer_diam=0.13,
+    bore_diam=0.07,
+    inner_diam=0.015,
+    airgap=0.001,
+    lfe=0.1,
+    poles=4,
+    stator=dict(
+        num_slots=12,
+        num_slots_gen=3,
+        nodedist=1.5,
+        rlength=1.0),
+    windings=dict(
+        num_phases=3,
+        num_layers=1,
+        num_wires=4,
+        coil_span=3))
+
+simulation = dict(
+    calculationMode='pm_sym_fast',
+    speed=50.0,
+    current=10.0,
+    angl_i_up=0,
+    wind_temp=60.0,
+    magn_temp=60.0,
+    num_move_steps=49)
+
+opt = dict(
+    decision_vars=[{"name": "current", "bounds": [5, 15], "steps": 3,
+                    "label": "Current/A"}],
+    objective_vars=[{"name": "current", "label": "Current/A"}])
+
+
+def current_result(task):
+    """returns the current of task written by the femag stub"""
+    c = pathlib.Path(task.directory) / 'current.txt'
+    return dict(current=float(c.read_text()))
+
+
+@pytest.fixture
+def femag(tmp_path):
+    """femag stub: the smaller the current the longer it runs"""
+    cmd = tmp_path / 'femag'
+    cmd.write_text(
+        "#!/bin/sh\n"
+        "c=$(sed -n 's/^m.current *= *\\([0-9.]*\\)\\*.*/\\1/p' femag.fsl)\n"
+        "sleep $(awk \"BEGIN{print (20-$c)/50}\")\n"
+        "echo $c > current.txt\n"
+        f"echo $c >> {tmp_path / 'calls'}\n")
+    cmd.chmod(0o755)
+    return cmd
+
+
+def calls(femag):
+    c = femag.parent / 'calls'
+    if not c.exists():
+        return []
+    return [float(x) for x in c.read_text().split()]
+
+
+def run_study(study, femag, stream=False, population_size=3, **kwargs):
+    engine = femagtools.multiproc.Engine(cmd=str(femag), process_count=3)
+    return study(dict(opt, population_size=population_size),
+                 machine, dict(simulation), engine,
+                 stream=stream, **kwargs)
+
+
+@pytest.mark.parametrize("stream,population_size", [
+    (True, 3), (False, 3), (False, 2)])
+def test_sample_order(tmp_path, femag, stream, population_size):
+    (tmp_path / 'work').mkdir()
+    study = femagtools.parstudy.Grid(str(tmp_path / 'work'),
+                                     result_func=current_result)
+    r = run_study(study, femag, stream, population_size)
+    assert r['f'] == [(5.0, 10.0, 15.0)]
+    assert r['status'][-1] == 'C'
+    # tasks complete in reverse order of samples
+    if population_size == 3:
+        assert calls(femag) == [15.0, 10.0, 5.0]
+
+
+def test_cache_hits(tmp_path, femag):
+    (tmp_path / 'work').mkdir()
+    (tmp_path / 'cache').mkdir()
+    study = femagtools.parstudy.Grid(str(tmp_path / 'work'),
+                                     result_func=current_result)
+    study.set_result_cache(femagtools.job.ResultCache(tmp_path / 'cache'))
+    r = run_study(study, femag, stream=True)
+    assert len(calls(femag)) == 3
+    r = run_study(study, femag, stream=True)
+    assert len(calls(femag)) == 3
+    assert r['f'] == [(5.0, 10.0, 15.0)]
+
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_journal(tmp_path, femag, stream):
+    (tmp_path / 'work').mkdir()
+    study = femagtools.parstudy.Grid(str(tmp_path / 'work'),
+                                     result_func=current_result)
+    study.set_journal(tmp_path / 'journal')
+    run_study(study, femag, stream)
+    header, *records = study.journal.read()
+    assert header == {'samples': [[5.0], [10.0], [15.0]]}
+    # records are written as the tasks complete
+    assert [r['index'] for r in records] == [2, 1, 0]
+    for r in records:
+        assert r['status'] == 'C'
+        assert r['x'] == header['samples'][r['index']]
+        assert r['f'] == r['x']
+
+
+def test_resume(tmp_path, femag):
+    (tmp_path / 'work').mkdir()
+    opt = dict(decision_vars=[{"name": "current", "bounds": [5, 15]},
+                              {"name": "angl_i_up", "bounds": [-50, 0]}],
+               objective_vars=[{"name": "current"}])
+    study = femagtools.parstudy.LatinHypercube(str(tmp_path / 'work'),
+                                               result_func=current_result)
+    study.set_journal(tmp_path / 'journal')
+    engine = femagtools.multiproc.Engine(cmd=str(femag), process_count=3)
+    r = study(opt, machine, dict(simulation), engine, num_samples=3)
+    # interrupted after 2 samples
+    lines = (tmp_path / 'journal').read_text().splitlines(keepends=True)
+    (tmp_path / 'journal').write_text(''.join(lines[:3]) + '{"index"')
+    completed = [json.loads(x)['f'][0] for x in lines[1:3]]
+    (tmp_path / 'calls').unlink()
+
+    study = femagtools.parstudy.LatinHypercube(str(tmp_path / 'work'),
+                                               result_func=current_result)
+    study.set_journal(tmp_path / 'journal')
+    engine = femagtools.multiproc.Engine(cmd=str(femag), process_count=3)
+    r2 = study(opt, machine, dict(simulation), engine, num_samples=3,
+               resume=True)
+    assert r2['x'] == r['x']
+    assert r2['f'] == r['f']
+    assert len(calls(femag)) == 1
+    assert calls(femag)[0] not in completed
+    assert len(study.journal.read()) == 4
+
+
+@pytest.mark.parametrize("stream,population_size", [(True, 3), (False, 2)])
+def test_report_directories(tmp_path, femag, stream, population_size):
+    reads = []
+
+    def result(task):
+        reads.append(task.directory)
+        return current_result(task)
+
+    (tmp_path / 'work').mkdir()
+    (tmp_path / 'report').mkdir()
+    study = femagtools.parstudy.Grid(str(tmp_path / 'work'),
+                                     result_func=result)
+    study.set_report_directory(tmp_path / 'report')
+    run_study(study, femag, stream, population_size)
+    # results are read once, directories are named by sample index
+    assert len(reads) == 3
+    for k, c in enumerate(['5.0', '10.0', '15.0']):
+        assert (tmp_path / 'report' / str(k) /
+                'current.txt').read_text().strip() == c
+
+
+def test_resume_other_samples(tmp_path, femag):
+    (tmp_path / 'work').mkdir()
+    study = femagtools.parstudy.Grid(str(tmp_path / 'work'),
+                                     result_func=current_result)
+    study.set_journal(tmp_path / 'journal')
+    run_study(study, femag)
+    other = dict(opt, decision_vars=[
+        dict(opt['decision_vars'][0], bounds=[5, 20])])
+    engine = femagtools.multiproc.Engine(cmd=str(femag), process_count=3)
+    with pytest.raises(ValueError):
+        study(other, machine, dict(simulation), engine, resume=True)
+
+
+def test_error_result(tmp_path, femag):
+    def result(task):
+        r = current_result(task)
+        if r['current'] == 10.0:
+            return dict(error='failed')
+        return r
+
+    (tmp_path / 'work').mkdir()
+    (tmp_path / 'cache').mkdir()
+    study = femagtools.parstudy.Grid(str(tmp_path / 'work'),
+                                     result_func=result)
+    study.set_journal(tmp_path / 'journal')
+    cache = femagtools.job.ResultCache(tmp_path / 'cache')
+    study.set_result_cache(cache)
+    r = run_study(study, femag)
+    assert np.isnan(r['f'][0][1])
+    assert {x['index']: x['status'] for x in study.journal.read()[1:]} == {
+        0: 'C', 1: 'X', 2: 'C'}
+    assert len(cache.sizes) == 2
@@ -1140,3 +1140,8 @@ def test_sm(sm):
     iqdf = sm.iqd_torque(120)
 
     assert pytest.approx(iqdf, rel=0.1) == np.array([276.9, -26.5,   5.3])
+
+
+def test_sm_batch_without_mtpa(sm):
+    with pytest.raises(ValueError):
+        sm.iqd_tmech_umax_batch([100], [2*np.pi*50*3], 230, with_mtpa=False)
@@ -43,3 +43,53 @@ def test_read(losses):
         {'key': 5, 'name': '', 'losses': 0.101086}, abs=1e-5) == p[4]
     assert pytest.approx(
         {'key': 6, 'name': '', 'losses': 0.101086}, abs=1e-5) == p[5]
+
+
+def test_iron_losses(losses):
+    p = losses.iron_losses_fft()
+    assert [sr['subregion'] for sr in p] == ['stfe', 'rofe', 'wefe']
+    assert pytest.approx(
+        {'subregion': 'stfe', 'total': 13.231208, 'hysteresis': 7.416244,
+         'eddycurrent': 5.814964, 'excess': 0.0}, rel=1e-6) == p[0]
+    assert pytest.approx(
+        {'subregion': 'rofe', 'total': 0.257444, 'hysteresis': 0.0903994,
+         'eddycurrent': 0.167044, 'excess': 0.0}, rel=1e-5) == p[1]
+    e = losses.iron_lossenergy_time()
+    assert [sr['subregion'] for sr in e] == ['stfe', 'rofe', 'wefe']
+    assert pytest.approx(
+        {'subregion': 'stfe', 'total': 0.2238383, 'hysteresis': 0.1127929,
+         'eddycurrent': 0.1110453, 'excess': 0.0}, rel=1e-6) == e[0]
+    assert pytest.approx(
+        {'subregion': 'rofe', 'total': 0.00588291, 'hysteresis': 0.00289405,
+         'eddycurrent': 0.00298886, 'excess': 0.0}, rel=1e-5) == e[1]
+
+
+def test_iron_losses_el(losses):
+    losses.times = ts.TimeRange(losses.vtu_data, losses.nc_model)
+    scale_factor = losses.nc_model.scale_factor()
+    se = losses.nc_model.get_subregion('rofe').superelements[0]
+    for se_losses, el_losses in (
+            (losses.iron_losses_fft_se, losses.iron_losses_fft_el),
+            (losses.iron_lossenergy_time_se, losses.iron_lossenergy_time_el)):
+        expected = {k: 0.0 for k in ('total', 'hysteresis',
+                                     'eddycurrent', 'excess')}
+        for el in se.elements:
+            for k, v in el_losses(el, se).items():
+                expected[k] += v*scale_factor
+        assert pytest.approx(expected, rel=1e-10) == se_losses(se)
+
+
+def test_iron_losses_pool(losses):
+    losses.chunksize = 2000
+    expected = losses.iron_losses_fft()
+    with ts.Losses('src/tests/data/zzz_pm_model_ts',
+                   'src/tests/data/zzz_pm_model_ts_results_1',
+                   num_proc=2, chunksize=2000) as pool_losses:
+        assert expected == pool_losses.iron_losses_fft()
+        timing = pool_losses.chunk_timing
+        assert sum(t['size'] for t in timing) == sum(
+            t['size'] for t in losses.chunk_timing)
+        assert sorted(t['start'] for t in timing) == sorted(
+            t['start'] for t in losses.chunk_timing)
+        assert pool_losses._shared
+    assert not pool_losses._shared
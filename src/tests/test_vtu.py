@@ -1,4 +1,5 @@
 import pytest
+import numpy as np
 import pathlib
 from femagtools import vtu
 
@@ -40,3 +41,26 @@ def test_demag(demag_data_dir):
     actual = vtu_data.demag(elements)
     assert len(actual) == 1
     assert actual[0] == pytest.approx(expected, abs=0.1)
+
+
+def test_cell_vector_cache(ts_data_dir, tmp_path):
+    vtu_data = vtu.read(ts_data_dir)
+    for f in vtu_data.filenames[:4]:
+        (tmp_path / f.name).write_bytes(f.read_bytes())
+    vtu_data = vtu.read(tmp_path)
+    vtu_cache = vtu.read(tmp_path, use_cache=True)
+    b = vtu_cache.get_tensor('b')
+    assert b.shape == (4, vtu_cache.output.GetNumberOfCells(), 3)
+    for key in (1, 100, 2000):
+        assert vtu_cache.get_cell_vector('b', key) == pytest.approx(
+            np.array(vtu_data.get_cell_vector('b', key)))
+        assert vtu_cache.get_cell_vector('curd', key) == pytest.approx(
+            vtu_data.get_cell_vector('curd', key))
+        assert vtu_cache.get_point_vector('vector potential', key) == pytest.approx(
+            vtu_data.get_point_vector('vector potential', key))
+
+    vtu.read(tmp_path, persist=True).get_tensor('b')
+    assert len(list((tmp_path / 'vtu-cache').glob('b-*.npy'))) == 1
+    vtu_persist = vtu.read(tmp_path, persist=True)
+    assert vtu_persist.get_cell_vector('b', 100) == pytest.approx(
+        np.array(vtu_data.get_cell_vector('b', 100)))